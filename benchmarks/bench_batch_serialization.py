@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Benchmark batch serialization against per-resource serialization
+
+Usage: python benchmarks/bench_batch_serialization.py [number of elements]
+
+Builds a resource graph of surfaces, each with three data that share
+one mapping and are referenced from the surface default options; the
+graph has four resources per element. Reports wall time to serialize
+and to deserialize and validate the graph:
+
+* single - serialize() on each resource, then deserialize() through
+  SPATIAL_REGISTRY and validate() on each serialized dictionary
+* batch - spatial.serialize_resources and spatial.deserialize_resources
+"""
+import random
+import string
+import sys
+import time
+
+from lfview.resources import spatial
+
+URL = 'https://example.com/api/{}/{}/{}'
+
+
+def uid(base_type, sub_type):
+    return URL.format(
+        base_type,
+        sub_type,
+        ''.join(random.choice(string.ascii_lowercase) for _ in range(20)),
+    )
+
+
+def graph(num_elements):
+    mapping = spatial.MappingContinuous(
+        uid=uid('mappings', 'continuous'),
+        gradient=uid('files', 'array'),
+        data_controls=[0., 1., 2., 3.],
+    )
+    resources = [mapping]
+    for i in range(num_elements):
+        data = [
+            spatial.DataBasic(
+                uid=uid('data', 'basic'),
+                name='data {}'.format(j),
+                array=uid('files', 'array'),
+                location='nodes',
+                mappings=[mapping],
+            ) for j in range(3)
+        ]
+        element = spatial.ElementSurface(
+            uid=uid('elements', 'surface'),
+            name='surface {}'.format(i),
+            vertices=uid('files', 'array'),
+            triangles=uid('files', 'array'),
+            data=data,
+        )
+        element.defaults.color.data = data[0]
+        element.defaults.color.mapping = mapping
+        resources += data + [element]
+    return resources
+
+
+def single(resources):
+    start = time.time()
+    serialized = [resource.serialize() for resource in resources]
+    serialize_time = time.time() - start
+    start = time.time()
+    for value in serialized:
+        resource = spatial.SPATIAL_REGISTRY[value['__class__']].deserialize(
+            value, trusted=True
+        )
+        resource.validate()
+    return serialize_time, time.time() - start
+
+
+def batch(resources):
+    start = time.time()
+    serialized = spatial.serialize_resources(resources)
+    serialize_time = time.time() - start
+    start = time.time()
+    spatial.deserialize_resources(serialized)
+    return serialize_time, time.time() - start
+
+
+def main(num_elements):
+    resources = graph(num_elements)
+    print('Resources: {}'.format(len(resources)))
+    results = {}
+    for name, func in [('single', single), ('batch', batch)]:
+        results[name] = func(resources)
+        print(
+            '{:<10}{:>10.3f} s serialize{:>10.3f} s deserialize'.format(
+                name, *results[name]
+            )
+        )
+    print(
+        '{:<10}{:>10.1f} x{:>20.1f} x'.format(
+            'speedup',
+            results['single'][0] / results['batch'][0],
+            results['single'][1] / results['batch'][1],
+        )
+    )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2500)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Benchmark BVH ray picking and closest point queries on a surface
+
+Usage: python benchmarks/bench_bvh.py [grid size] [number of queries]
+
+Builds an ElementSurface from a wavy grid with 2 x (size - 1)**2
+triangles, then reports wall time to:
+
+* build - construct ElementSurface.bvh
+* intersect - pick with vertical rays from above the surface
+* closest - find the closest point to points near the surface
+* brute force - the same queries against all triangles, for a sample
+  of 10 queries, scaled to the number of queries
+"""
+import sys
+import time
+
+import numpy as np
+from lfview.resources import spatial
+from lfview.resources.spatial.bvh import closest_on_triangle, ray_triangle
+
+
+def surface(size):
+    coords = np.linspace(0, 1, size)
+    grid_u, grid_v = [grid.ravel() for grid in np.meshgrid(coords, coords)]
+    vertices = np.c_[grid_u, grid_v, 0.1 * np.sin(5 * grid_u)]
+    corners = np.arange(size * size).reshape(size, size)[:-1, :-1].ravel()
+    lower = np.c_[corners, corners + 1, corners + size]
+    upper = np.c_[corners + 1, corners + size + 1, corners + size]
+    triangles = np.r_[lower, upper]
+    return spatial.ElementSurface(vertices=vertices, triangles=triangles)
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def brute_force(func, samples, triangle_corners):
+    return [func(*(sample + triangle_corners)) for sample in samples]
+
+
+def main(size, num_queries):
+    element = surface(size)
+    rng = np.random.RandomState(0)
+    origins = np.c_[rng.rand(num_queries, 2), np.ones(num_queries)]
+    directions = np.tile([0., 0., -1.], (num_queries, 1))
+    points = np.c_[rng.rand(num_queries, 2), np.zeros(num_queries)]
+    points[:, 2] = (
+        0.1 * np.sin(5 * points[:, 0]) + 0.02 * rng.rand(num_queries) - 0.01
+    )
+    print('Triangles: {}'.format(element.triangles.shape[0]))
+    print('{:<12}{:>10.3f} s'.format('build', timed(lambda: element.bvh)))
+    bvh = element.bvh
+    corners = element.vertices.array[element.triangles.array]
+    triangle_corners = [corners[:, 0], corners[:, 1], corners[:, 2]]
+    for name, query, brute, args in [
+        ('intersect', bvh.intersect, ray_triangle, (origins, directions)),
+        ('closest', bvh.closest_point, closest_on_triangle, (points, )),
+    ]:
+        query_time = timed(query, *args)
+        samples = [[arg[idx] for arg in args] for idx in range(10)]
+        brute_time = timed(brute_force, brute, samples, triangle_corners)
+        brute_time = brute_time * num_queries / len(samples)
+        print(
+            '{:<12}{:>10.3f} s{:>14.1f} s brute force{:>10.0f} x'.format(
+                name, query_time, brute_time, brute_time / query_time
+            )
+        )
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000,
+    )
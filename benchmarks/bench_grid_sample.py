@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Benchmark sampling volume grid data at points
+
+Usage: python benchmarks/bench_grid_sample.py [cells per axis] [points]
+
+Builds an ElementVolumeGrid with data on cells and on nodes, then
+reports wall time to sample the data at random points with:
+
+* loop - ElementVolumeGrid.sample called once per point, for a sample
+  of 1000 points, scaled to the number of points
+* nearest, linear - ElementVolumeGrid.sample on all points at once
+"""
+import sys
+import time
+
+import numpy as np
+from lfview.resources import spatial
+
+
+def main(size, num_points):
+    grid = spatial.ElementVolumeGrid(
+        origin=[0., 0, 0],
+        tensor_u=[1.] * size,
+        tensor_v=[1.] * size,
+        tensor_w=[1.] * size,
+        axis_u=[1., 0, 0],
+        axis_v=[0., 1, 0],
+        axis_w=[0., 0, 1],
+    )
+    rng = np.random.RandomState(0)
+    points = rng.rand(num_points, 3) * size
+    print('Cells: {}  Points: {}'.format(grid.num_cells, num_points))
+    lengths = [('cells', grid.num_cells), ('nodes', grid.num_nodes)]
+    for location, length in lengths:
+        data = spatial.DataBasic(location=location, array=rng.rand(length))
+        start = time.time()
+        for point in points[:1000]:
+            grid.sample(data, point)
+        times = [(time.time() - start) * num_points / 1000]
+        for method in ['nearest', 'linear']:
+            start = time.time()
+            grid.sample(data, points, method)
+            times.append(time.time() - start)
+        template = '{:<8}{:>10.1f} s loop{:>10.3f} s nearest{:>10.3f} s linear'
+        print(template.format(location, *times))
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000000,
+    )
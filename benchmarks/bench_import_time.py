@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Benchmark import time of the spatial package and its submodules
+
+Usage: python benchmarks/bench_import_time.py [number of repeats]
+
+Each import runs in a new interpreter. Reports the best wall time to
+import, the number of modules loaded, and whether omf was imported
+for:
+
+* package - lfview.resources.spatial only
+* mappings - lfview.resources.spatial.mappings
+* elements - lfview.resources.spatial.elements
+* registry - lfview.resources.spatial.SPATIAL_REGISTRY
+* to_omf - lfview.resources.spatial.MappingCategory.to_omf
+"""
+import json
+import subprocess
+import sys
+
+SCRIPT = '''
+import json, sys, time
+start = time.time()
+{}
+output = [time.time() - start, len(sys.modules), 'omf' in sys.modules]
+print(json.dumps(output))
+'''
+IMPORTS = [
+    ('package', 'import lfview.resources.spatial'),
+    ('mappings', 'import lfview.resources.spatial.mappings'),
+    ('elements', 'import lfview.resources.spatial.elements'),
+    (
+        'registry',
+        'from lfview.resources.spatial import SPATIAL_REGISTRY',
+    ),
+    (
+        'to_omf',
+        'from lfview.resources import spatial\n'
+        'spatial.MappingCategory(values=[1.], indices=[0], '
+        'visibility=[True]).to_omf([0])',
+    ),
+]
+
+
+def run(statement):
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT.format(statement)]
+    )
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main(repeats):
+    print('{:<10}{:>12}{:>10}{:>6}'.format('import', 'time', 'modules', 'omf'))
+    for name, statement in IMPORTS:
+        results = [run(statement) for _ in range(repeats)]
+        best = min(results)
+        print(
+            '{:<10}{:>10.1f} ms{:>10}{:>6}'.format(
+                name, best[0] * 1000, best[1], 'yes' if best[2] else 'no'
+            )
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Benchmark fused index bounds checking against separate min/max passes
+
+Usage: python benchmarks/bench_index_bounds.py [number of triangles]
+
+Reports the best wall time of REPEATS runs, and peak memory allocated
+during a separate run, for:
+
+* separate - np.min then np.max, as in the original validators
+* fused - single chunked pass with spatial.arrays.minmax
+* cached - repeat check served from spatial.arrays.STATS_CACHE
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from lfview.resources import spatial
+
+REPEATS = 5
+
+
+def separate(triangles, num_vertices):
+    return (np.min(triangles) >= 0 and np.max(triangles) < num_vertices)
+
+
+def fused(triangles, num_vertices):
+    low, high = spatial.arrays.minmax(triangles)
+    return low >= 0 and high < num_vertices
+
+
+def cached(triangles, num_vertices):
+    return spatial.arrays.in_bounds(triangles, low=0, high=num_vertices)
+
+
+def run(name, func, triangles, num_vertices):
+    elapsed = []
+    for _ in range(REPEATS):
+        start = time.time()
+        assert func(triangles, num_vertices)
+        elapsed.append(time.time() - start)
+    tracemalloc.start()
+    func(triangles, num_vertices)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        '{:<10}{:>10.4f} s{:>12.1f} KB peak'.format(
+            name, min(elapsed), peak / 1024.
+        )
+    )
+
+
+def main(num_triangles):
+    num_vertices = num_triangles // 2
+    triangles = np.random.randint(
+        0, num_vertices, size=(num_triangles, 3)
+    ).astype('int32')
+    print(
+        'Triangles: {} ({:.1f} MB)'.format(
+            num_triangles, triangles.nbytes / 1024.**2
+        )
+    )
+    spatial.arrays.STATS_CACHE.clear()
+    run('separate', separate, triangles, num_vertices)
+    run('fused', fused, triangles, num_vertices)
+    spatial.arrays.array_stats(triangles)
+    run('cached', cached, triangles, num_vertices)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000000)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Benchmark JSON backends on snapshot serialization of options
+
+Usage: python benchmarks/bench_json_backends.py [number of snapshots]
+
+Reports wall time to encode and decode realistic OptionsSurface and
+OptionsBlockModel payloads, as produced by :code:`serialize` on
+element defaults, with each installed backend in
+spatial.jsonio.available_json_backends().
+
+Snapshot caching is bypassed so only JSON encoding and decoding are
+timed.
+"""
+import sys
+import time
+
+from lfview.resources import spatial
+from lfview.resources.spatial import jsonio
+
+
+def payloads():
+    surface = spatial.OptionsSurface()
+    surface.color.data = 'https://example.com/api/data/basic/abc123'
+    surface.color.mapping = spatial.MappingContinuous(
+        gradient='https://example.com/api/files/array/abc123',
+        data_controls=[0., 10., 20., 30.],
+    )
+    surface.textures = [
+        {
+            'data': 'https://example.com/api/textures/projection/abc123',
+            'visible': True,
+        }
+    ]
+    block_model = spatial.OptionsBlockModel()
+    block_model.color.mapping = spatial.MappingCategory(
+        values=['#{:06X}'.format(i * 1000) for i in range(256)],
+        indices=list(range(256)),
+        visibility=[True] * 256,
+    )
+    return {
+        'OptionsSurface': surface.serialize(),
+        'OptionsBlockModel': block_model.serialize(),
+    }
+
+
+def run(name, payload, number):
+    start = time.time()
+    for _ in range(number):
+        output = jsonio.dumps(payload)
+    encode = time.time() - start
+    start = time.time()
+    for _ in range(number):
+        jsonio.loads(output)
+    decode = time.time() - start
+    print(
+        '{:<10}{:>10.4f} s encode{:>10.4f} s decode{:>10} bytes'.format(
+            name, encode, decode, len(output)
+        )
+    )
+
+
+def main(number):
+    for payload_name, payload in payloads().items():
+        print('{} x {}'.format(payload_name, number))
+        for name in jsonio.available_json_backends():
+            jsonio.set_json_backend(name)
+            run(name, payload, number)
+    jsonio.set_json_backend('json')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,4 +1,16 @@
-"""Spatial resources for LF View API Python client"""
+"""Spatial resources for LF View API Python client
+
+Resource modules, data, elements, mappings, options, and textures,
+are imported with the package, so resource classes are registered for
+:code:`properties.HasProperties.deserialize`. omf is only imported when
+resources are converted to or from OMF, and the remaining submodules,
+and the classes and functions available from them, are imported on
+first access. On Python versions before 3.7, everything is imported
+immediately.
+"""
+import importlib
+import sys
+
 from . import base, data, elements, mappings, options, textures
 from .data import (
     DataBasic,
@@ -28,6 +40,89 @@ from .textures import (
     TextureProjection,
 )
 
+SUBMODULES = (
+    'arrays',
+    'base',
+    'batch',
+    'bvh',
+    'cache',
+    'context',
+    'data',
+    'diff',
+    'elements',
+    'export',
+    'grids',
+    'instances',
+    'jsonio',
+    'kdtree',
+    'mappings',
+    'options',
+    'reader',
+    'resolver',
+    'textures',
+)
+EXPORTS = {
+    'DataBasic': 'data',
+    'DataCategory': 'data',
+    'DictStore': 'resolver',
+    'DirectoryStore': 'resolver',
+    'ElementLineSet': 'elements',
+    'ElementPointSet': 'elements',
+    'ElementSurface': 'elements',
+    'ElementSurfaceGrid': 'elements',
+    'ElementVolumeGrid': 'elements',
+    'GridLocator': 'grids',
+    'KDTree': 'kdtree',
+    'LazyOMFReader': 'reader',
+    'MappingCategory': 'mappings',
+    'MappingContinuous': 'mappings',
+    'MappingDiscrete': 'mappings',
+    'OptionsBlockModel': 'options',
+    'OptionsLines': 'options',
+    'OptionsPoints': 'options',
+    'OptionsSurface': 'options',
+    'OptionsTubes': 'options',
+    'OptionsVolumeSlices': 'options',
+    'PointerResolver': 'resolver',
+    'ProjectExporter': 'export',
+    'StreamingOMFWriter': 'export',
+    'TextureProjection': 'textures',
+    'TriangleBVH': 'bvh',
+    'apply_patch': 'diff',
+    'deserialize_resources': 'batch',
+    'diff_resources': 'diff',
+    'read_omf': 'reader',
+    'serialize_resources': 'batch',
+    'to_omf_project': 'export',
+    'write_omf': 'export',
+}
+__all__ = sorted(EXPORTS) + ['SPATIAL_REGISTRY']
+
 __version__ = '0.0.6'
 
 SPATIAL_REGISTRY = base._BaseResource._REGISTRY
+
+
+def _import(name):
+    return importlib.import_module('.{}'.format(name), __name__)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return _import(name)
+    if name not in EXPORTS:
+        raise AttributeError(
+            'module {} has no attribute {}'.format(__name__, name)
+        )
+    value = getattr(_import(EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULES) | set(EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    for _name in SUBMODULES + tuple(EXPORTS):
+        __getattr__(_name)
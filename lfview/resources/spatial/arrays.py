@@ -0,0 +1,486 @@
+"""Helpers to inspect and cache statistics of numeric arrays"""
+from collections import deque, OrderedDict
+import hashlib
+import threading
+import weakref
+import zlib
+
+from lfview.resources.files import Array
+from lfview.resources.files.files import ARRAY_DTYPES
+import numpy as np
+import properties
+from properties.math import TYPE_MAPPINGS
+
+from .context import ContextStack
+
+CHUNK_SIZE = 2**18
+FINGERPRINT_SAMPLES = 4096
+SUPPORTED_DTYPES = {dtypes[0]: name for name, dtypes in ARRAY_DTYPES.items()}
+INT32_RANGE = (np.iinfo('<i4').min, np.iinfo('<i4').max)
+
+
+def fingerprint(array):
+    """Cheap content fingerprint of a numpy array
+
+    This combines the array shape, dtype, memory location, and a
+    checksum of at most FINGERPRINT_SAMPLES evenly-spaced values. It
+    is not a full content hash; in-place modification of values that
+    are not sampled will not change the fingerprint.
+    """
+    flat = array.reshape(-1)
+    step = max(flat.size // FINGERPRINT_SAMPLES, 1)
+    sample = np.ascontiguousarray(flat[::step])
+    return (
+        array.shape,
+        array.dtype.str,
+        array.__array_interface__['data'][0],
+        zlib.crc32(sample.view(np.uint8)) & 0xffffffff,
+        zlib.crc32(np.ascontiguousarray(flat[-1:]).view(np.uint8))
+        & 0xffffffff,
+    )
+
+
+def iter_chunks(array, chunk_size=CHUNK_SIZE):
+    """Yield views of consecutive chunks along the first axis of array
+
+    Each chunk contains roughly chunk_size values. Since these are
+    views, no copies are made, even for non-contiguous arrays.
+    """
+    row_size = max(int(np.prod(array.shape[1:])), 1)
+    rows = max(chunk_size // row_size, 1)
+    for start in range(0, array.shape[0], rows):
+        yield array[start:start + rows]
+
+
+def minmax(array, chunk_size=CHUNK_SIZE):
+    """Compute min and max of an array in a single chunked pass
+
+    Min and max of each chunk are computed while the chunk is still
+    in cache, so the array is only read from memory once, and no
+    temporaries larger than a chunk are allocated. Like
+    :code:`np.min`, this raises a ValueError for empty arrays.
+    """
+    array = np.asanyarray(array)
+    if array.ndim == 0:
+        array = array.reshape(1)
+    if not array.size:
+        raise ValueError('minmax of an empty array is undefined')
+    low = high = None
+    for chunk in iter_chunks(array, chunk_size):
+        chunk_low, chunk_high = chunk.min(), chunk.max()
+        if low is None or chunk_low < low:
+            low = chunk_low
+        if high is None or chunk_high > high:
+            high = chunk_high
+    return low, high
+
+
+def content_hash(array, chunk_size=CHUNK_SIZE):
+    """Full SHA-256 content hash of a numpy array
+
+    Unlike :func:`fingerprint`, every value is hashed, along with the
+    dtype and shape, so arrays with equal hashes have identical
+    content. The array is hashed in chunks, so non-contiguous arrays
+    are never copied in full.
+    """
+    array = np.asanyarray(array)
+    sha = hashlib.sha256()
+    sha.update('{}{}'.format(array.dtype.str, array.shape).encode('utf-8'))
+    if array.ndim == 0:
+        array = array.reshape(1)
+    for chunk in iter_chunks(array, chunk_size):
+        sha.update(np.ascontiguousarray(chunk).view(np.uint8))
+    return sha.hexdigest()
+
+
+def _array_pointers(resources):
+    """Return (resource, name, Array) for every Array in a resource graph
+
+    Each resource is visited once, including nested resources within
+    Lists and Instances. Arrays that are uids or have no array values
+    are not included.
+    """
+    output = []
+    visited = set()
+    pending = deque(resources)
+    while pending:
+        value = pending.popleft()
+        if isinstance(value, list):
+            pending.extend(value)
+            continue
+        if (not isinstance(value, properties.HasProperties)
+                or isinstance(value, Array) or id(value) in visited):
+            continue
+        visited.add(id(value))
+        backend = value._backend  #pylint: disable=protected-access
+        for name, val in backend.items():
+            if isinstance(val, Array):
+                if val.array is not None:
+                    output.append((value, name, val))
+            else:
+                pending.append(val)
+    return output
+
+
+def dedupe_arrays(resources):
+    """Share one Array resource among Pointers to identical arrays
+
+    All Array resources referenced from the resource graph, for
+    example, element vertices and data arrays, are grouped by
+    :func:`content_hash`. Pointers to arrays with the same content
+    are then rewritten to the same Array, so it is only serialized
+    and uploaded once. An Array that already has a uid is preferred.
+    Only arrays with the same dtype and shape as another array are
+    hashed, and views of the same memory are hashed once.
+
+    Returns a dictionary with the number of distinct :code:`'arrays'`
+    found, the number of :code:`'unique'` arrays remaining, and the
+    :code:`'bytes_saved'` by removing duplicates.
+    """
+    pointers = _array_pointers(resources)
+    arrays = OrderedDict()
+    for _, _, arr in pointers:
+        arrays[id(arr)] = arr
+    groups = OrderedDict()
+    for arr in arrays.values():
+        key = (arr.array.dtype.str, arr.array.shape)
+        groups.setdefault(key, []).append(arr)
+    canonical = {}
+    hashes = {}
+    for group in groups.values():
+        by_hash = OrderedDict()
+        for arr in group:
+            key = None
+            if len(group) > 1:
+                interface = arr.array.__array_interface__
+                memory = (interface['data'][0], interface['strides'])
+                if memory not in hashes:
+                    hashes[memory] = content_hash(arr.array)
+                key = hashes[memory]
+            by_hash.setdefault(key, []).append(arr)
+        for same in by_hash.values():
+            keep = next((arr for arr in same if arr.uid), same[0])
+            for arr in same:
+                canonical[id(arr)] = keep
+    for resource, name, arr in pointers:
+        keep = canonical[id(arr)]
+        if keep is not arr:
+            # Content is identical, so the value need not be revalidated
+            resource._backend[name] = keep  #pylint: disable=protected-access
+    unique = {id(arr) for arr in canonical.values()}
+    return {
+        'arrays': len(arrays),
+        'unique': len(unique),
+        'bytes_saved': sum(
+            arr.array.nbytes
+            for arr in arrays.values()
+            if id(arr) not in unique
+        ),
+    }
+
+
+def compute_stats(array):
+    """Compute min, max, dtype, and shape of a numpy array"""
+    low, high = minmax(array)
+    return {
+        'min': low,
+        'max': high,
+        'dtype': array.dtype.str,
+        'shape': array.shape,
+    }
+
+
+def compute_bounds(array, chunk_size=CHUNK_SIZE):
+    """Compute min and max of each column of a 2D array in one pass
+
+    Returns a 2 x M array of the minimum then maximum values. As with
+    :func:`minmax`, the array is read in chunks, and this raises a
+    ValueError for empty arrays.
+    """
+    array = np.asanyarray(array)
+    if array.ndim != 2:
+        raise ValueError(
+            'bounds require a 2D array, not {}D'.format(array.ndim)
+        )
+    if not array.size:
+        raise ValueError('bounds of an empty array are undefined')
+    low = high = None
+    for chunk in iter_chunks(array, chunk_size):
+        chunk_low, chunk_high = chunk.min(axis=0), chunk.max(axis=0)
+        if low is None:
+            low, high = chunk_low, chunk_high
+        else:
+            np.minimum(low, chunk_low, out=low)
+            np.maximum(high, chunk_high, out=high)
+    return np.array([low, high])
+
+
+class ArrayStatsCache(object):
+    """Cache of array statistics keyed on array identity and fingerprint
+
+    Entries are dropped when the array is garbage collected. If an
+    array is replaced, for example by reassigning a Pointer or
+    the :code:`array` attribute of an
+    :class:`lfview.resources.files.Array`, the new array is a cache
+    miss. Modifying an array in-place is detected by its fingerprint.
+
+    Statistics are computed by the compute function, which defaults to
+    :func:`compute_stats`.
+    """
+
+    def __init__(self, compute=compute_stats):
+        self.compute = compute
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self, key):
+        def callback(_):
+            with self._lock:
+                self._entries.pop(key, None)
+
+        return callback
+
+    def get(self, array):
+        """Return statistics for array, computing them if necessary"""
+        key = id(array)
+        current = fingerprint(array)
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and entry[0]() is array
+                    and entry[1] == current):
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        stats = self.compute(array)
+        with self._lock:
+            self._entries[key] = (
+                weakref.ref(array, self._evict(key)), current, stats
+            )
+        return stats
+
+    def clear(self):
+        """Remove all cached statistics"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+STATS_CACHE = ArrayStatsCache()
+BOUNDS_CACHE = ArrayStatsCache(compute_bounds)
+
+
+def array_stats(array):
+    """Return cached min, max, dtype, and shape for a numpy array"""
+    return STATS_CACHE.get(array)
+
+
+def array_bounds(array):
+    """Return cached min and max of each column of a 2D numpy array
+
+    The returned array is shared with the cache, so it must not be
+    modified.
+    """
+    return BOUNDS_CACHE.get(array)
+
+
+def in_bounds(array, low=None, high=None):
+    """Check all values satisfy low <= value < high using cached stats
+
+    Either bound may be None to leave it unchecked. Both bounds are
+    checked from the same single-pass statistics, so validating the
+    lower and upper bound of an index array only scans it once.
+    """
+    stats = array_stats(array)
+    if low is not None and stats['min'] < low:
+        return False
+    if high is not None and stats['max'] >= high:
+        return False
+    return True
+
+
+class CopyTracker(ContextStack):
+    """Context manager that records array copies made on this thread
+
+    While a CopyTracker is active, conversions in this module that
+    cannot avoid copying an array call :func:`record_copy`, so the
+    total :code:`bytes_copied` and a list of :code:`copies`, as
+    (reason, bytes) tuples, are available afterwards. For example:
+
+    .. code::
+
+        with CopyTracker() as tracker:
+            omf_element = element.to_omf()
+        print(tracker.bytes_copied)
+
+    Trackers are thread-local; arrays copied on other threads are not
+    recorded.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.bytes_copied = 0
+        self.copies = []
+
+    def record(self, reason, nbytes):
+        """Record a copy of nbytes made for the given reason"""
+        self.bytes_copied += int(nbytes)
+        self.copies.append((reason, int(nbytes)))
+
+
+def record_copy(reason, nbytes):
+    """Record a copy with the active CopyTracker, if there is one"""
+    tracker = CopyTracker.active()
+    if tracker is not None:
+        tracker.record(reason, nbytes)
+
+
+def _assign(resource, value):
+    """Assign numpy array to an Array resource, avoiding copies if possible
+
+    If the array is already C-contiguous with a supported dtype, it is
+    assigned directly so the Array shares memory with the input.
+    64-bit integer arrays that fit in 32 bits are converted with a
+    single copy. Any other input falls back to the standard Array
+    conversion, which always copies.
+    """
+    if not isinstance(value, np.ndarray):
+        resource.array = value
+        record_copy('array', resource.array.nbytes)
+        return resource
+    if type(value) is not np.ndarray:  #pylint: disable=unidiomatic-typecheck
+        value = value.view(np.ndarray)
+    if (value.dtype.str in ('<i8', '<u8') and value.size
+            and value.flags.c_contiguous):
+        low, high = minmax(value)
+        if low >= INT32_RANGE[0] and high <= INT32_RANGE[1]:
+            value = value.astype('<i4')
+            record_copy('int32', value.nbytes)
+    if value.dtype.str not in SUPPORTED_DTYPES or not value.flags.c_contiguous:
+        resource.array = value
+        record_copy('array', resource.array.nbytes)
+        return resource
+    resource._array = value  #pylint: disable=protected-access
+    resource.dtype = value.dtype.str
+    resource.shape = list(value.shape)
+    resource.content_length = value.nbytes
+    return resource
+
+
+def wrap_array(value):
+    """Create an Array resource from a numpy array, avoiding copies
+
+    Assigning a numpy array to :code:`Array.array` always copies it.
+    If the array is already C-contiguous with a supported dtype, this
+    instead wraps it directly, so the Array shares memory with the
+    input. 64-bit integer arrays that fit in 32 bits are converted with
+    a single copy. Any other input falls back to the standard Array
+    conversion.
+    """
+    return _assign(Array(), value)
+
+
+def _omf_array_valid(prop, value):
+    """Check dtype kind and shape of value against an OMF array prop"""
+    kinds = ''.join(TYPE_MAPPINGS[typ] for typ in prop.dtype)
+    if value.dtype.kind not in kinds:
+        return False
+    for shape in prop.shape:
+        if len(shape) == value.ndim and all(
+                shp in ('*', val) for shp, val in zip(shape, value.shape)):
+            return True
+    return False
+
+
+def omf_array(omf_class, value):
+    """Create an OMF array, e.g. omf.Vector3Array, avoiding copies
+
+    OMF array properties always copy on assignment; vector arrays
+    are copied up to three times while being split into and
+    reassembled from components. Instead, if value is a C-contiguous
+    numpy array that already has a valid dtype and shape, this stores
+    it directly on the OMF array so they share memory. Vector arrays
+    require float64 values; other inputs are converted with a single
+    copy, which is recorded with the active :class:`CopyTracker`.
+    Input that is invalid even after conversion falls back to standard
+    OMF validation, which raises the appropriate error.
+
+    Note that validating the resulting OMF objects, for example when
+    writing the project with :code:`omf.OMFWriter`, still creates
+    temporary copies of each array.
+    """
+    prop = omf_class._props['array']  #pylint: disable=protected-access
+    vector = isinstance(prop.wrapper, type)
+    dtype = '<f8' if vector else None
+    array = value
+    if (not isinstance(array, np.ndarray) or not array.flags.c_contiguous
+            or (dtype and array.dtype.str != dtype)):
+        array = np.ascontiguousarray(array, dtype=dtype)
+        record_copy(omf_class.__name__, array.nbytes)
+    if not _omf_array_valid(prop, array):
+        return omf_class(value)
+    if vector:
+        array = array.view(prop.wrapper)
+    elif type(array) is not np.ndarray:  #pylint: disable=unidiomatic-typecheck
+        array = array.view(np.ndarray)
+    omf_obj = omf_class()
+    omf_obj._backend['array'] = array  #pylint: disable=protected-access
+    return omf_obj
+
+
+class LazyArray(Array):
+    """Array resource whose numpy array is only read on first access
+
+    The loader is a callable that takes no arguments and returns the
+    numpy array. It is called the first time :code:`array` is
+    accessed, or when metadata that depends on the array values
+    (dtype, shape, or content_length) is accessed but was not provided
+    on initialization. The loaded array is wrapped without copying if
+    possible, as with :func:`wrap_array`.
+
+    LazyArrays hold a reference to their loader, so they may not be
+    pickled until loaded.
+    """
+
+    _LAZY_PROPS = ('dtype', 'shape', 'content_length')
+
+    def __init__(self, loader, **kwargs):
+        self._loader = loader
+        self._load_lock = threading.Lock()
+        super(LazyArray, self).__init__(**kwargs)
+
+    @property
+    def loaded(self):
+        """True if the underlying array has been read"""
+        return self._loader is None
+
+    def load(self):
+        """Read the underlying array if it has not been read yet"""
+        with self._load_lock:
+            if self._loader is None:
+                return
+            value = self._loader()
+            self._loader = None
+            _assign(self, value)
+
+    def _get(self, name):
+        if (self._loader is not None and name in self._LAZY_PROPS
+                and self._backend.get(name) is None):
+            self.load()
+        return super(LazyArray, self)._get(name)
+
+    @property
+    def array(self):
+        """Reference to underlying numpy array, read on first access"""
+        if self._loader is not None:
+            self.load()
+        return getattr(self, '_array', None)
+
+    @array.setter
+    def array(self, value):
+        self._loader = None
+        Array.array.fset(self, value)
@@ -1,22 +1,32 @@
 """Base resource containing properties shared by all spatial resources"""
 from __future__ import absolute_import
 
-import json
 from collections import OrderedDict
+import importlib
 
 from lfview.resources import files
+import numpy as np
 import properties.extras
 from six import string_types
 
+from . import jsonio
+from .cache import SNAPSHOT_CACHE
+from .context import ExportContext
+from .instances import _default, _deserialize_deferred, _new_instance
+
+HEX_DIGITS = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)
+HEX_VALUES = np.full(256, -1, dtype=np.int16)
+HEX_VALUES[HEX_DIGITS] = np.arange(16)
+HEX_VALUES[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+
 
 def to_hex(value):
     """Converts RGB tuple to hex string"""
-    hex_values = (hex(i).lstrip('0x').upper().ljust(2, '0') for i in value)
-    return '#{}'.format(''.join(hex_values))
+    return '#{:02X}{:02X}{:02X}'.format(*value)
 
 
 def from_hex(value):
-    """Converts RGB tuple to hex string"""
+    """Converts hex string to RGB tuple"""
     color_str = value.lstrip('#')
     if len(color_str) != 6:
         raise ValueError('Invalid hex color: {}'.format(value))
@@ -29,25 +39,99 @@ def from_hex(value):
     return int_values
 
 
+def colors_to_hex(colors):
+    """Converts N x 3 array of RGB values to list of hex strings
+
+    This is equivalent to :func:`to_hex` on each color, but the
+    conversion is done on the entire array at once.
+    """
+    colors = np.asarray(colors)
+    if not colors.size:
+        return []
+    if colors.ndim != 2 or colors.shape[1] != 3:
+        raise ValueError('Colors must be N x 3, not {}'.format(colors.shape))
+    if colors.dtype != np.uint8:
+        if np.any((colors < 0) | (colors > 255)):
+            raise ValueError('Color values must be 0-255')
+        colors = colors.astype(np.uint8)
+    chars = np.empty((colors.shape[0], 7), dtype=np.uint8)
+    chars[:, 0] = ord('#')
+    chars[:, 1::2] = HEX_DIGITS[colors >> 4]
+    chars[:, 2::2] = HEX_DIGITS[colors & 15]
+    output = chars.tobytes().decode('ascii')
+    return [output[i:i + 7] for i in range(0, len(output), 7)]
+
+
+def colors_from_hex(values):
+    """Converts list of hex strings to N x 3 uint8 array of RGB values
+
+    This is equivalent to :func:`from_hex` on each string, but the
+    hex digits are parsed for all strings at once.
+    """
+    try:
+        color_strs = [value.lstrip('#') for value in values]
+        chars = ''.join(color_strs).encode('ascii')
+    except (AttributeError, TypeError, UnicodeError):
+        raise ValueError('Invalid hex colors: {}'.format(values))
+    if any(len(color_str) != 6 for color_str in color_strs):
+        raise ValueError('Invalid hex colors: {}'.format(values))
+    digits = HEX_VALUES[np.frombuffer(chars, dtype=np.uint8)]
+    if np.any(digits < 0):
+        raise ValueError('Invalid hex colors: {}'.format(values))
+    digits = digits.reshape(-1, 3, 2).astype(np.uint8)
+    return digits[:, :, 0] << 4 | digits[:, :, 1]
+
+
+class LazyModule(object):
+    """Module that is imported on first attribute access
+
+    This is used for dependencies only required by some methods, for
+    example, :code:`omf = LazyModule('omf')` defers importing omf until
+    :code:`to_omf` or :code:`from_omf` is first called.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = importlib.import_module(self._name)
+            object.__setattr__(self, '_module', module)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return '<LazyModule: {}>'.format(self._name)
+
+
 def snapshot_serializer(val, **kwargs):
-    """Serializer function that returns a JSON string if snapshot=True"""
-    snapshot = kwargs.get('snapshot', False)
-    val = val.serialize(**kwargs)
-    if snapshot:
-        val = json.dumps(val)
-    return val
+    """Serializer function that returns a JSON string if snapshot=True
+
+    JSON strings are cached in :code:`SNAPSHOT_CACHE`, unless
+    serializing a batch with pointer_uids; see
+    :func:`lfview.resources.spatial.batch.serialize_resources`.
+    """
+    if not kwargs.get('snapshot', False):
+        return val.serialize(**kwargs)
+    if kwargs.get('pointer_uids'):
+        return jsonio.dumps(val.serialize(**kwargs))
+    return SNAPSHOT_CACHE.serialize(val, **kwargs)
 
 
 def get_snapshot_deserializer(instance_class):
     """Deserializer that accepts JSON strings
 
-    This must be initialized with the instance_class.
+    This must be initialized with the instance_class. Instances
+    deserialized from JSON strings are cached in :code:`SNAPSHOT_CACHE`.
+    Deserialization is strict unless defer_validation=True.
     """
 
     def snapshot_deserializer(val, **kwargs):
-        kwargs.update({'strict': True})
+        if not kwargs.get('defer_validation', False):
+            kwargs.update({'strict': True})
         if isinstance(val, string_types):
-            val = json.loads(val)
+            return SNAPSHOT_CACHE.deserialize(instance_class, val, **kwargs)
         return instance_class.deserialize(val, **kwargs)
 
     return snapshot_deserializer
@@ -135,9 +219,115 @@ class _BaseResource(files.base._BaseUIDModel):
         max_length=5000,
     )
 
+    def serialize(self, include_class=True, save_dynamic=False, **kwargs):
+        """Serialize the resource, or only its uid if pointer_uids has it
+
+        The pointer_uids keyword argument is a dictionary of
+        :code:`id(resource)` to uid of resources that are serialized
+        separately, for example, by
+        :func:`lfview.resources.spatial.batch.serialize_resources`.
+        When serializing other resources that point to these, only
+        the uid is saved rather than the entire resource.
+        """
+        pointer_uids = kwargs.get('pointer_uids')
+        if pointer_uids and id(self) in pointer_uids:
+            return pointer_uids[id(self)]
+        return super(_BaseResource, self).serialize(
+            include_class=include_class, save_dynamic=save_dynamic, **kwargs
+        )
+
+    @classmethod
+    def deserialize(
+            cls, value, trusted=False, strict=False, assert_valid=False,
+            **kwargs
+    ):
+        """Deserialize the resource, optionally deferring validation
+
+        If the defer_validation keyword argument is True, the value is
+        assumed to come from a trusted source that already validated
+        it, for example, a cache of server responses. Property values
+        are deserialized without validation and the resource, along
+        with any resources nested in it, is marked unvalidated.
+        Property validation and coercion are deferred until the first
+        call to :code:`validate()`, including the call at the start of
+        :code:`to_omf()`. Until then, values are as serialized; for
+        example, arrays may be lists and colors may be hex strings.
+        """
+        if not kwargs.get('defer_validation', False):
+            return super(_BaseResource, cls).deserialize(
+                value,
+                trusted=trusted,
+                strict=strict,
+                assert_valid=assert_valid,
+                **kwargs
+            )
+        if not isinstance(value, dict):
+            raise ValueError(
+                'HasProperties class {} must deserialize from dictionary, '
+                'not input of type {}'.format(
+                    cls.__name__, value.__class__.__name__
+                )
+            )
+        #pylint: disable=protected-access
+        output_cls = cls._deserialize_class(
+            input_cls_name=value.get('__class__'),
+            trusted=trusted,
+            strict=strict,
+        )
+        kwargs.update({'trusted': trusted, 'strict': strict})
+        instance = _new_instance(output_cls)
+        for name, prop in output_cls._props.items():
+            if name in value:
+                val = _deserialize_deferred(prop, value[name], **kwargs)
+            else:
+                val = _default(output_cls, name, prop)
+            if val is None or val is properties.undefined:
+                continue
+            instance._backend[name] = val
+        instance._unvalidated = True
+        if assert_valid:
+            instance.validate()
+        return instance
+
+    def _validate_deferred(self):
+        """Validate and coerce property values deferred on deserialize"""
+        if not getattr(self, '_unvalidated', False):
+            return
+        backend = self._backend  #pylint: disable=protected-access
+        for name, prop in self._props.items():  #pylint: disable=no-member
+            if backend.get(name) is not None:
+                backend[name] = prop.validate(self, backend[name])
+        self._unvalidated = False
+
+    def validate(self):
+        """Validate the resource, only once per active ExportContext
+
+        Property validation deferred by :code:`deserialize` with
+        defer_validation=True runs first.
+        """
+        self._validate_deferred()
+        context = ExportContext.active()
+        if context is None:
+            return super(_BaseResource, self).validate()
+        if not context.claim(self):
+            return True
+        try:
+            valid = super(_BaseResource, self).validate()
+        except Exception:
+            context.release(self)
+            raise
+        context.finish(self)
+        return valid
+
     def to_omf(self):
         raise NotImplementedError(
             'to_omf not implemented for class: {}'.format(
                 self.__class__.__name__
             )
         )
+
+    @classmethod
+    def from_omf(cls, omf_object):
+        raise NotImplementedError(
+            'from_omf not implemented for class: {}'.format(cls.__name__)
+        )
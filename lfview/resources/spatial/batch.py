@@ -0,0 +1,170 @@
+"""Batch serialization and deserialization of spatial resource graphs"""
+import properties
+from six import string_types
+
+# Resource modules are imported so all classes are registered before
+# DISPATCH_TABLE is built
+from . import data, elements, mappings, textures  #pylint: disable=unused-import
+from .base import _BaseResource, InstanceSnapshot
+from .context import ExportContext
+from .instances import _default, _new_instance
+
+POINTER_PROPS = (properties.Instance, properties.List, properties.Union)
+NESTED_PROPS = (properties.Instance, InstanceSnapshot)
+
+
+def dispatch_table():
+    """Return a dictionary of (BASE_TYPE, SUB_TYPE) to resource class
+
+    Only public spatial resource classes with a SUB_TYPE are included.
+    """
+    table = {}
+    registry = _BaseResource._REGISTRY  #pylint: disable=protected-access
+    for name, cls in registry.items():
+        if name.startswith('_') or not getattr(cls, 'SUB_TYPE', None):
+            continue
+        table[(cls.BASE_TYPE, cls.SUB_TYPE)] = cls
+    return table
+
+
+DISPATCH_TABLE = dispatch_table()
+
+
+def resource_class(value):
+    """Return the spatial resource class for a serialized dictionary
+
+    The class is found from the :code:`'__class__'` name if present.
+    Otherwise, the BASE_TYPE and SUB_TYPE are parsed from the
+    resource uid, for example,
+    https://example.com/api/elements/surface/abc123, and looked up in
+    DISPATCH_TABLE.
+    """
+    registry = _BaseResource._REGISTRY  #pylint: disable=protected-access
+    name = value.get('__class__')
+    if name:
+        cls = registry.get(name)
+    else:
+        types = tuple(value.get('uid', '').split('/')[-3:-1])
+        cls = DISPATCH_TABLE.get(types)
+    if cls is None or cls not in DISPATCH_TABLE.values():
+        raise ValueError(
+            'Unable to determine spatial resource class for {}'.format(
+                name or value.get('uid')
+            )
+        )
+    return cls
+
+
+def serialize_resources(resources, include_class=True, **kwargs):
+    """Serialize a list of resources into a list of dictionaries
+
+    Each resource is serialized once. Pointers from one resource to
+    another resource in the list are saved as the uid of that
+    resource, rather than serializing it again inline; this requires
+    the resources to have uids. Keyword arguments are passed to
+    :code:`serialize`.
+    """
+    resources = list(resources)
+    kwargs.update(
+        {
+            'include_class': include_class,
+            'pointer_uids': {
+                id(resource): resource.uid
+                for resource in resources
+                if resource.uid
+            },
+        }
+    )
+    output = []
+    for resource in resources:
+        if isinstance(resource, _BaseResource):
+            value = super(_BaseResource, resource).serialize(**kwargs)
+        else:
+            value = resource.serialize(**kwargs)
+        output.append(value)
+    return output
+
+
+def _deserialize(cls, value, **kwargs):
+    """Deserialize and coerce prop values without change notifications
+
+    Validators that involve multiple properties are not run; these are
+    deferred to the validation pass of :func:`deserialize_resources`.
+    Nested instances, such as default options, are deserialized the
+    same way.
+    """
+    #pylint: disable=protected-access, unidiomatic-typecheck
+    instance = _new_instance(cls)
+    backend = instance._backend
+    for name, prop in cls._props.items():
+        if name in value:
+            val = value[name]
+            if (isinstance(val, dict) and type(prop) in NESTED_PROPS and
+                    issubclass(prop.instance_class, properties.HasProperties)):
+                val = _deserialize(prop.instance_class, val, **kwargs)
+            else:
+                val = prop.deserialize(val, **kwargs)
+        else:
+            val = _default(cls, name, prop)
+        if val is None or val is properties.undefined:
+            continue
+        backend[name] = prop.validate(instance, val)
+    return instance
+
+
+def _resolve(value, uids):
+    """Replace uid strings in value with resources from uids"""
+    if isinstance(value, string_types):
+        return uids.get(value, value)
+    if isinstance(value, list):
+        resolved = [_resolve(val, uids) for val in value]
+        if any(new is not old for new, old in zip(resolved, value)):
+            return resolved
+        return value
+    if (isinstance(value, properties.HasProperties)
+            and uids.get(getattr(value, 'uid', None)) is not value):
+        resolve_pointers(value, uids)
+    return value
+
+
+def resolve_pointers(instance, uids):
+    """Replace Pointer uids on instance with resources from uids
+
+    uids is a dictionary of uid to resource. Pointers within Lists,
+    Unions, and nested instances that are not in uids, such as default
+    options or inline resources, are also resolved.
+    """
+    backend = instance._backend  #pylint: disable=protected-access
+    for name, value in list(backend.items()):
+        prop = instance._props[name]  #pylint: disable=protected-access
+        if not isinstance(prop, POINTER_PROPS):
+            continue
+        resolved = _resolve(value, uids)
+        if resolved is not value:
+            backend[name] = prop.validate(instance, resolved)
+    return instance
+
+
+def deserialize_resources(values, validate=True, **kwargs):
+    """Deserialize a list of dictionaries into spatial resources
+
+    The class of each resource is determined by :func:`resource_class`.
+    After all resources are deserialized, Pointer uids that refer to
+    other resources in the list are replaced by those resources, so
+    shared resources are only deserialized once. Finally, if validate
+    is True (the default), all resources are validated in a single
+    pass that validates each shared resource only once. Keyword
+    arguments are passed to the property deserializers.
+    """
+    resources = [
+        _deserialize(resource_class(value), value, **kwargs)
+        for value in values
+    ]
+    uids = {resource.uid: resource for resource in resources if resource.uid}
+    for resource in resources:
+        resolve_pointers(resource, uids)
+    if validate:
+        with ExportContext():
+            for resource in resources:
+                resource.validate()
+    return resources
@@ -0,0 +1,448 @@
+"""Array-backed bounding volume hierarchy for batched triangle queries"""
+import numpy as np
+
+from .kdtree import _as_points
+
+LEAF_SIZE = 16
+QUERY_CHUNK_SIZE = 2**14
+MORTON_BITS = 10
+
+
+def _spread_bits(values):
+    """Insert two zero bits between each of the low 10 bits of values"""
+    values = values.astype(np.uint32)
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+def morton_codes(points):
+    """Morton codes of N x 3 points, quantized within their bounds
+
+    Sorting by these codes orders points along a Z-order curve, so
+    points that are close in the order are close in space.
+    """
+    low = points.min(axis=0)
+    extent = points.max(axis=0) - low
+    extent[extent == 0] = 1.
+    scale = (2**MORTON_BITS - 1) / extent
+    cells = ((points - low) * scale).astype(np.uint32)
+    return (
+        (_spread_bits(cells[:, 0]) << 2) | (_spread_bits(cells[:, 1]) << 1)
+        | _spread_bits(cells[:, 2])
+    )
+
+
+def _dot(left, right):
+    return np.einsum('...i,...i->...', left, right)
+
+
+def ray_triangle(origins, directions, vert_a, vert_b, vert_c):
+    """Intersect rays with triangles, pairwise, from either side
+
+    Returns the distance along each ray, in multiples of direction,
+    and the barycentric coordinates of the hit; distance is inf where
+    the ray misses.
+    """
+    edge_ab = vert_b - vert_a
+    edge_ac = vert_c - vert_a
+    pvec = np.cross(directions, edge_ac)
+    det = _dot(edge_ab, pvec)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_det = 1. / det
+        tvec = origins - vert_a
+        weight_b = _dot(tvec, pvec) * inv_det
+        qvec = np.cross(tvec, edge_ab)
+        weight_c = _dot(directions, qvec) * inv_det
+        dist = _dot(edge_ac, qvec) * inv_det
+        hit = (
+            (det != 0) & (weight_b >= 0) & (weight_c >= 0)
+            & (weight_b + weight_c <= 1) & (dist >= 0)
+        )
+        bary = np.stack([1 - weight_b - weight_c, weight_b, weight_c], axis=-1)
+    return np.where(hit, dist, np.inf), bary
+
+
+def closest_on_triangle(points, vert_a, vert_b, vert_c):
+    """Barycentric coordinates of the closest point on each triangle
+
+    This follows the Voronoi region tests from Ericson, Real-Time
+    Collision Detection, section 5.1.5, evaluated for all regions at
+    once; later assignments correspond to earlier tests there. The
+    dot products d1 to d6 there are named for the edge and the vector
+    from vertex to point, for example ab_ap, and va, vb, and vc are
+    area_a, area_b, and area_c.
+    """
+    edge_ab = vert_b - vert_a
+    edge_ac = vert_c - vert_a
+    from_a = points - vert_a
+    from_b = points - vert_b
+    from_c = points - vert_c
+    ab_ap, ac_ap = _dot(edge_ab, from_a), _dot(edge_ac, from_a)
+    ab_bp, ac_bp = _dot(edge_ab, from_b), _dot(edge_ac, from_b)
+    ab_cp, ac_cp = _dot(edge_ab, from_c), _dot(edge_ac, from_c)
+    area_a = ab_bp * ac_cp - ab_cp * ac_bp
+    area_b = ab_cp * ac_ap - ab_ap * ac_cp
+    area_c = ab_ap * ac_bp - ab_bp * ac_ap
+    zero = np.zeros(area_a.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = area_a + area_b + area_c
+        weight_b = area_b / denom
+        weight_c = area_c / denom
+        bary = np.stack([1 - weight_b - weight_c, weight_b, weight_c], axis=-1)
+        regions = [
+            (
+                (area_a <= 0) & (ac_bp >= ab_bp) & (ab_cp >= ac_cp),
+                (ac_bp - ab_bp) / ((ac_bp - ab_bp) + (ab_cp - ac_cp)),
+                lambda frac: [zero, 1 - frac, frac],
+            ),
+            (
+                (area_b <= 0) & (ac_ap >= 0) & (ac_cp <= 0),
+                ac_ap / (ac_ap - ac_cp),
+                lambda frac: [1 - frac, zero, frac],
+            ),
+            (
+                (ac_cp >= 0) & (ab_cp <= ac_cp),
+                zero,
+                lambda frac: [zero, zero, frac + 1],
+            ),
+            (
+                (area_c <= 0) & (ab_ap >= 0) & (ab_bp <= 0),
+                ab_ap / (ab_ap - ab_bp),
+                lambda frac: [1 - frac, frac, zero],
+            ),
+            (
+                (ab_bp >= 0) & (ac_bp <= ab_bp),
+                zero,
+                lambda frac: [zero, frac + 1, zero],
+            ),
+            (
+                (ab_ap <= 0) & (ac_ap <= 0),
+                zero,
+                lambda frac: [frac + 1, zero, zero],
+            ),
+        ]
+        for inside, param, coords in regions:
+            bary[inside] = np.stack(coords(param), axis=-1)[inside]
+    # Degenerate triangles that fall through all tests use vertex a
+    bary[~np.all(np.isfinite(bary), axis=-1)] = [1., 0., 0.]
+    return bary
+
+
+class TriangleBVH(object):
+    """Bounding volume hierarchy over triangles of a mesh
+
+    Triangles are sorted by the Morton code of their centroids and
+    split into leaves of at most leaf_size consecutive triangles. The
+    tree is a complete binary tree stored as a heap: the children of
+    node i are 2i + 1 and 2i + 2, and only the node bounding boxes and
+    the triangle order are stored. Building the tree is a single sort
+    and a reduction per level, with no Python loop over nodes.
+
+    Queries are batched in chunks of up to QUERY_CHUNK_SIZE points or
+    rays, and traverse the tree one level at a time, testing all pairs
+    of query and node at that level at once. Results are
+    indices into the original triangles, with the barycentric
+    coordinates of the hit or closest point; these may be passed to
+    :code:`sample` to interpolate data on nodes or cells.
+
+    .. code::
+
+      bvh = TriangleBVH(vertices, triangles)
+      distances, indices, barycentrics = bvh.intersect(origins, directions)
+      values = bvh.sample(data.array.array, indices, barycentrics, 'nodes')
+    """
+
+    def __init__(self, vertices, triangles, leaf_size=LEAF_SIZE):
+        vertices = np.asarray(vertices, dtype=float)
+        triangles = np.asarray(triangles)
+        if vertices.ndim != 2 or vertices.shape[1] != 3:
+            raise ValueError(
+                'Vertices must be of shape N x 3, not {}'.format(
+                    vertices.shape
+                )
+            )
+        if (triangles.ndim != 2 or triangles.shape[1] != 3
+                or not triangles.size):
+            raise ValueError(
+                'TriangleBVH requires non-empty N x 3 triangles, not '
+                '{}'.format(triangles.shape)
+            )
+        if triangles.min() < 0 or triangles.max() >= vertices.shape[0]:
+            raise ValueError('Triangles refer to missing vertices')
+        self.vertices = vertices
+        self.triangles = triangles
+        self.leaf_size = max(int(leaf_size), 1)
+        self._build()
+
+    def _build(self):
+        corners = self.vertices[self.triangles]
+        self.order = np.argsort(
+            morton_codes(corners.mean(axis=1)), kind='mergesort'
+        )
+        corners = corners[self.order]
+        num_tris = len(self.order)
+        num_leaves = 1
+        while num_leaves * self.leaf_size < num_tris:
+            num_leaves *= 2
+        first_leaf = num_leaves - 1
+        bounds = np.arange(num_leaves + 1) * num_tris // num_leaves
+        self.start = np.zeros(first_leaf + num_leaves, dtype=int)
+        self.end = np.zeros(first_leaf + num_leaves, dtype=int)
+        self.start[first_leaf:] = bounds[:-1]
+        self.end[first_leaf:] = bounds[1:]
+        self.left = np.full(first_leaf + num_leaves, -1, dtype=int)
+        self.left[:first_leaf] = 2 * np.arange(first_leaf) + 1
+        self.low = np.full((first_leaf + num_leaves, 3), np.inf)
+        self.high = np.full((first_leaf + num_leaves, 3), -np.inf)
+        filled = bounds[:-1] < bounds[1:]
+        leaves = first_leaf + np.nonzero(filled)[0]
+        self.low[leaves] = np.minimum.reduceat(
+            corners.min(axis=1), bounds[:-1][filled], axis=0
+        )
+        self.high[leaves] = np.maximum.reduceat(
+            corners.max(axis=1), bounds[:-1][filled], axis=0
+        )
+        level = first_leaf
+        while level:
+            parents = np.arange((level - 1) // 2, level)
+            self.low[parents] = np.minimum(
+                self.low[2 * parents + 1], self.low[2 * parents + 2]
+            )
+            self.high[parents] = np.maximum(
+                self.high[2 * parents + 1], self.high[2 * parents + 2]
+            )
+            self.start[parents] = self.start[2 * parents + 1]
+            self.end[parents] = self.end[2 * parents + 2]
+            level = (level - 1) // 2
+
+    @property
+    def num_nodes(self):
+        """Number of nodes in the tree"""
+        return len(self.start)
+
+    def _box_distance(self, nodes, points):
+        """Squared distance from each point to its node bounding box"""
+        diff = np.maximum(self.low[nodes] - points, points - self.high[nodes])
+        return (np.maximum(diff, 0.)**2).sum(axis=1)
+
+    def _traverse(self, queries, bound, visit, best, upper=None):
+        """Visit leaves that may improve the best result of each query
+
+        The tree is complete, so all pairs of query and node are at the
+        same depth, and each level is tested in one vectorized pass.
+        bound(nodes, queries) is a lower bound on results in each node;
+        pairs where it is inf or exceeds best are skipped. Optionally,
+        upper is an upper bound on the best result in each node, used
+        to prune pairs before any leaves are visited. Leaves are visited in
+        rounds, nearest first for each query, calling
+        visit(nodes, queries) and pruning again between rounds; each
+        round visits twice as many leaves per query as the last.
+        """
+        nodes = np.zeros(len(queries), dtype=int)
+        while True:
+            lower = bound(nodes, queries)
+            limit = best[queries]
+            if upper is not None:
+                limit = best.copy()
+                np.minimum.at(limit, queries, upper(nodes, queries))
+                limit = limit[queries]
+            keep = (lower <= limit) & np.isfinite(lower)
+            queries, nodes, lower = queries[keep], nodes[keep], lower[keep]
+            if not queries.size:
+                return
+            if self.left[nodes[0]] < 0:
+                break
+            children = self.left[nodes]
+            nodes = np.stack([children, children + 1], axis=1).reshape(-1)
+            queries = np.repeat(queries, 2)
+        order = np.lexsort((lower, queries))
+        queries, nodes, lower = queries[order], nodes[order], lower[order]
+        starts = np.ones(len(queries), dtype=bool)
+        starts[1:] = queries[1:] != queries[:-1]
+        starts = np.nonzero(starts)[0]
+        sizes = np.diff(np.append(starts, len(queries)))
+        rank = np.arange(len(queries)) - np.repeat(starts, sizes)
+        low_rank, high_rank = 0, 1
+        while low_rank <= rank.max():
+            current = np.nonzero((rank >= low_rank) & (rank < high_rank))[0]
+            current = current[lower[current] <= best[queries[current]]]
+            if not current.size:
+                return
+            visit(nodes[current], queries[current])
+            low_rank, high_rank = high_rank, 2 * high_rank
+
+    def _leaf_triangles(self, nodes, queries):
+        """Expand pairs of leaf and query to pairs of triangle and query"""
+        counts = self.end[nodes] - self.start[nodes]
+        pairs = np.repeat(np.arange(len(nodes)), counts)
+        firsts = np.cumsum(counts) - counts
+        offsets = np.arange(len(pairs)) - np.repeat(firsts, counts)
+        indices = self.order[self.start[nodes][pairs] + offsets]
+        corners = self.vertices[self.triangles[indices]]
+        return (
+            queries[pairs], indices, corners[:, 0], corners[:, 1],
+            corners[:, 2]
+        )
+
+    @staticmethod
+    def _update(best, queries, dist, indices, bary):
+        """Keep the nearest result for each query if it is an improvement"""
+        order = np.lexsort((dist, queries))
+        queries = queries[order]
+        first = np.ones(len(queries), dtype=bool)
+        first[1:] = queries[1:] != queries[:-1]
+        order = order[first]
+        queries = queries[first]
+        closer = dist[order] < best[0][queries]
+        order, queries = order[closer], queries[closer]
+        best[0][queries] = dist[order]
+        best[1][queries] = indices[order]
+        best[2][queries] = bary[order]
+
+    def _chunks(self, num_queries, query, *args):
+        """Run query on chunks of args and concatenate the outputs"""
+        outputs = []
+        for start in range(0, num_queries, QUERY_CHUNK_SIZE):
+            stop = start + QUERY_CHUNK_SIZE
+            outputs.append(query(*[arg[start:stop] for arg in args]))
+        return tuple(np.concatenate(output) for output in zip(*outputs))
+
+    def intersect(self, origins, directions):
+        """Find the first triangle hit by each ray
+
+        origins and directions are M x 3 arrays. Returns distances
+        along each ray in multiples of its direction, triangle
+        indices, and M x 3 barycentric coordinates of the hits. Rays
+        that miss have distance inf, index -1, and barycentrics NaN.
+        Triangles are hit from either side.
+        """
+        origins = _as_points(origins, 3)
+        directions = _as_points(directions, 3)
+        if origins.shape != directions.shape:
+            raise ValueError('origins and directions must be the same shape')
+        if origins.shape[0] == 0:
+            return np.zeros(0), np.zeros(0, dtype=int), np.zeros((0, 3))
+        return self._chunks(
+            origins.shape[0], self._intersect_chunk, origins, directions
+        )
+
+    def _intersect_chunk(self, origins, directions):
+        best = (
+            np.full(origins.shape[0], np.inf),
+            np.full(origins.shape[0], -1, dtype=int),
+            np.full((origins.shape[0], 3), np.nan),
+        )
+        with np.errstate(divide='ignore'):
+            inv_dirs = 1. / directions
+
+        def bound(nodes, queries):
+            with np.errstate(invalid='ignore'):
+                near = (self.low[nodes] - origins[queries]) * inv_dirs[queries]
+                far = (self.high[nodes] - origins[queries]) * inv_dirs[queries]
+            t_near = np.maximum(np.fmax.reduce(np.fmin(near, far), axis=1), 0)
+            t_far = np.fmin.reduce(np.fmax(near, far), axis=1)
+            missed = (t_far < t_near) | ~np.isfinite(self.low[nodes, 0])
+            return np.where(missed, np.inf, t_near)
+
+        def visit(nodes, queries):
+            queries, indices, vert_a, vert_b, vert_c = self._leaf_triangles(
+                nodes, queries
+            )
+            dist, bary = ray_triangle(
+                origins[queries], directions[queries], vert_a, vert_b, vert_c
+            )
+            hit = np.isfinite(dist)
+            self._update(
+                best, queries[hit], dist[hit], indices[hit], bary[hit]
+            )
+
+        self._traverse(np.arange(origins.shape[0]), bound, visit, best[0])
+        return best
+
+    def closest_point(self, points):
+        """Find the closest point on the mesh to each query point
+
+        Returns distances, triangle indices, and M x 3 barycentric
+        coordinates of the closest points for M query points.
+        """
+        points = _as_points(points, 3)
+        if points.shape[0] == 0:
+            return np.zeros(0), np.zeros(0, dtype=int), np.zeros((0, 3))
+        return self._chunks(points.shape[0], self._closest_chunk, points)
+
+    def _closest_chunk(self, points):
+        best = (
+            np.full(points.shape[0], np.inf),
+            np.full(points.shape[0], -1, dtype=int),
+            np.zeros((points.shape[0], 3)),
+        )
+
+        def bound(nodes, queries):
+            return self._box_distance(nodes, points[queries])
+
+        def upper(nodes, queries):
+            """Squared distance to the farthest corner of each box"""
+            diff = np.maximum(
+                np.abs(self.low[nodes] - points[queries]),
+                np.abs(points[queries] - self.high[nodes]),
+            )
+            return (diff**2).sum(axis=1)
+
+        def visit(nodes, queries):
+            queries, indices, vert_a, vert_b, vert_c = self._leaf_triangles(
+                nodes, queries
+            )
+            bary = closest_on_triangle(points[queries], vert_a, vert_b, vert_c)
+            closest = (
+                bary[:, 0:1] * vert_a + bary[:, 1:2] * vert_b +
+                bary[:, 2:3] * vert_c
+            )
+            dist = ((closest - points[queries])**2).sum(axis=1)
+            self._update(best, queries, dist, indices, bary)
+
+        self._traverse(
+            np.arange(points.shape[0]), bound, visit, best[0], upper
+        )
+        return np.sqrt(best[0]), best[1], best[2]
+
+    def sample(self, values, indices, barycentrics, location='nodes'):
+        """Sample data at hits or closest points on the mesh
+
+        values is an array of data on the mesh vertices if location is
+        'nodes', interpolated with the barycentric coordinates, or on
+        the triangles if location is 'cells'. indices and barycentrics
+        are returned by :code:`intersect` or :code:`closest_point`.
+        Samples where index is -1 are NaN.
+        """
+        values = np.asarray(values)
+        indices = np.asarray(indices)
+        if location == 'nodes':
+            expected = self.vertices.shape[0]
+        elif location == 'cells':
+            expected = self.triangles.shape[0]
+        else:
+            raise ValueError(
+                "location must be 'nodes' or 'cells', not {}".format(location)
+            )
+        if values.shape[0] != expected:
+            raise ValueError(
+                'Length of values on {} must be {}, not {}'.format(
+                    location, expected, values.shape[0]
+                )
+            )
+        missed = indices < 0
+        indices = np.where(missed, 0, indices)
+        if location == 'cells':
+            output = values[indices].astype(float)
+        else:
+            corners = values[self.triangles[indices]].astype(float)
+            weights = np.asarray(barycentrics, dtype=float)
+            weights = weights.reshape(
+                weights.shape + (1, ) * (corners.ndim - 2)
+            )
+            output = (corners * weights).sum(axis=1)
+        output[missed] = np.nan
+        return output
@@ -0,0 +1,270 @@
+"""Caches of exported OMF objects and serialized snapshots"""
+from collections import OrderedDict
+import functools
+import threading
+import zlib
+
+from lfview.resources import files
+import numpy as np
+import properties
+
+from . import jsonio
+from .arrays import FINGERPRINT_SAMPLES, fingerprint
+from .context import ContextStack, ExportContext
+from .instances import _clone
+
+OMF_CACHE_BYTES = 2**30
+SNAPSHOT_CACHE_SIZE = 1024
+
+
+class LRUCache(object):
+    """Thread-safe least-recently-used cache bounded by total size
+
+    Each value has a size, given by sizeof(value), or 1 if sizeof is
+    None. Once the total size exceeds max_size, least-recently-used
+    values are evicted; values larger than max_size are never cached.
+    Lookups with :code:`get` are counted as hits or misses.
+    """
+
+    def __init__(self, max_size, sizeof=None):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return cached value for key, or None"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Cache value, evicting least-recently-used values as needed"""
+        size = 1 if self.sizeof is None else self.sizeof(value)
+        if size > self.max_size:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self.size -= old_size
+
+    def clear(self):
+        """Remove all cached values"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def content_key(value):
+    """Return a hashable key that changes when value content changes
+
+    Resources are keyed on their class and the keys of all property
+    values, recursively. Large numpy arrays, including those of
+    :class:`lfview.resources.files.Array` resources, are keyed on their
+    :func:`lfview.resources.spatial.arrays.fingerprint`; small arrays
+    and image files are keyed on their full content.
+    """
+    if isinstance(value, properties.HasProperties):
+        backend = value._backend  #pylint: disable=protected-access
+        key = [value.__class__.__name__]
+        for name in sorted(backend):
+            key.append((name, content_key(backend[name])))
+        if isinstance(value, files.Array):
+            key.append(content_key(value.array))
+        elif isinstance(value, files.Image) and value.image is not None:
+            value.image.seek(0, 0)
+            key.append(zlib.crc32(value.image.read()) & 0xffffffff)
+            value.image.seek(0, 0)
+        return tuple(key)
+    if isinstance(value, np.ndarray):
+        if value.size > FINGERPRINT_SAMPLES:
+            return fingerprint(value)
+        return (value.shape, value.dtype.str, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(content_key(val) for val in value)
+    if isinstance(value, dict):
+        return tuple((key, content_key(val)) for key, val in value.items())
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def omf_nbytes(value):
+    """Approximate size of an OMF object as the total bytes of its arrays"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, properties.HasProperties):
+        backend = value._backend  #pylint: disable=protected-access
+        return sum(omf_nbytes(val) for val in backend.values())
+    if isinstance(value, (list, tuple)):
+        return sum(omf_nbytes(val) for val in value)
+    return 0
+
+
+class OMFCache(ContextStack, LRUCache):
+    """Least-recently-used cache of to_omf results
+
+    While a cache is active on the current thread, :code:`to_omf` on
+    any spatial resource returns the previous result if the resource
+    uid, to_omf arguments, and :func:`content_key` are unchanged. This
+    allows repeated export of a project to reuse everything that has
+    not been modified, including unmodified data and mappings of
+    modified elements.
+
+    .. code::
+
+      cache = OMFCache()
+      with cache:
+          omf_element = element.to_omf()
+      element.name = 'new name'
+      with cache:
+          omf_element = element.to_omf()  # data is reused
+
+    The cache is bounded by max_bytes, the approximate total size of
+    arrays in cached results; the default is 1 GB. Results larger than
+    max_bytes are never cached. Cached OMF objects are returned
+    directly, not copied, so they must not be modified. Content keys
+    use array fingerprints, so in-place modification of array values
+    that are not sampled by the fingerprint is not detected; reassign
+    the array instead.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, max_bytes=OMF_CACHE_BYTES):
+        super(OMFCache, self).__init__(max_bytes, sizeof=omf_nbytes)
+
+    @property
+    def max_bytes(self):
+        """Maximum approximate total bytes of cached results"""
+        return self.max_size
+
+    @property
+    def nbytes(self):
+        """Approximate total bytes of cached results"""
+        return self.size
+
+    @staticmethod
+    def key(resource, args=(), kwargs=None):
+        """Return the cache key for resource.to_omf(*args, **kwargs)"""
+        return (
+            resource.__class__.__name__,
+            getattr(resource, 'uid', None),
+            content_key(args),
+            content_key(kwargs or {}),
+            content_key(resource),
+        )
+
+
+def with_export_context(func):
+    """Decorator to run a to_omf method within an ExportContext
+
+    If a context is already active, it is reused so validation is
+    shared across the entire export pass. If an :class:`OMFCache` is
+    active, cached results are returned for unchanged resources.
+    """
+
+    def run(*args, **kwargs):
+        if ExportContext.active() is not None:
+            return func(*args, **kwargs)
+        with ExportContext():
+            return func(*args, **kwargs)
+
+    @functools.wraps(func)
+    def wrapped(self, *args, **kwargs):
+        cache = OMFCache.active()
+        if cache is None:
+            return run(self, *args, **kwargs)
+        key = cache.key(self, args, kwargs)
+        result = cache.get(key)
+        if result is None:
+            result = run(self, *args, **kwargs)
+            cache.put(key, result)
+        return result
+
+    return wrapped
+
+
+class SnapshotCache(object):
+    """Bounded cache of snapshot JSON strings and deserialized instances
+
+    Many elements share identical :class:`InstanceSnapshot` values,
+    for example default options. This cache allows serializing each
+    distinct snapshot to JSON, and deserializing and validating each
+    distinct JSON string, only once.
+
+    Serialized strings are keyed on the instance
+    :func:`content_key` and serialize keyword arguments; this is
+    cheaper than serializing. Deserialized instances are keyed on the
+    JSON string and instance class, and every lookup returns a new
+    copy, so instances are never shared between resources. Each
+    cache holds at most max_entries values, with least-recently-used
+    values evicted first.
+    """
+
+    def __init__(self, max_entries=SNAPSHOT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._serialized = LRUCache(max_entries)
+        self._deserialized = LRUCache(max_entries)
+
+    @property
+    def hits(self):
+        """Number of lookups served from the cache"""
+        return self._serialized.hits + self._deserialized.hits
+
+    @property
+    def misses(self):
+        """Number of lookups not served from the cache"""
+        return self._serialized.misses + self._deserialized.misses
+
+    def serialize(self, val, **kwargs):
+        """Return JSON string of val.serialize(**kwargs)"""
+        key = (
+            jsonio.get_json_backend().name,
+            val.__class__,
+            content_key(val),
+            content_key(kwargs),
+        )
+        output = self._serialized.get(key)
+        if output is None:
+            output = jsonio.dumps(val.serialize(**kwargs))
+            self._serialized.put(key, output)
+        return output
+
+    def deserialize(self, instance_class, val, **kwargs):
+        """Return a new instance deserialized from JSON string val"""
+        key = (instance_class, val, content_key(kwargs))
+        instance = self._deserialized.get(key)
+        if instance is None:
+            instance = instance_class.deserialize(jsonio.loads(val), **kwargs)
+            self._deserialized.put(key, instance)
+        return _clone(instance)
+
+    def clear(self):
+        """Remove all cached values"""
+        self._serialized.clear()
+        self._deserialized.clear()
+
+    def __len__(self):
+        return len(self._serialized) + len(self._deserialized)
+
+
+SNAPSHOT_CACHE = SnapshotCache()
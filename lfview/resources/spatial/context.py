@@ -0,0 +1,129 @@
+"""Thread-local contexts that are active during export of spatial resources"""
+import threading
+
+
+class ContextStack(object):
+    """Mixin for context managers that are active on the current thread
+
+    Entering an instance pushes it on a thread-local stack, and
+    :code:`active()` returns the innermost instance entered on the
+    current thread. Instances may be nested, and may be entered on
+    several threads at once. Each subclass must define its own
+    :code:`_local = threading.local()` so its stack is separate.
+    """
+
+    _local = None
+
+    @classmethod
+    def active(cls):
+        """Return the innermost instance active on this thread, or None"""
+        stack = getattr(cls._local, 'stack', None)
+        if not stack:
+            return None
+        return stack[-1]
+
+    def __enter__(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(self)
+        return self
+
+    def __exit__(self, *args):
+        self._local.stack.remove(self)
+
+
+class ExportContext(ContextStack):
+    """Context for an export pass that validates each resource only once
+
+    While a context is active on the current thread, calling
+    :code:`validate()` on a spatial resource that was already validated
+    during the pass is skipped. Resources are tracked by uid if
+    available, otherwise by object identity. This avoids re-validating
+    shared data and mappings throughout the resource graph.
+
+    .. code::
+
+      with ExportContext() as context:
+          omf_element = element.to_omf()
+      print(context.skipped)
+
+    If no context is active, :code:`to_omf` creates one for the
+    duration of the call.
+
+    A context may be entered on several threads at once, as by
+    :class:`lfview.resources.spatial.export.ProjectExporter`. A
+    resource is only recorded as validated once its validation
+    succeeds; until then, other threads that validate it wait for the
+    result.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._validated = {}
+        self._pending = {}
+        self._waiting = {}
+        self.validated = 0
+        self.skipped = 0
+
+    @staticmethod
+    def _key(resource):
+        return getattr(resource, 'uid', None) or id(resource)
+
+    def _waits_on(self, owner, thread):
+        """Return True if owner is waiting, directly or not, on thread"""
+        while owner is not None:
+            if owner is thread:
+                return True
+            key = self._waiting.get(owner)
+            owner = None if key is None else self._pending.get(key)
+        return False
+
+    def claim(self, resource):
+        """Return True if resource should be validated by the caller
+
+        This is False if resource was already validated in this pass.
+        If another thread is validating resource, this waits for it to
+        finish, then returns False if validation succeeded or claims
+        resource if it failed. Resources being validated by the caller,
+        or by threads waiting on the caller, are not waited on, since
+        they are already being validated further up the stack.
+
+        After validating a claimed resource, call :code:`finish` if
+        validation succeeded or :code:`release` if it failed.
+        """
+        key = self._key(resource)
+        thread = threading.current_thread()
+        with self._condition:
+            while True:
+                if key in self._validated:
+                    self.skipped += 1
+                    return False
+                owner = self._pending.get(key)
+                if owner is None:
+                    self._pending[key] = thread
+                    return True
+                if self._waits_on(owner, thread):
+                    self.skipped += 1
+                    return False
+                self._waiting[thread] = key
+                try:
+                    self._condition.wait()
+                finally:
+                    self._waiting.pop(thread, None)
+
+    def finish(self, resource):
+        """Record that a claimed resource was validated in this pass"""
+        key = self._key(resource)
+        with self._condition:
+            self._pending.pop(key, None)
+            self._validated[key] = resource
+            self.validated += 1
+            self._condition.notify_all()
+
+    def release(self, resource):
+        """Release a claimed resource that failed validation"""
+        with self._condition:
+            self._pending.pop(self._key(resource), None)
+            self._condition.notify_all()
@@ -1,14 +1,93 @@
 """Data objects that hold numeric attributes and mapping to elements"""
+from collections import OrderedDict
+
 from lfview.resources.files import Array
 import numpy as np
-import omf
 import properties
 from properties.extras import Pointer
 from six import string_types
 
-from .base import _BaseResource
+from .arrays import omf_array, record_copy, wrap_array
+from .base import _BaseResource, LazyModule
+from .cache import with_export_context
 from .mappings import MappingCategory, MappingDiscrete, MappingContinuous
 
+omf = LazyModule('omf')  #pylint: disable=invalid-name
+
+CHUNK_SIZE = 2**20
+OMF_LOCATIONS = {
+    'vertices': 'nodes',
+    'segments': 'cells',
+    'faces': 'cells',
+    'cells': 'cells',
+}
+
+
+def _merge_unique(left, right):
+    """Merge two sorted arrays of unique values into one
+
+    A stable sort of the two sorted runs takes close to linear time.
+    """
+    merged = np.sort(np.concatenate([left, right]), kind='mergesort')
+    keep = np.ones(merged.size, dtype=bool)
+    keep[1:] = merged[1:] != merged[:-1]
+    return merged[keep]
+
+
+def remap_categories(array, indices, chunk_size=CHUNK_SIZE):
+    """Remap category array values to contiguous legend indices
+
+    Each unique value in the array is replaced by its position in the
+    sorted unique values, or -1 if the value is not present in the
+    given mapping indices. This returns the remapped array and an
+    OrderedDict from original value to new index, in sorted order.
+
+    If the range of values is small, a lookup table is used;
+    otherwise, sorted unique values are merged chunk-by-chunk with
+    NumPy and each chunk is remapped by binary search. Either way, the
+    array is only ever traversed chunk-by-chunk, and besides the
+    output array, allocations scale with the range or number of
+    unique values plus chunk_size.
+    """
+    array = np.asarray(array).ravel()
+    output = np.empty(array.size, dtype=int)
+    if not array.size:
+        return output, OrderedDict()
+    chunk_size = max(int(chunk_size), 1)
+    chunks = [
+        slice(start, start + chunk_size)
+        for start in range(0, array.size, chunk_size)
+    ]
+    low = min(int(array[chunk].min()) for chunk in chunks)
+    high = max(int(array[chunk].max()) for chunk in chunks)
+    span = high - low + 1
+    if span <= max(array.size, 2**16):
+        present = np.zeros(span, dtype=bool)
+        for chunk in chunks:
+            present[array[chunk].astype(np.int64) - low] = True
+        unique_values = np.flatnonzero(present) + low
+    else:
+        present = None
+        unique_values = np.unique(array[chunks[0]])
+        for chunk in chunks[1:]:
+            unique_values = _merge_unique(
+                unique_values, np.unique(array[chunk])
+            )
+    new_indices = np.arange(unique_values.size, dtype=int)
+    new_indices[~np.isin(unique_values, list(indices))] = -1
+    if present is not None:
+        table = np.full(span, -1, dtype=int)
+        table[present] = new_indices
+        for chunk in chunks:
+            output[chunk] = table[array[chunk].astype(np.int64) - low]
+    else:
+        for chunk in chunks:
+            output[chunk] = new_indices[np.searchsorted(
+                unique_values, array[chunk]
+            )]
+    index_map = OrderedDict(zip(unique_values.tolist(), new_indices.tolist()))
+    return output, index_map
+
 
 class _BaseData(_BaseResource):
     """Base class for data objects"""
@@ -67,6 +146,7 @@ class DataBasic(_BaseData):
                 instance=self,
             )
 
+    @with_export_context
     def to_omf(self, cell_location):
         self.validate()
         if self.location == 'nodes':
@@ -77,10 +157,23 @@ class DataBasic(_BaseData):
             name=self.name or '',
             description=self.description or '',
             location=location,
-            array=self.array.array,
+            array=omf_array(omf.ScalarArray, self.array.array),
         )
         return omf_data
 
+    @classmethod
+    def from_omf(cls, omf_data):
+        """Create data from omf.ScalarData
+
+        The data array is wrapped without copying if possible.
+        """
+        return cls(
+            name=omf_data.name,
+            description=omf_data.description,
+            location=OMF_LOCATIONS[omf_data.location],
+            array=wrap_array(omf_data.array.array),
+        )
+
 
 class DataCategory(DataBasic):
     """Category attribute data
@@ -123,36 +216,76 @@ class DataCategory(DataBasic):
                 instance=self,
             )
 
+    @with_export_context
     def to_omf(self, cell_location):
         self.validate()
         if self.location == 'nodes':
             location = 'vertices'
         else:
             location = cell_location
-        all_mapping_indices = set(
-            sum(
-                [
-                    mapping.indices
-                    for mapping in [self.categories] + self.mappings
-                ], []
-            )
+        all_mappings = [self.categories] + self.mappings
+        lookups = {}
+        for mapping in all_mappings:
+            if id(mapping) not in lookups:
+                lookups[id(mapping)] = mapping.value_lookup()
+        all_mapping_indices = set()
+        for lookup in lookups.values():
+            all_mapping_indices.update(lookup)
+        output_array, index_map = remap_categories(
+            self.array.array, all_mapping_indices
         )
-        all_array_indices = sorted(set(self.array.array))
-        index_map = {}
-        for i, array_index in enumerate(all_array_indices):
-            if array_index in all_mapping_indices:
-                index_map[array_index] = i
-            else:
-                index_map[array_index] = -1
-        output_array = np.array([index_map[val] for val in self.array.array])
+        record_copy('remap', output_array.nbytes)
         omf_data = omf.MappedData(
             name=self.name or '',
             description=self.description or '',
             location=location,
-            array=output_array,
+            array=omf_array(omf.ScalarArray, output_array),
             legends=[
-                mapping.to_omf(index_map)
-                for mapping in [self.categories] + self.mappings
+                mapping.to_omf(index_map, lookups[id(mapping)])
+                for mapping in all_mappings
             ],
         )
         return omf_data
+
+    @classmethod
+    def from_omf(cls, omf_data):
+        """Create category data from omf.MappedData
+
+        The first legend becomes the categories mapping and any others
+        become additional mappings. Array values of -1 have no
+        corresponding category index, so they remain no-data.
+        ValueError is raised if the MappedData has no legends.
+        """
+        if not omf_data.legends:
+            raise ValueError(
+                'Cannot create DataCategory from MappedData {} with no '
+                'legends'.format(omf_data.name)
+            )
+        legends = [
+            MappingCategory.from_omf(legend) for legend in omf_data.legends
+        ]
+        return cls(
+            name=omf_data.name,
+            description=omf_data.description,
+            location=OMF_LOCATIONS[omf_data.location],
+            array=wrap_array(omf_data.array.array),
+            categories=legends[0],
+            mappings=legends[1:],
+        )
+
+
+def data_from_omf(omf_data):
+    """Create spatial data from OMF data, or None if unsupported
+
+    omf.ScalarData becomes DataBasic and omf.MappedData becomes
+    DataCategory. MappedData with no legends has no categories, so
+    its index array becomes DataBasic. Other OMF data types have no
+    spatial equivalent.
+    """
+    if isinstance(omf_data, omf.MappedData):
+        if not omf_data.legends:
+            return DataBasic.from_omf(omf_data)
+        return DataCategory.from_omf(omf_data)
+    if isinstance(omf_data, omf.ScalarData):
+        return DataBasic.from_omf(omf_data)
+    return None
@@ -0,0 +1,249 @@
+"""Compute and apply minimal patches between versions of resource graphs"""
+from lfview.resources import files
+import numpy as np
+import properties
+
+from .base import _BaseResource
+from .batch import _deserialize, resolve_pointers, resource_class
+from .context import ExportContext
+
+
+def _uid_map(resources):
+    uids = {}
+    for resource in resources:
+        if not resource.uid:
+            raise ValueError(
+                'Resources must have uids to diff: {}'.format(resource)
+            )
+        uids[resource.uid] = resource
+    return uids
+
+
+def _array_files(value, pointer_uids):
+    """Return all Array resources in value, in a fixed order
+
+    Resources in pointer_uids are diffed separately, so their arrays
+    are not included. Properties are visited in name order, so the
+    order is the same for a value and its deserialized copy.
+    """
+    if isinstance(value, files.Array):
+        return [value]
+    if isinstance(value, list):
+        return [
+            arr for val in value for arr in _array_files(val, pointer_uids)
+        ]
+    if (isinstance(value, properties.HasProperties)
+            and id(value) not in pointer_uids):
+        backend = value._backend  #pylint: disable=protected-access
+        return _array_files(
+            [backend[name] for name in sorted(backend)], pointer_uids
+        )
+    return []
+
+
+def _arrays(value, pointer_uids):
+    """Return the numpy arrays of all Array resources in value"""
+    return [arr.array for arr in _array_files(value, pointer_uids)]
+
+
+def _equal(old_value, new_value, old_serial, new_serial, pointer_uids):
+    """Check if two property values are the same
+
+    Serialized values are compared first. Since serialized Arrays
+    only include metadata, array values are also compared.
+    """
+    if old_value is new_value:
+        return True
+    if old_serial != new_serial:
+        return False
+    old_arrays = _arrays(old_value, pointer_uids)
+    new_arrays = _arrays(new_value, pointer_uids)
+    if len(old_arrays) != len(new_arrays):
+        return False
+    return all(
+        old is new or np.array_equal(old, new)
+        for old, new in zip(old_arrays, new_arrays)
+    )
+
+
+def _serialize(resource, pointer_uids):
+    return super(_BaseResource, resource).serialize(
+        include_class=True,
+        pointer_uids=pointer_uids,
+    )
+
+
+def _serialize_prop(resource, name, pointer_uids):
+    prop = resource._props[name]  #pylint: disable=protected-access
+    value = resource._backend.get(name)  #pylint: disable=protected-access
+    if value is None:
+        return None
+    return prop.serialize(
+        value,
+        include_class=True,
+        pointer_uids=pointer_uids,
+    )
+
+
+def _add_arrays(patch, resource, names, pointer_uids):
+    """Save array data of resource properties in the patch"""
+    arrays = {}
+    for name in names:
+        value = resource._backend.get(name)  #pylint: disable=protected-access
+        data = _arrays(value, pointer_uids)
+        if data:
+            arrays[name] = data
+    if arrays:
+        patch['arrays'][resource.uid] = arrays
+
+
+def _set_arrays(resource, name, value, arrays):
+    """Fill in the data of Arrays in a deserialized property value
+
+    Raises a ValueError if an Array has no data in the patch, rather
+    than silently patching in an empty Array.
+    """
+    array_files = _array_files(value, {})
+    data = arrays.get(resource.uid, {}).get(name, [])
+    if len(data) != len(array_files):
+        raise ValueError(
+            'Patch is missing array data for {} of {}'.format(
+                name, resource.uid
+            )
+        )
+    for array_file, array in zip(array_files, data):
+        if array is None:
+            raise ValueError(
+                'Patch has no data for an Array in {} of {}'.format(
+                    name, resource.uid
+                )
+            )
+        array_file.array = array
+
+
+def diff_resources(old, new):
+    """Return a minimal patch from the old to the new resource graph
+
+    old and new are lists of spatial resources, for example,
+    elements, data, mappings, and textures, identified by uid. The
+    patch is a dictionary of :code:`'added'` resources, as serialized
+    by :func:`lfview.resources.spatial.batch.serialize_resources`,
+    :code:`'removed'` uids, and :code:`'changed'` properties, as a
+    dictionary of uid to a dictionary of property name to serialized
+    value. Properties that were unset in the new graph have value
+    None. Pointers to resources in the new graph are serialized as
+    uids.
+
+    As with :code:`serialize`, serialized Arrays only include
+    metadata. Array data of added and changed values is included in
+    :code:`'arrays'`, a dictionary of uid to a dictionary of property
+    name to a list of numpy arrays, in the order the Arrays appear in
+    the value. These are referenced, not copied, and are not JSON
+    serializable.
+
+    Property values that are the same object in both graphs are not
+    serialized or compared, so diffing versions that share unchanged
+    values costs roughly in proportion to the change.
+    """
+    old_uids = _uid_map(old)
+    new_uids = _uid_map(new)
+    pointer_uids = {id(resource): uid for uid, resource in new_uids.items()}
+    old_pointer_uids = {
+        id(resource): uid
+        for uid, resource in old_uids.items()
+    }
+    all_pointer_uids = dict(old_pointer_uids)
+    all_pointer_uids.update(pointer_uids)
+    patch = {
+        'added': [
+            _serialize(resource, pointer_uids)
+            for uid, resource in new_uids.items()
+            if uid not in old_uids
+        ],
+        'removed': [uid for uid in old_uids if uid not in new_uids],
+        'changed': {},
+        'arrays': {},
+    }
+    #pylint: disable=protected-access
+    for uid, resource in new_uids.items():
+        if uid not in old_uids:
+            _add_arrays(patch, resource, list(resource._backend), pointer_uids)
+    for uid, new_resource in new_uids.items():
+        old_resource = old_uids.get(uid)
+        if old_resource is None:
+            continue
+        if old_resource.__class__ is not new_resource.__class__:
+            patch['removed'].append(uid)
+            patch['added'].append(_serialize(new_resource, pointer_uids))
+            _add_arrays(
+                patch, new_resource, list(new_resource._backend), pointer_uids
+            )
+            continue
+        changes = {}
+        for name in new_resource._props:
+            if name == 'uid':
+                continue
+            old_value = old_resource._backend.get(name)
+            new_value = new_resource._backend.get(name)
+            if old_value is new_value:
+                continue
+            old_serial = _serialize_prop(old_resource, name, old_pointer_uids)
+            new_serial = _serialize_prop(new_resource, name, pointer_uids)
+            if not _equal(old_value, new_value, old_serial, new_serial,
+                          all_pointer_uids):
+                changes[name] = new_serial
+        if changes:
+            patch['changed'][uid] = changes
+            _add_arrays(patch, new_resource, list(changes), pointer_uids)
+    return patch
+
+
+def apply_patch(resources, patch, validate=True, **kwargs):
+    """Apply a patch from :func:`diff_resources` to a resource graph
+
+    Resources are modified in place and the updated list is returned,
+    with removed resources dropped and added resources appended.
+    Array data is taken from :code:`'arrays'` in the patch; a
+    ValueError is raised if an added or changed Array has no data.
+    Pointer uids in changed and added values are replaced by the
+    resources they refer to. If validate is True (the default),
+    changed and added resources are validated in a single pass.
+    Keyword arguments are passed to the property deserializers.
+    """
+    _uid_map(resources)
+    removed = set(patch.get('removed', []))
+    output = [
+        resource for resource in resources if resource.uid not in removed
+    ]
+    added = [
+        _deserialize(resource_class(value), value, **kwargs)
+        for value in patch.get('added', [])
+    ]
+    arrays = patch.get('arrays', {})
+    #pylint: disable=protected-access
+    for resource in added:
+        for name, value in resource._backend.items():
+            _set_arrays(resource, name, value, arrays)
+    output += added
+    uids = {resource.uid: resource for resource in output}
+    modified = list(added)
+    for uid, changes in patch.get('changed', {}).items():
+        resource = uids.get(uid)
+        if resource is None:
+            raise ValueError('Patched resource not found: {}'.format(uid))
+        for name, value in changes.items():
+            prop = resource._props[name]
+            if value is None:
+                resource._backend.pop(name, None)
+                continue
+            value = prop.deserialize(value, **kwargs)
+            _set_arrays(resource, name, value, arrays)
+            resource._backend[name] = prop.validate(resource, value)
+        modified.append(resource)
+    for resource in modified:
+        resolve_pointers(resource, uids)
+    if validate:
+        with ExportContext():
+            for resource in modified:
+                resource.validate()
+    return output
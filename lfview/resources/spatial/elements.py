@@ -2,13 +2,24 @@
 
 from lfview.resources.files import Array
 import numpy as np
-import omf
 import properties
 from properties.extras import Pointer
 from six import string_types
 
-from .base import _BaseResource, InstanceSnapshot
-from .data import DataBasic, DataCategory
+from .arrays import (
+    array_bounds,
+    array_stats,
+    fingerprint,
+    in_bounds,
+    omf_array,
+    wrap_array,
+)
+from .base import _BaseResource, InstanceSnapshot, LazyModule
+from .cache import with_export_context
+from .data import DataBasic, DataCategory, data_from_omf
+from .grids import GridLocator
+from .bvh import TriangleBVH
+from .kdtree import KDTree
 from .options import (
     OptionsPoints,
     OptionsLines,
@@ -19,6 +30,81 @@ from .options import (
 )
 from .textures import TextureProjection
 
+omf = LazyModule('omf')  #pylint: disable=invalid-name
+
+
+def _vertex_bounds(vertices):
+    """Bounds of a vertices Array, or None if vertices are not available"""
+    if not isinstance(vertices, Array) or vertices.array is None:
+        return None
+    if not vertices.array.size:
+        return None
+    return array_bounds(vertices.array).astype(float)
+
+
+class _VertexBoundsMixin(object):
+    """Bounds of elements with vertices, shared by point, line, and surface"""
+
+    @property
+    def bounds(self):
+        """Axis-aligned bounding box as 2 x 3 array of min and max corners
+
+        This is computed in a single pass over vertices and cached on
+        the vertex array fingerprint. It is recomputed when vertices
+        are reassigned, or after an in-place edit that changes the
+        fingerprint; edits to values the fingerprint does not sample
+        may return stale bounds. It is None if vertices are not
+        available.
+        """
+        return _vertex_bounds(self.vertices)  #pylint: disable=no-member
+
+
+def _cached_index(element, name, arrays, build):
+    """Build a spatial index of arrays, or return the cached index
+
+    The index is cached on the element as name, with the arrays and
+    their fingerprints. It is rebuilt if any array is reassigned or
+    its fingerprint changes; in-place edits to values the fingerprint
+    does not sample are not detected. None is returned if any array
+    is not available.
+    """
+    if any(not isinstance(arr, Array) or arr.array is None
+           or not arr.array.size for arr in arrays):
+        return None
+    arrays = [arr.array for arr in arrays]
+    keys = [fingerprint(arr) for arr in arrays]
+    cached = getattr(element, name, None)
+    if (cached is None or len(cached[0]) != len(arrays)
+            or any(old is not new for old, new in zip(cached[0], arrays))
+            or cached[1] != keys):
+        cached = (arrays, keys, build(*arrays))
+        setattr(element, name, cached)
+    return cached[2]
+
+
+def _grid_bounds(origin, axes, ranges):
+    """Bounds of a grid from the range of its coordinates along each axis
+
+    Coordinates along each axis vary independently, so the minimum and
+    maximum of each axis contribute separately to the bounds in each
+    dimension; no node coordinates are computed.
+    """
+    low = np.array(origin, dtype=float)
+    high = low.copy()
+    for axis, axis_range in zip(axes, ranges):
+        ends = np.outer(axis_range, axis)
+        low += ends.min(axis=0)
+        high += ends.max(axis=0)
+    return np.array([low, high])
+
+
+def _vertices_from_omf(geometry):
+    """Wrap OMF geometry vertices, offset by the geometry origin"""
+    vertices = geometry.vertices.array
+    if np.any(geometry.origin):
+        vertices = vertices + geometry.origin
+    return wrap_array(vertices)
+
 
 class _BaseElement(_BaseResource):
     """Base class for elements"""
@@ -48,6 +134,15 @@ class _BaseElement(_BaseResource):
         """Number of cells"""
         raise NotImplementedError()
 
+    @property
+    def bounds(self):
+        """Axis-aligned bounding box as 2 x 3 array of min and max corners
+
+        This is None if the geometry is not available, for example,
+        if it is only a uid.
+        """
+        raise NotImplementedError()
+
     @property
     def location_lengths(self):
         lengths = {
@@ -56,6 +151,29 @@ class _BaseElement(_BaseResource):
         }
         return lengths
 
+    @classmethod
+    def _from_omf_element(cls, omf_element, **kwargs):
+        """Create element with name, description, data, and color from OMF
+
+        OMF data types without a spatial equivalent are skipped.
+        Additional keyword arguments, e.g. geometry, are passed to
+        the element constructor.
+        """
+        data = [data_from_omf(omf_data) for omf_data in omf_element.data]
+        data = [item for item in data if item is not None]
+        data += [
+            TextureProjection.from_omf(omf_texture)
+            for omf_texture in getattr(omf_element, 'textures', None) or []
+        ]
+        element = cls(
+            name=omf_element.name,
+            description=omf_element.description,
+            data=data,
+            **kwargs
+        )
+        element.defaults.color.value = omf_element.color
+        return element
+
     @properties.validator
     def _validate_data(self):
         """Check if element is built correctly"""
@@ -208,7 +326,7 @@ class _BaseElementVolume(_BaseElement):
     )
 
 
-class ElementPointSet(_BaseElementPointSet):
+class ElementPointSet(_VertexBoundsMixin, _BaseElementPointSet):
     """Point-set element with geometry defined array of vertices"""
 
     SUB_TYPE = 'pointset'
@@ -231,6 +349,24 @@ class ElementPointSet(_BaseElementPointSet):
         """Number of cell centers (same as nodes)"""
         return self.num_nodes
 
+    @property
+    def kdtree(self):
+        """KD-tree spatial index of vertices
+
+        This :class:`lfview.resources.spatial.kdtree.KDTree` supports
+        batched nearest neighbour, radius, and box queries, which return
+        vertex indices; these may be used directly to index arrays of
+        data on nodes. It is built on first access and cached until
+        vertices are reassigned or their fingerprint changes, as for
+        :code:`bounds`. It is None if vertices are not available.
+        """
+        return _cached_index(self, '_kdtree', [self.vertices], KDTree)
+
+    @properties.observer('vertices')
+    def _clear_kdtree(self, _):
+        """Release the KD-tree of previous vertices"""
+        self._kdtree = None
+
     @properties.validator('vertices')
     def _validate_vertices(self, change):
         """Ensure vertices array is Nx3"""
@@ -246,12 +382,15 @@ class ElementPointSet(_BaseElementPointSet):
             )
         return True
 
+    @with_export_context
     def to_omf(self):
         self.validate()
         omf_point_set = omf.PointSetElement(
             name=self.name or '',
             description=self.description or '',
-            geometry=omf.PointSetGeometry(vertices=self.vertices.array, ),
+            geometry=omf.PointSetGeometry(
+                vertices=omf_array(omf.Vector3Array, self.vertices.array),
+            ),
             data=[
                 attr.to_omf(cell_location='vertices')
                 for attr in self.data
@@ -266,8 +405,19 @@ class ElementPointSet(_BaseElementPointSet):
         )
         return omf_point_set
 
+    @classmethod
+    def from_omf(cls, omf_element):
+        """Create point set from omf.PointSetElement
 
-class ElementLineSet(_BaseElementLineSet):
+        Arrays are wrapped without copying if possible.
+        """
+        return cls._from_omf_element(
+            omf_element,
+            vertices=_vertices_from_omf(omf_element.geometry),
+        )
+
+
+class ElementLineSet(_VertexBoundsMixin, _BaseElementLineSet):
     """Line-set element with geometry defined by vertices and segments"""
 
     SUB_TYPE = 'lineset'
@@ -335,7 +485,7 @@ class ElementLineSet(_BaseElementLineSet):
                 instance=self,
             )
         if (getattr(segments, 'array', None) is not None
-                and np.min(segments.array) < 0):
+                and not in_bounds(segments.array, low=0)):
             raise properties.ValidationError(
                 message='Segments may only have non-negative integers',
                 reason='invalid',
@@ -350,7 +500,7 @@ class ElementLineSet(_BaseElementLineSet):
         if (isinstance(self.vertices, string_types)
                 or getattr(self.segments, 'array', None) is None):
             return True
-        if np.max(self.segments.array) >= self.vertices.shape[0]:
+        if not in_bounds(self.segments.array, high=self.vertices.shape[0]):
             raise properties.ValidationError(
                 message='Segment indices are outside bounds for vertices',
                 reason='invalid',
@@ -359,22 +509,35 @@ class ElementLineSet(_BaseElementLineSet):
             )
         return True
 
+    @with_export_context
     def to_omf(self):
         self.validate()
         omf_line_set = omf.LineSetElement(
             name=self.name or '',
             description=self.description or '',
             geometry=omf.LineSetGeometry(
-                vertices=self.vertices.array,
-                segments=self.segments.array,
+                vertices=omf_array(omf.Vector3Array, self.vertices.array),
+                segments=omf_array(omf.Int2Array, self.segments.array),
             ),
             data=[attr.to_omf(cell_location='segments') for attr in self.data],
             color=self.defaults.color.value,
         )
         return omf_line_set
 
+    @classmethod
+    def from_omf(cls, omf_element):
+        """Create line set from omf.LineSetElement
+
+        Arrays are wrapped without copying if possible.
+        """
+        return cls._from_omf_element(
+            omf_element,
+            vertices=_vertices_from_omf(omf_element.geometry),
+            segments=wrap_array(omf_element.geometry.segments.array),
+        )
 
-class ElementSurface(_BaseElementSurface):
+
+class ElementSurface(_VertexBoundsMixin, _BaseElementSurface):
     """Surface element with geometry defined by vertices and triangles"""
 
     SUB_TYPE = 'surface'
@@ -405,6 +568,27 @@ class ElementSurface(_BaseElementSurface):
         except (AttributeError, IndexError, TypeError):
             return None
 
+    @property
+    def bvh(self):
+        """Bounding volume hierarchy of triangles
+
+        This :class:`lfview.resources.spatial.bvh.TriangleBVH` supports
+        batched ray intersection and closest point queries, which
+        return triangle indices and barycentric coordinates for
+        sampling data on nodes or cells. It is built on first access
+        and cached until vertices or triangles are reassigned or their
+        fingerprints change, as for :code:`bounds`. It is None if
+        vertices or triangles are not available.
+        """
+        return _cached_index(
+            self, '_bvh', [self.vertices, self.triangles], TriangleBVH
+        )
+
+    @properties.observer(['vertices', 'triangles'])
+    def _clear_bvh(self, _):
+        """Release the BVH of previous geometry"""
+        self._bvh = None
+
     @properties.validator('vertices')
     def _validate_vertices(self, change):
         """Ensure vertices array is Nx3"""
@@ -442,7 +626,7 @@ class ElementSurface(_BaseElementSurface):
                 instance=self,
             )
         if (getattr(triangles, 'array', None) is not None
-                and np.min(triangles.array) < 0):
+                and not in_bounds(triangles.array, low=0)):
             raise properties.ValidationError(
                 message='Triangles may only have positive integers',
                 reason='invalid',
@@ -457,7 +641,7 @@ class ElementSurface(_BaseElementSurface):
         if (isinstance(self.vertices, string_types)
                 or getattr(self.triangles, 'array', None) is None):
             return True
-        if np.max(self.triangles.array) >= self.vertices.shape[0]:
+        if not in_bounds(self.triangles.array, high=self.vertices.shape[0]):
             raise properties.ValidationError(
                 message='Triangle indices are outside bounds for vertices',
                 reason='invalid',
@@ -466,14 +650,15 @@ class ElementSurface(_BaseElementSurface):
             )
         return True
 
+    @with_export_context
     def to_omf(self):
         self.validate()
         omf_surface = omf.SurfaceElement(
             name=self.name or '',
             description=self.description or '',
             geometry=omf.SurfaceGeometry(
-                vertices=self.vertices.array,
-                triangles=self.triangles.array,
+                vertices=omf_array(omf.Vector3Array, self.vertices.array),
+                triangles=omf_array(omf.Int3Array, self.triangles.array),
             ),
             data=[
                 attr.to_omf(cell_location='faces')
@@ -489,6 +674,22 @@ class ElementSurface(_BaseElementSurface):
         )
         return omf_surface
 
+    @classmethod
+    def from_omf(cls, omf_element):
+        """Create surface from omf.SurfaceElement with SurfaceGeometry
+
+        Arrays are wrapped without copying if possible.
+        """
+        if not isinstance(omf_element.geometry, omf.SurfaceGeometry):
+            raise ValueError(
+                '{} requires omf.SurfaceGeometry'.format(cls.__name__)
+            )
+        return cls._from_omf_element(
+            omf_element,
+            vertices=_vertices_from_omf(omf_element.geometry),
+            triangles=wrap_array(omf_element.geometry.triangles.array),
+        )
+
 
 class ElementSurfaceGrid(_BaseElementSurface):
     """Surface element with geometry defined by a grid
@@ -546,6 +747,46 @@ class ElementSurfaceGrid(_BaseElementSurface):
         except (AttributeError, IndexError, TypeError):
             return None
 
+    @property
+    def bounds(self):
+        """Axis-aligned bounding box as 2 x 3 array of min and max corners
+
+        This is computed from origin, axes, and the total length of
+        tensors, without computing node coordinates. With offset_w, the
+        range of offsets along the grid normal is included; the bounds
+        are then exact if the normal is along x, y, or z, and otherwise
+        may be larger than the nodes. It is None if the geometry is
+        incomplete.
+        """
+        try:
+            ranges = [[0., sum(self.tensor_u)], [0., sum(self.tensor_v)]]
+            axes = [self.axis_u, self.axis_v]
+            if isinstance(self.offset_w, Array) and self.offset_w.array.size:
+                stats = array_stats(self.offset_w.array)
+                ranges.append([stats['min'], stats['max']])
+                axes.append(self.axis_u.cross(self.axis_v).normalize())
+            return _grid_bounds(self.origin, axes, ranges)
+        except (AttributeError, TypeError, ZeroDivisionError):
+            return None
+
+    @property
+    def locator(self):
+        """Locator for the cells of the grid that contain points
+
+        This :class:`lfview.resources.spatial.grids.GridLocator`
+        projects points onto the grid plane, ignoring offset_w, and
+        returns flat cell indices for indexing data on cells, or -1
+        outside the grid. It is None if the geometry is incomplete.
+        """
+        try:
+            return GridLocator(
+                self.origin,
+                [self.axis_u, self.axis_v],
+                [self.tensor_u, self.tensor_v],
+            )
+        except (AttributeError, TypeError, ValueError):
+            return None
+
     @properties.validator
     def _validate_geometry(self):
         """Ensure offset_w shape is consistent with tensor lengths"""
@@ -575,6 +816,7 @@ class ElementSurfaceGrid(_BaseElementSurface):
             )
         return True
 
+    @with_export_context
     def to_omf(self):
         self.validate()
         omf_grid_surface = omf.SurfaceElement(
@@ -600,9 +842,35 @@ class ElementSurfaceGrid(_BaseElementSurface):
             color=self.defaults.color.value,
         )
         if self.offset_w is not None:
-            omf_grid_surface.offset_w = self.offset_w.array
+            omf_grid_surface.geometry.offset_w = omf_array(
+                omf.ScalarArray, self.offset_w.array
+            )
         return omf_grid_surface
 
+    @classmethod
+    def from_omf(cls, omf_element):
+        """Create surface grid from omf.SurfaceElement with SurfaceGridGeometry
+
+        Arrays are wrapped without copying if possible.
+        """
+        geometry = omf_element.geometry
+        if not isinstance(geometry, omf.SurfaceGridGeometry):
+            raise ValueError(
+                '{} requires omf.SurfaceGridGeometry'.format(cls.__name__)
+            )
+        kwargs = {}
+        if geometry.offset_w is not None:
+            kwargs['offset_w'] = wrap_array(geometry.offset_w.array)
+        return cls._from_omf_element(
+            omf_element,
+            origin=geometry.origin,
+            tensor_u=geometry.tensor_u,
+            tensor_v=geometry.tensor_v,
+            axis_u=geometry.axis_u,
+            axis_v=geometry.axis_v,
+            **kwargs
+        )
+
 
 class ElementVolumeGrid(_BaseElementVolume):
     """Volume element with geometry defined by a grid
@@ -670,6 +938,65 @@ class ElementVolumeGrid(_BaseElementVolume):
         except (AttributeError, IndexError, TypeError):
             return None
 
+    @property
+    def bounds(self):
+        """Axis-aligned bounding box as 2 x 3 array of min and max corners
+
+        This is computed from origin, axes, and the total length of
+        tensors, without computing node coordinates. It is None if the
+        geometry is incomplete.
+        """
+        try:
+            return _grid_bounds(
+                self.origin,
+                [self.axis_u, self.axis_v, self.axis_w],
+                [
+                    [0., sum(self.tensor_u)],
+                    [0., sum(self.tensor_v)],
+                    [0., sum(self.tensor_w)],
+                ],
+            )
+        except (AttributeError, TypeError):
+            return None
+
+    @property
+    def locator(self):
+        """Locator for the cells of the grid that contain points
+
+        This :class:`lfview.resources.spatial.grids.GridLocator`
+        returns flat cell indices for indexing data on cells, or -1
+        outside the grid. It is None if the geometry is incomplete.
+        """
+        try:
+            return GridLocator(
+                self.origin,
+                [self.axis_u, self.axis_v, self.axis_w],
+                [self.tensor_u, self.tensor_v, self.tensor_w],
+            )
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def sample(self, data, points, method='linear'):
+        """Sample data on nodes or cells of the grid at points
+
+        data is a DataBasic with location 'nodes' or 'cells' and an
+        available array. Returns values at each of the N x 3 points,
+        with 'nearest' or trilinear ('linear') interpolation, as
+        described in :code:`GridLocator.sample`; points outside the
+        grid are NaN.
+        """
+        locator = self.locator
+        if locator is None:
+            raise ValueError('Grid geometry is incomplete')
+        if not isinstance(data, DataBasic):
+            raise ValueError('Only DataBasic may be sampled')
+        if not isinstance(data.array, Array) or data.array.array is None:
+            raise ValueError('Data array is not available')
+        return locator.sample(
+            data.array.array, points, location=data.location, method=method
+        )
+
+    @with_export_context
     def to_omf(self):
         self.validate()
         omf_grid_volume = omf.VolumeElement(
@@ -688,3 +1015,35 @@ class ElementVolumeGrid(_BaseElementVolume):
             color=self.defaults.color.value,
         )
         return omf_grid_volume
+
+    @classmethod
+    def from_omf(cls, omf_element):
+        """Create volume grid from omf.VolumeElement"""
+        geometry = omf_element.geometry
+        return cls._from_omf_element(
+            omf_element,
+            origin=geometry.origin,
+            tensor_u=geometry.tensor_u,
+            tensor_v=geometry.tensor_v,
+            tensor_w=geometry.tensor_w,
+            axis_u=geometry.axis_u,
+            axis_v=geometry.axis_v,
+            axis_w=geometry.axis_w,
+        )
+
+
+def element_from_omf(omf_element):
+    """Create the spatial element corresponding to an OMF element"""
+    if isinstance(omf_element, omf.PointSetElement):
+        return ElementPointSet.from_omf(omf_element)
+    if isinstance(omf_element, omf.LineSetElement):
+        return ElementLineSet.from_omf(omf_element)
+    if isinstance(omf_element, omf.SurfaceElement):
+        if isinstance(omf_element.geometry, omf.SurfaceGridGeometry):
+            return ElementSurfaceGrid.from_omf(omf_element)
+        return ElementSurface.from_omf(omf_element)
+    if isinstance(omf_element, omf.VolumeElement):
+        return ElementVolumeGrid.from_omf(omf_element)
+    raise ValueError(
+        'Unsupported OMF element: {}'.format(omf_element.__class__.__name__)
+    )
@@ -0,0 +1,307 @@
+"""Export of multiple spatial elements to an OMF project"""
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import os
+import time
+import zlib
+
+import numpy as np
+import omf
+from omf.fileio import OMFWriter
+import properties
+
+from . import jsonio
+from .arrays import CHUNK_SIZE, CopyTracker, iter_chunks
+from .context import ExportContext
+
+EXECUTORS = ('serial', 'thread', 'process')
+
+
+def _timed_to_omf(element, context=None, track_copies=False, cache=None):
+    """Convert element to OMF, returning result, elapsed time, and copies
+
+    Bytes copied are only counted if track_copies is True; otherwise
+    they are None. If cache is provided, it is active during the
+    conversion.
+    """
+    start = time.time()
+    if context is None:
+        context = ExportContext()
+    tracker = CopyTracker()
+
+    def convert():
+        if not track_copies:
+            return element.to_omf()
+        with tracker:
+            return element.to_omf()
+
+    with context:
+        if cache is None:
+            omf_element = convert()
+        else:
+            with cache:
+                omf_element = convert()
+    bytes_copied = tracker.bytes_copied if track_copies else None
+    return omf_element, time.time() - start, bytes_copied
+
+
+class ProjectExporter(object):
+    """Converts a list of spatial elements into an OMF project
+
+    Elements are converted concurrently, then assembled in their input
+    order into an :code:`omf.Project`.
+
+    **Parameters**:
+
+    * **executor** - 'thread' (default), 'process', or 'serial'. Most of
+      the export time is spent in NumPy, which releases the GIL, so
+      threads are usually sufficient. With threads, validation is
+      shared across all elements through a single
+      :class:`lfview.resources.spatial.context.ExportContext`. Processes
+      require elements to be pickled and each element is validated
+      independently.
+    * **workers** - Number of threads or processes; the default is the
+      number of CPUs.
+    * **track_copies** - If True, array bytes copied while converting
+      each element are recorded with a
+      :class:`lfview.resources.spatial.arrays.CopyTracker`. Default is
+      False.
+    * **cache** - Optional :class:`lfview.resources.spatial.cache.OMFCache`
+      shared across exports, so unchanged resources are not converted
+      again. This is not supported with the 'process' executor.
+
+    After :code:`export`, per-element timings are available as
+    :code:`timings`, a list of dictionaries with element name, uid,
+    and seconds, in element order. If track_copies is True, these
+    also include bytes_copied.
+    """
+
+    def __init__(
+            self,
+            executor='thread',
+            workers=None,
+            track_copies=False,
+            cache=None,
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(
+                'executor must be one of: {}'.format(', '.join(EXECUTORS))
+            )
+        if cache is not None and executor == 'process':
+            raise ValueError('cache cannot be shared with process executor')
+        self.executor = executor
+        self.workers = workers
+        self.track_copies = track_copies
+        self.cache = cache
+        self.timings = []
+        self.context = None
+
+    def _convert(self, elements):
+        """Convert elements, returning (omf_element, seconds, bytes copied)"""
+        func = partial(
+            _timed_to_omf,
+            context=self.context,
+            track_copies=self.track_copies,
+            cache=self.cache,
+        )
+        if self.executor == 'serial' or len(elements) < 2:
+            return [func(element) for element in elements]
+        if self.executor == 'thread':
+            pool = ThreadPool(self.workers)
+        else:
+            pool = Pool(self.workers)
+        try:
+            return pool.map(func, elements)
+        finally:
+            pool.close()
+            pool.join()
+
+    def export(self, elements, name='', description=''):
+        """Convert elements to OMF and return an omf.Project"""
+        elements = list(elements)
+        self.context = None if self.executor == 'process' else ExportContext()
+        results = self._convert(elements)
+        self.timings = []
+        for element, (_, seconds, bytes_copied) in zip(elements, results):
+            timing = {
+                'name': element.name or '',
+                'uid': element.uid,
+                'seconds': seconds,
+            }
+            if self.track_copies:
+                timing['bytes_copied'] = bytes_copied
+            self.timings.append(timing)
+        project = omf.Project(
+            name=name,
+            description=description,
+            elements=[result[0] for result in results],
+        )
+        return project
+
+
+def to_omf_project(elements, name='', description='', **kwargs):
+    """Convert a list of spatial elements to an omf.Project
+
+    Keyword arguments are passed to :class:`ProjectExporter`.
+    """
+    exporter = ProjectExporter(**kwargs)
+    return exporter.export(elements, name=name, description=description)
+
+
+def _write_array(fopen, array, chunk_size=CHUNK_SIZE):
+    """Compress and write array in chunks, returning the OMF array index
+
+    This writes the same zlib stream as the OMF array serializer, but
+    converts and compresses one chunk at a time rather than creating
+    several full-size temporary copies of the array.
+    """
+    dtype = '<f8' if array.dtype.kind == 'f' else '<i8'
+    index = {'start': fopen.tell(), 'dtype': dtype}
+    compressor = zlib.compressobj()
+    for chunk in iter_chunks(array, chunk_size):
+        chunk = np.ascontiguousarray(chunk, dtype=dtype)
+        fopen.write(compressor.compress(chunk.tobytes()))
+    fopen.write(compressor.flush())
+    index['length'] = fopen.tell() - index['start']
+    return index
+
+
+def _streamable(value):
+    """Check if value can be written losslessly by _write_array"""
+    return isinstance(value, np.ndarray) and value.size and (
+        value.dtype.kind in 'fi' and value.dtype.itemsize <= 8
+        or value.dtype.kind == 'u' and value.dtype.itemsize <= 4
+    )
+
+
+def _register_arrays(value, fopen, registry):
+    """Write OMF numeric arrays within value and add them to registry
+
+    Once registered, the OMF array objects are skipped by OMF
+    serialization, which would otherwise write them with additional
+    full-size copies.
+    """
+    if isinstance(value, (list, tuple)):
+        for val in value:
+            _register_arrays(val, fopen, registry)
+        return
+    if not isinstance(value, omf.base.UidModel):
+        return
+    uid = str(value.uid)
+    if uid in registry:
+        return
+    backend = value._backend  #pylint: disable=protected-access
+    if _streamable(backend.get('array')):
+        registry[uid] = {
+            '__class__': value.__class__.__name__,
+            'date_created': properties.DateTime.to_json(value.date_created),
+            'date_modified': properties.DateTime.to_json(value.date_modified),
+            'array': _write_array(fopen, backend['array']),
+        }
+        return
+    for val in backend.values():
+        _register_arrays(val, fopen, registry)
+
+
+class StreamingOMFWriter(object):
+    """Writes spatial elements to an OMF file one element at a time
+
+    Unlike :code:`omf.OMFWriter`, which requires an entire
+    :code:`omf.Project` in memory, each element written here is
+    converted to OMF, its arrays are compressed and written to the
+    file, and the OMF element is discarded; only the JSON metadata is
+    kept until the file is closed. Peak memory is therefore bounded by
+    the largest single element. Numeric arrays are also converted and
+    compressed in chunks, so writing an element allocates much less
+    than its array size in temporary memory. The file is only a valid
+    OMF file after :code:`close`, which is called automatically when
+    used as a context manager. If the block raises an exception,
+    :code:`abort` is called instead, so no file with missing elements
+    is left behind:
+
+    .. code::
+
+        with StreamingOMFWriter('project.omf', name='project') as writer:
+            for element in elements:
+                writer.write(element)
+
+    Elements are validated by :code:`to_omf`; the resulting OMF
+    objects are not validated again.
+    """
+
+    def __init__(self, fname, name='', description=''):
+        if len(fname) < 4 or fname[-4:] != '.omf':
+            fname = fname + '.omf'
+        self.fname = fname
+        self.project = omf.Project(name=name, description=description)
+        self._registry = {}
+        self._element_uids = []
+        self._fopen = open(fname, 'wb')
+        OMFWriter.initialize_header(self._fopen, self.project.uid)
+
+    @property
+    def closed(self):
+        """True once the file is complete and closed"""
+        return self._fopen.closed
+
+    def write(self, element):
+        """Convert element to OMF and write it to the file
+
+        Returns the uid of the OMF element.
+        """
+        if self.closed:
+            raise ValueError('Cannot write to closed OMF file')
+        omf_element = element.to_omf()
+        _register_arrays(omf_element, self._fopen, self._registry)
+        uid = omf_element.serialize(
+            open_file=self._fopen,
+            registry=self._registry,
+        )
+        self._element_uids.append(uid)
+        return uid
+
+    def close(self):
+        """Write project metadata and close the file"""
+        if self.closed:
+            return
+        project_uid = self.project.serialize(
+            open_file=self._fopen,
+            registry=self._registry,
+        )
+        self._registry[project_uid]['elements'] = self._element_uids
+        OMFWriter.update_header(self._fopen)
+        self._fopen.write(jsonio.dumps(self._registry).encode('utf-8'))
+        self._fopen.close()
+        self._registry = {}
+
+    def abort(self):
+        """Close and delete the incomplete file without finishing it"""
+        if self.closed:
+            return
+        self._fopen.close()
+        self._registry = {}
+        os.remove(self.fname)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_omf(elements, fname, name='', description=''):
+    """Write spatial elements to an OMF file, one element at a time
+
+    elements may be any iterable, for example a generator that
+    creates or reads elements on demand, so the entire project is
+    never held in memory; see :class:`StreamingOMFWriter`. Returns
+    the output file name.
+    """
+    with StreamingOMFWriter(fname, name, description) as writer:
+        for element in elements:
+            writer.write(element)
+    return writer.fname
@@ -0,0 +1,217 @@
+"""Locate points in the cells of tensor grids and sample data on grids"""
+import itertools
+
+import numpy as np
+
+from .kdtree import _as_points
+
+LOCATE_CHUNK_SIZE = 2**20
+BOUNDARY_TOLERANCE = 1e-10
+
+
+class GridLocator(object):
+    """Find the cells of a tensor grid that contain points
+
+    The grid is defined by origin, a list of two or three unit axes,
+    and a list of cell widths along each axis, as on
+    :class:`lfview.resources.spatial.elements.ElementSurfaceGrid` and
+    :class:`lfview.resources.spatial.elements.ElementVolumeGrid`.
+    Points are transformed into the grid frame with a single matrix
+    product; for two axes, they are projected onto the grid plane.
+    Cells along each axis are then found by binary search of the
+    cumulative cell widths.
+
+    Flat cell indices follow data on grids: u varies fastest, then v,
+    then w, so the index of cell (i, j, k) is
+    :code:`i + nu * (j + nv * k)`. Points on the boundary between
+    cells are in the later cell, except on the far boundary of the
+    grid. Points outside the grid, by more than BOUNDARY_TOLERANCE
+    times its length along any axis, have index -1.
+
+    Data on nodes or cells, ordered the same way, may be sampled at
+    points with :code:`sample`.
+
+    .. code::
+
+      locator = GridLocator(origin, [axis_u, axis_v], [tensor_u, tensor_v])
+      cells = locator.cell_indices(points)
+    """
+
+    def __init__(self, origin, axes, tensors):
+        if len(axes) != len(tensors) or len(axes) not in (2, 3):
+            raise ValueError('GridLocator requires two or three axes')
+        self.origin = np.array(origin, dtype=float)
+        self.axes = np.array(axes, dtype=float)
+        self.edges = [
+            np.concatenate([[0.], np.cumsum(tensor, dtype=float)])
+            for tensor in tensors
+        ]
+        self.shape = tuple(len(tensor) for tensor in tensors)
+        self._inverse = np.linalg.pinv(self.axes)
+
+    @property
+    def num_cells(self):
+        """Number of cells in the grid"""
+        return int(np.prod(self.shape))
+
+    def transform(self, points):
+        """Coordinates of points along each grid axis, from origin"""
+        points = _as_points(points, 3)
+        return (points - self.origin).dot(self._inverse)
+
+    def _chunks(self, points):
+        points = _as_points(points, 3)
+        for start in range(0, points.shape[0], LOCATE_CHUNK_SIZE):
+            chunk = slice(start, start + LOCATE_CHUNK_SIZE)
+            yield chunk, self.transform(points[chunk])
+
+    def _axis_indices(self, coords, axis):
+        """Cell index along axis for each coordinate, -1 if outside"""
+        edges = self.edges[axis]
+        indices = np.searchsorted(edges, coords, side='right') - 1
+        indices = np.clip(indices, 0, self.shape[axis] - 1)
+        tolerance = BOUNDARY_TOLERANCE * edges[-1]
+        outside = (coords < -tolerance) | (coords > edges[-1] + tolerance)
+        indices[outside | np.isnan(coords)] = -1
+        return indices
+
+    def cell_ijk(self, points):
+        """Cell index along each axis for each point, as M x 2 or M x 3
+
+        Indices along all axes are -1 for points outside the grid.
+        """
+        points = _as_points(points, 3)
+        output = np.empty((points.shape[0], len(self.shape)), dtype=int)
+        for chunk, coords in self._chunks(points):
+            ijk = np.stack(
+                [
+                    self._axis_indices(coords[:, axis], axis)
+                    for axis in range(len(self.shape))
+                ],
+                axis=1,
+            )
+            ijk[np.any(ijk < 0, axis=1)] = -1
+            output[chunk] = ijk
+        return output
+
+    def flat_indices(self, ijk):
+        """Flat cell indices from M x 2 or M x 3 cell indices
+
+        Rows with any negative index are -1.
+        """
+        ijk = np.asarray(ijk, dtype=int)
+        outside = np.any(ijk < 0, axis=1)
+        strides = np.cumprod((1, ) + self.shape[:-1])
+        return np.where(outside, -1, ijk.dot(strides))
+
+    def cell_indices(self, points):
+        """Flat cell index for each point, -1 for points outside the grid"""
+        return self.flat_indices(self.cell_ijk(points))
+
+    def _positions(self, axis, location):
+        """Coordinates of nodes or cell centers along axis"""
+        edges = self.edges[axis]
+        if location == 'nodes':
+            return edges
+        return (edges[:-1] + edges[1:]) / 2
+
+    def _axis_weights(self, coords, axis, location):
+        """Lower and upper sample index and weight of upper along axis
+
+        Coordinates between the grid boundary and the first or last
+        cell center take the value of that cell.
+        """
+        positions = self._positions(axis, location)
+        lower = np.searchsorted(positions, coords, side='right') - 1
+        lower = np.clip(lower, 0, len(positions) - 1)
+        upper = np.minimum(lower + 1, len(positions) - 1)
+        width = positions[upper] - positions[lower]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(
+                width > 0, (coords - positions[lower]) / width, 0.
+            )
+        return lower, upper, np.clip(weight, 0., 1.)
+
+    def _sample_chunk(self, values, coords, location, method):
+        outside = np.zeros(coords.shape[0], dtype=bool)
+        for axis in range(len(self.shape)):
+            outside |= self._axis_indices(coords[:, axis], axis) < 0
+        shape = tuple(
+            dim + 1 if location == 'nodes' else dim for dim in self.shape
+        )
+        strides = np.cumprod((1, ) + shape[:-1])
+        if method == 'nearest' and location == 'cells':
+            ijk = [
+                self._axis_indices(coords[:, axis], axis)
+                for axis in range(len(self.shape))
+            ]
+        else:
+            weights = [
+                self._axis_weights(coords[:, axis], axis, location)
+                for axis in range(len(self.shape))
+            ]
+        if method == 'nearest':
+            if location == 'nodes':
+                ijk = [
+                    np.where(weight < 0.5, lower, upper)
+                    for lower, upper, weight in weights
+                ]
+            indices = sum(ind * stride for ind, stride in zip(ijk, strides))
+            output = values[np.where(outside, 0, indices)].astype(float)
+        else:
+            output = np.zeros(coords.shape[0])
+            for corner in itertools.product((0, 1), repeat=len(weights)):
+                indices = 0
+                factor = 1.
+                for side, stride, bounds in zip(corner, strides, weights):
+                    lower, upper, weight = bounds
+                    indices = indices + (upper if side else lower) * stride
+                    factor = factor * (weight if side else 1 - weight)
+                # Corners with no weight do not propagate NaN values
+                corner_values = values[np.where(outside, 0, indices)]
+                output += np.where(factor > 0, factor * corner_values, 0.)
+        output[outside] = np.nan
+        return output
+
+    def sample(self, values, points, location='cells', method='linear'):
+        """Sample data on nodes or cells of the grid at points
+
+        values is a 1D array on nodes or cells, ordered with u varying
+        fastest. method is 'nearest', the value of the cell containing
+        each point or its nearest node, or 'linear', interpolated
+        between the nearest nodes or cell centers; this is trilinear
+        on volume grids and bilinear on surface grids. Points between
+        the grid boundary and the outer cell centers take the value of
+        the outer cells. NaN values propagate to samples that use them,
+        and points outside the grid are NaN.
+
+        Points are processed in chunks of LOCATE_CHUNK_SIZE, so only
+        the values that are sampled are read from values, which may
+        be a memory-mapped array.
+        """
+        if location not in ('nodes', 'cells'):
+            raise ValueError(
+                "location must be 'nodes' or 'cells', not {}".format(location)
+            )
+        if method not in ('nearest', 'linear'):
+            raise ValueError(
+                "method must be 'nearest' or 'linear', not {}".format(method)
+            )
+        values = np.asanyarray(values)
+        if location == 'nodes':
+            expected = int(np.prod([dim + 1 for dim in self.shape]))
+        else:
+            expected = self.num_cells
+        if len(values.shape) != 1 or values.shape[0] != expected:
+            raise ValueError(
+                'Values on {} must be of shape ({}, ), not {}'.format(
+                    location, expected, values.shape
+                )
+            )
+        points = _as_points(points, 3)
+        output = np.empty(points.shape[0])
+        for chunk, coords in self._chunks(points):
+            output[chunk] = self._sample_chunk(
+                values, coords, location, method
+            )
+        return output
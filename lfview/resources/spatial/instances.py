@@ -0,0 +1,59 @@
+"""Create, copy, and deserialize HasProperties instances without validation"""
+import numpy as np
+import properties
+from six import string_types
+
+
+def _new_instance(cls):
+    """Create an empty HasProperties instance with the public constructor
+
+    Default values set by the constructor are removed, so the caller
+    may fill the backend without default values left over.
+    """
+    obj = cls()
+    obj._backend.clear()  #pylint: disable=protected-access
+    return obj
+
+
+def _default(cls, name, prop):
+    """Return the default value for a prop, as set by HasProperties"""
+    defaults = cls._defaults  #pylint: disable=protected-access
+    value = defaults.get(name, prop.default)
+    if callable(value):
+        value = value()
+    return value
+
+
+def _deserialize_deferred(prop, value, **kwargs):
+    """Deserialize a prop value without validation
+
+    Pointer uid strings are kept as-is, rather than trying each
+    Union prop in turn, and List items are deserialized the same way.
+    Other values use the prop deserializer.
+    """
+    if value is None or prop.deserializer is not None:
+        return prop.deserialize(value, **kwargs)
+    if isinstance(prop, properties.Union) and isinstance(value, string_types):
+        return value
+    if isinstance(prop, properties.List) and isinstance(value, list):
+        return [
+            _deserialize_deferred(prop.prop, val, **kwargs) for val in value
+        ]
+    return prop.deserialize(value, **kwargs)
+
+
+def _clone(value):
+    """Copy nested HasProperties and containers without validation"""
+    if isinstance(value, properties.HasProperties):
+        new = _new_instance(value.__class__)
+        backend = value._backend  #pylint: disable=protected-access
+        for name, val in backend.items():
+            new._backend[name] = _clone(val)  #pylint: disable=protected-access
+        return new
+    if isinstance(value, list):
+        return [_clone(val) for val in value]
+    if isinstance(value, dict):
+        return {key: _clone(val) for key, val in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
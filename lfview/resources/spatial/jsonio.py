@@ -0,0 +1,150 @@
+"""Pluggable JSON encoding and decoding for spatial resources
+
+All JSON encoding and decoding in this package, including snapshot
+serialization and OMF file metadata, goes through :func:`dumps` and
+:func:`loads`. These use the stdlib :code:`json` module by default;
+a faster installed backend may be selected with
+:func:`set_json_backend`:
+
+.. code::
+
+    from lfview.resources.spatial import jsonio
+    jsonio.set_json_backend('auto')
+
+Backends do not produce identical strings; for example, orjson omits
+whitespace and encodes NaN as null. The decoded values are the same
+for valid JSON, but since snapshots are compared and cached as
+strings, the stdlib backend remains the default.
+"""
+from collections import OrderedDict
+import importlib
+import json
+import threading
+
+PREFERRED_BACKENDS = ('orjson', 'ujson', 'json')
+
+
+class JSONBackend(object):
+    """JSON backend with dumps and loads functions
+
+    **Parameters**:
+
+    * **name** - Name used to select the backend
+    * **dumps** - Function that converts a value to a JSON string
+    * **loads** - Function that converts a JSON string or UTF-8 bytes
+      to a value
+    """
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<JSONBackend: {}>'.format(self.name)
+
+
+def _json_backend():
+    def loads(value):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return json.loads(value)
+
+    return JSONBackend('json', json.dumps, loads)
+
+
+def _orjson_backend():
+    orjson = importlib.import_module('orjson')
+    return JSONBackend(
+        'orjson',
+        lambda value: orjson.dumps(value).decode('utf-8'),
+        orjson.loads,
+    )
+
+
+def _ujson_backend():
+    ujson = importlib.import_module('ujson')
+    return JSONBackend('ujson', ujson.dumps, ujson.loads)
+
+
+BACKEND_FACTORIES = OrderedDict(
+    [
+        ('json', _json_backend),
+        ('orjson', _orjson_backend),
+        ('ujson', _ujson_backend),
+    ]
+)
+
+_LOCK = threading.Lock()
+_BACKENDS = {}
+_ACTIVE = [None]
+
+
+def register_json_backend(name, dumps, loads):
+    """Register a custom JSON backend under the given name"""
+    backend = JSONBackend(name, dumps, loads)
+    with _LOCK:
+        BACKEND_FACTORIES[name] = lambda: backend
+        _BACKENDS.pop(name, None)
+    return backend
+
+
+def _load_backend(name):
+    """Return the named backend, or None if it is not installed"""
+    with _LOCK:
+        if name not in _BACKENDS:
+            try:
+                _BACKENDS[name] = BACKEND_FACTORIES[name]()
+            except ImportError:
+                _BACKENDS[name] = None
+        return _BACKENDS[name]
+
+
+def available_json_backends():
+    """Return names of registered backends that are installed"""
+    return [
+        name for name in list(BACKEND_FACTORIES)
+        if _load_backend(name) is not None
+    ]
+
+
+def set_json_backend(name='json'):
+    """Select the JSON backend used throughout spatial resources
+
+    Name may be any registered backend, or 'auto' to select the first
+    installed backend in PREFERRED_BACKENDS. Returns the selected
+    backend.
+    """
+    if name == 'auto':
+        for preferred in PREFERRED_BACKENDS:
+            if _load_backend(preferred) is not None:
+                name = preferred
+                break
+    if name not in BACKEND_FACTORIES:
+        raise ValueError(
+            'Unknown JSON backend {}; must be one of: {}'.format(
+                name, ', '.join(BACKEND_FACTORIES)
+            )
+        )
+    backend = _load_backend(name)
+    if backend is None:
+        raise ValueError('JSON backend {} is not installed'.format(name))
+    _ACTIVE[0] = backend
+    return backend
+
+
+def get_json_backend():
+    """Return the active JSON backend"""
+    if _ACTIVE[0] is None:
+        set_json_backend('json')
+    return _ACTIVE[0]
+
+
+def dumps(value):
+    """Encode value as a JSON string with the active backend"""
+    return get_json_backend().dumps(value)
+
+
+def loads(value):
+    """Decode a JSON string or UTF-8 bytes with the active backend"""
+    return get_json_backend().loads(value)
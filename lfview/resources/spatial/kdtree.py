@@ -0,0 +1,348 @@
+"""Array-backed KD-tree for batched spatial queries on points"""
+import numpy as np
+
+LEAF_SIZE = 64
+QUERY_CHUNK_SIZE = 2**18
+DISTANCE_CHUNK_SIZE = 2**18
+
+
+def _as_points(points, dims):
+    points = np.asarray(points, dtype=float)
+    if points.ndim == 1:
+        points = points.reshape(1, -1)
+    if points.ndim != 2 or points.shape[1] != dims:
+        raise ValueError(
+            'Points must be of shape N x {}, not {}'.format(
+                dims, points.shape
+            )
+        )
+    return points
+
+
+def _split_by_query(queries, indices, num_queries):
+    """Split indices into a list of sorted arrays, one per query"""
+    if queries:
+        queries = np.concatenate(queries)
+        indices = np.concatenate(indices)
+    else:
+        queries = indices = np.zeros(0, dtype=int)
+    order = np.lexsort((indices, queries))
+    splits = np.searchsorted(queries[order], np.arange(1, num_queries))
+    return np.split(indices[order], splits)
+
+
+class KDTree(object):
+    """KD-tree over an N x D array of points
+
+    The tree is stored in flat numpy arrays: a permutation of point
+    indices, ordered so each node covers a contiguous range of it,
+    and per-node ranges, splits, children, and bounding boxes. No
+    Python objects are created per point or per node, and the points
+    array is referenced, not copied, if it is already floating point;
+    float32 points stay float32. Building the tree temporarily
+    allocates about twice the size of float64 points, mostly integer
+    ranks along each dimension and index arrays over the points of
+    one level; the finished tree holds one index per point plus a
+    few values per node.
+
+    All queries are batched. Each node is visited once per chunk of
+    up to QUERY_CHUNK_SIZE query points. Distances from the queries
+    that reach a leaf to its points are computed in groups of at most
+    DISTANCE_CHUNK_SIZE query-point pairs, to bound temporary memory.
+    Returned indices are rows of the original points array.
+
+    .. code::
+
+      tree = KDTree(vertices)
+      distances, indices = tree.query(points, k=3)
+    """
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        points = np.asarray(points)
+        if not np.issubdtype(points.dtype, np.floating):
+            points = points.astype(float)
+        if points.ndim != 2 or not points.size:
+            raise ValueError(
+                'KDTree requires non-empty N x D points, not {}'.format(
+                    points.shape
+                )
+            )
+        self.points = points
+        self.leaf_size = max(int(leaf_size), 1)
+        self._build()
+
+    def _build(self):
+        """Split nodes on the widest dimension at the median point
+
+        Nodes are built one level at a time. All nodes in a level are
+        bounded with a reduceat over their points along each dimension,
+        and those that split are partitioned together with one sort of
+        their points, keyed on node and rank along the split dimension,
+        so no Python loop runs per node.
+        """
+        num_points, num_dims = self.points.shape
+        # Indices fit in 32 bits for all but huge trees, halving memory
+        if num_points < 2**31:
+            index_type = np.int32
+        else:
+            index_type = np.int64
+        order = np.arange(num_points)
+        # Integer ranks along each dimension give exact sort keys
+        ranks = np.empty((num_points, num_dims), dtype=index_type)
+        for dim in range(num_dims):
+            ranks[np.argsort(self.points[:, dim]), dim] = order
+        starts, ends = np.array([0]), np.array([num_points])
+        levels = []
+        next_node = 1
+        while starts.size:
+            sizes = ends - starts
+            offsets = np.cumsum(sizes) - sizes
+            segments = np.repeat(
+                np.arange(starts.size, dtype=index_type), sizes
+            )
+            positions = np.arange(sizes.sum(), dtype=index_type)
+            positions += (starts - offsets)[segments].astype(index_type)
+            low = np.empty((starts.size, num_dims), dtype=self.points.dtype)
+            high = np.empty((starts.size, num_dims), dtype=self.points.dtype)
+            for dim in range(num_dims):
+                values = self.points[order[positions], dim]
+                low[:, dim] = np.minimum.reduceat(values, offsets)
+                high[:, dim] = np.maximum.reduceat(values, offsets)
+            del values
+            nodes = np.arange(starts.size)
+            dims = np.argmax(high - low, axis=1)
+            split = (
+                (sizes > self.leaf_size)
+                & (high[nodes, dims] > low[nodes, dims])
+            )
+            left = np.full(starts.size, -1)
+            left[split] = next_node + 2 * np.arange(split.sum())
+            next_node += 2 * split.sum()
+            # Partition points of all nodes that split at their medians
+            inside = split[segments]
+            segments = segments[inside]
+            positions = positions[inside]
+            del inside
+            keys = segments.astype(np.int64)
+            keys *= num_points
+            keys += ranks[order[positions], dims[segments]]
+            del segments
+            part = np.argsort(keys)
+            del keys
+            order[positions] = order[positions[part]]
+            del part, positions
+            halves = sizes[split] // 2
+            mids = starts[split] + halves
+            split_val = np.zeros(starts.size, dtype=self.points.dtype)
+            split_val[split] = self.points[order[mids], dims[split]]
+            levels.append(
+                (
+                    starts, ends, left, np.where(split, dims, 0), split_val,
+                    low, high
+                )
+            )
+            starts = np.stack([starts[split], mids], axis=1).reshape(-1)
+            ends = np.stack([mids, ends[split]], axis=1).reshape(-1)
+        self.order = order
+        (
+            self.start, self.end, self.left, self.split_dim, self.split_val,
+            self.low, self.high
+        ) = [np.concatenate(arrays) for arrays in zip(*levels)]
+
+    @property
+    def num_nodes(self):
+        """Number of nodes in the tree"""
+        return len(self.start)
+
+    def _leaf_groups(self, node, queries):
+        """Yield leaf point indices and points, with groups of queries
+
+        Queries are split so each group has at most DISTANCE_CHUNK_SIZE
+        query-point pairs.
+        """
+        indices = self.order[self.start[node]:self.end[node]]
+        points = self.points[indices]
+        size = max(DISTANCE_CHUNK_SIZE // len(indices), 1)
+        for start in range(0, len(queries), size):
+            yield indices, points, queries[start:start + size]
+
+    def _box_distance(self, node, points):
+        """Squared distance from each point to the node bounding box"""
+        diff = np.maximum(self.low[node] - points, points - self.high[node])
+        return (np.maximum(diff, 0.)**2).sum(axis=1)
+
+    def _leaves(self, points):
+        """Leaf node containing each point"""
+        nodes = np.zeros(points.shape[0], dtype=int)
+        inner = np.nonzero(self.left[nodes] >= 0)[0]
+        while inner.size:
+            parents = nodes[inner]
+            dims = self.split_dim[parents]
+            right = points[inner, dims] >= self.split_val[parents]
+            nodes[inner] = self.left[parents] + right
+            inner = inner[self.left[nodes[inner]] >= 0]
+        return nodes
+
+    def _traverse(self, num_queries, keep, visit, skip=None):
+        """Visit leaves with the queries that keep selects at each node
+
+        keep(node, queries) returns the subset of query indices that
+        may have results in node, and visit(node, queries) is called
+        for each leaf. Optionally, skip is the leaf of each query that
+        was already visited.
+        """
+        stack = [(0, np.arange(num_queries))]
+        while stack:
+            node, queries = stack.pop()
+            queries = keep(node, queries)
+            if not queries.size:
+                continue
+            if self.left[node] >= 0:
+                stack.append((self.left[node] + 1, queries))
+                stack.append((self.left[node], queries))
+                continue
+            if skip is not None:
+                queries = queries[skip[queries] != node]
+                if not queries.size:
+                    continue
+            visit(node, queries)
+
+    def query(self, points, k=1):
+        """Find the k nearest tree points to each query point
+
+        Returns distances and indices, both of shape M x k for M query
+        points, sorted from nearest to farthest.
+        """
+        points = _as_points(points, self.points.shape[1])
+        k = int(k)
+        if k < 1 or k > self.points.shape[0]:
+            raise ValueError(
+                'k must be between 1 and {}'.format(self.points.shape[0])
+            )
+        distances = np.empty((points.shape[0], k))
+        indices = np.empty((points.shape[0], k), dtype=int)
+        for start in range(0, points.shape[0], QUERY_CHUNK_SIZE):
+            chunk = slice(start, start + QUERY_CHUNK_SIZE)
+            distances[chunk], indices[chunk] = self._query_chunk(
+                points[chunk], k
+            )
+        return distances, indices
+
+    def _query_chunk(self, points, k):
+        best_dist = np.full((points.shape[0], k), np.inf)
+        best_ind = np.full((points.shape[0], k), -1, dtype=int)
+        worst = np.full(points.shape[0], np.inf)
+
+        def visit(node, queries):
+            for indices, leaf_points, group in self._leaf_groups(node,
+                                                                 queries):
+                dist = ((points[group, None, :] - leaf_points)**2).sum(axis=2)
+                dist = np.concatenate([best_dist[group], dist], axis=1)
+                ind = np.concatenate(
+                    [
+                        best_ind[group],
+                        np.broadcast_to(indices, (len(group), len(indices)))
+                    ],
+                    axis=1,
+                )
+                if dist.shape[1] > k:
+                    part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                    dist = np.take_along_axis(dist, part, axis=1)
+                    ind = np.take_along_axis(ind, part, axis=1)
+                best_dist[group] = dist
+                best_ind[group] = ind
+                worst[group] = dist.max(axis=1)
+
+        def keep(node, queries):
+            dist = self._box_distance(node, points[queries])
+            return queries[dist <= worst[queries]]
+
+        # Searching each query's own leaf first gives a tight bound
+        leaves = self._leaves(points)
+        order = np.argsort(leaves, kind='mergesort')
+        nodes, starts = np.unique(leaves[order], return_index=True)
+        for node, queries in zip(nodes, np.split(order, starts[1:])):
+            visit(node, queries)
+        self._traverse(points.shape[0], keep, visit, skip=leaves)
+        order = np.argsort(best_dist, axis=1)
+        best_dist = np.sqrt(np.take_along_axis(best_dist, order, axis=1))
+        return best_dist, np.take_along_axis(best_ind, order, axis=1)
+
+    def query_radius(self, points, radius):
+        """Find tree points within radius of each query point
+
+        radius may be a single value or one value per query point;
+        negative radii find no points. Returns a list with a sorted
+        array of indices for each query point.
+        """
+        points = _as_points(points, self.points.shape[1])
+        radius = np.broadcast_to(
+            np.asarray(radius, dtype=float), (points.shape[0], )
+        )
+        radius_sq = np.where(radius < 0, -1., radius**2)
+        output = []
+        for start in range(0, points.shape[0], QUERY_CHUNK_SIZE):
+            chunk = slice(start, start + QUERY_CHUNK_SIZE)
+            output += self._query_radius_chunk(points[chunk], radius_sq[chunk])
+        return output
+
+    def _query_radius_chunk(self, points, radius_sq):
+        found_queries, found_indices = [], []
+
+        def keep(node, queries):
+            dist = self._box_distance(node, points[queries])
+            return queries[dist <= radius_sq[queries]]
+
+        def visit(node, queries):
+            for indices, leaf_points, group in self._leaf_groups(node,
+                                                                 queries):
+                dist = ((points[group, None, :] - leaf_points)**2).sum(axis=2)
+                rows, cols = np.nonzero(dist <= radius_sq[group, None])
+                found_queries.append(group[rows])
+                found_indices.append(indices[cols])
+
+        self._traverse(points.shape[0], keep, visit)
+        return _split_by_query(found_queries, found_indices, points.shape[0])
+
+    def query_box(self, lows, highs):
+        """Find tree points within axis-aligned boxes
+
+        lows and highs are M x D arrays of box corners; points on the
+        box boundary are included. Returns a list with a sorted array
+        of indices for each box.
+        """
+        lows = _as_points(lows, self.points.shape[1])
+        highs = _as_points(highs, self.points.shape[1])
+        if lows.shape != highs.shape:
+            raise ValueError('lows and highs must be the same shape')
+        output = []
+        for start in range(0, lows.shape[0], QUERY_CHUNK_SIZE):
+            chunk = slice(start, start + QUERY_CHUNK_SIZE)
+            output += self._query_box_chunk(lows[chunk], highs[chunk])
+        return output
+
+    def _query_box_chunk(self, lows, highs):
+        found_queries, found_indices = [], []
+
+        def keep(node, queries):
+            overlap = np.all(
+                (lows[queries] <= self.high[node])
+                & (highs[queries] >= self.low[node]),
+                axis=1,
+            )
+            return queries[overlap]
+
+        def visit(node, queries):
+            for indices, leaf_points, group in self._leaf_groups(node,
+                                                                 queries):
+                inside = np.all(
+                    (leaf_points >= lows[group, None, :])
+                    & (leaf_points <= highs[group, None, :]),
+                    axis=2,
+                )
+                rows, cols = np.nonzero(inside)
+                found_queries.append(group[rows])
+                found_indices.append(indices[cols])
+
+        self._traverse(lows.shape[0], keep, visit)
+        return _split_by_query(found_queries, found_indices, lows.shape[0])
@@ -1,12 +1,43 @@
 """Objects that map a data array to attributes for visualization"""
 from lfview.resources.files import Array
 import numpy as np
-import omf
 import properties
 from properties.extras import Pointer
 from six import string_types
 
-from .base import _BaseResource, ShortString, from_hex, to_hex
+from .base import (
+    _BaseResource,
+    LazyModule,
+    ShortString,
+    colors_from_hex,
+    colors_to_hex,
+    from_hex,
+    to_hex,
+)
+from .cache import with_export_context
+
+omf = LazyModule('omf')  #pylint: disable=invalid-name
+
+
+def serialize_values(value):
+    """Serialize mapping values, converting all colors to hex at once"""
+    if value and isinstance(value[0], tuple):
+        return colors_to_hex(value)
+    return None if value is None else list(value)
+
+
+def deserialize_values(value):
+    """Deserialize mapping values, converting all hex colors at once
+
+    Values that are not all hex colors are returned unchanged, to be
+    validated as floats or strings.
+    """
+    if value and all(isinstance(val, string_types) for val in value):
+        try:
+            return colors_from_hex(value).tolist()
+        except ValueError:
+            pass
+    return value
 
 
 class _BaseMapping(_BaseResource):
@@ -168,6 +199,8 @@ class MappingDiscrete(_BaseDataMapping):
                 max_length=256,
             ),
         ],
+        serializer=serialize_values,
+        deserializer=deserialize_values,
     )
     end_points = properties.List(
         'Data end values of discrete intervals; these also correspond to '
@@ -270,6 +303,8 @@ class MappingCategory(_BaseDataMapping):
                 max_length=256,
             ),
         ],
+        serializer=serialize_values,
+        deserializer=deserialize_values,
     )
     indices = properties.List(
         'Array indices for values',
@@ -313,23 +348,51 @@ class MappingCategory(_BaseDataMapping):
                 instance=self,
             )
 
-    def to_omf(self, index_map):
+    def value_lookup(self):
+        """Dictionary from each index to its corresponding value"""
+        return dict(zip(self.indices, self.values))
+
+    @with_export_context
+    def to_omf(self, index_map, lookup=None):
+        """Convert to OMF legend with values ordered by index_map
+
+        Optionally, a precomputed lookup from
+        :code:`value_lookup()` may be provided; otherwise it is
+        computed here.
+        """
         self.validate()
-        new_values = []
         if not self.values or isinstance(self.values[0], float):
             nan_value = np.nan
         elif isinstance(self.values[0], string_types):
             nan_value = ''
         else:
             nan_value = [255, 255, 255]
-        for ind in index_map:
-            try:
-                new_values.append(self.values[self.indices.index(ind)])
-            except ValueError:
-                new_values.append(nan_value)
+        if lookup is None:
+            lookup = self.value_lookup()
+        new_values = [lookup.get(ind, nan_value) for ind in index_map]
         omf_legend = omf.Legend(
             name=self.name or '',
             description=self.description or '',
             values=new_values,
         )
         return omf_legend
+
+    @classmethod
+    def from_omf(cls, omf_legend):
+        """Create category mapping from an omf.Legend
+
+        Legend entries are assigned indices 0 to N-1, matching the
+        indices of the omf.MappedData array.
+        """
+        values = omf_legend.values.array
+        if isinstance(values, np.ndarray):
+            values = values.tolist()
+        else:
+            values = list(values)
+        return cls(
+            name=omf_legend.name,
+            description=omf_legend.description,
+            values=values,
+            indices=list(range(len(values))),
+            visibility=[True] * len(values),
+        )
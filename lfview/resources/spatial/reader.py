@@ -0,0 +1,263 @@
+"""Read OMF files into spatial resources"""
+from functools import partial
+import struct
+import threading
+import uuid
+import zlib
+
+from lfview.resources.files import Image
+import numpy as np
+import omf
+from omf.fileio import COMPATIBILITY_VERSION
+from omf.serializers import png_deserializer
+from six import string_types
+
+from . import jsonio
+from .arrays import LazyArray
+from .data import DataBasic, DataCategory, OMF_LOCATIONS
+from .elements import (
+    ElementPointSet,
+    ElementLineSet,
+    ElementSurface,
+    ElementSurfaceGrid,
+    ElementVolumeGrid,
+    element_from_omf,
+)
+from .mappings import MappingCategory
+from .textures import TextureProjection
+
+ARRAY_SHAPES = {
+    'ScalarArray': (-1, ),
+    'Int2Array': (-1, 2),
+    'Int3Array': (-1, 3),
+    'Vector2Array': (-1, 2),
+    'Vector3Array': (-1, 3),
+}
+GEOMETRY_ARRAYS = {
+    'PointSetGeometry': (ElementPointSet, ['vertices']),
+    'LineSetGeometry': (ElementLineSet, ['vertices', 'segments']),
+    'SurfaceGeometry': (ElementSurface, ['vertices', 'triangles']),
+    'SurfaceGridGeometry': (ElementSurfaceGrid, ['offset_w']),
+    'VolumeGridGeometry': (ElementVolumeGrid, []),
+}
+GEOMETRY_PROPS = {
+    'SurfaceGridGeometry': [
+        'origin', 'tensor_u', 'tensor_v', 'axis_u', 'axis_v'
+    ],
+    'VolumeGridGeometry': [
+        'origin', 'tensor_u', 'tensor_v', 'tensor_w', 'axis_u', 'axis_v',
+        'axis_w'
+    ],
+}
+
+
+def _set_unvalidated(resource, name, value):
+    """Set a property value without validation, which may read arrays"""
+    resource._backend[name] = value  #pylint: disable=protected-access
+
+
+def read_omf(fname):
+    """Read an OMF file into a list of spatial elements
+
+    The entire project is read with :code:`omf.OMFReader` and
+    converted with :code:`from_omf`. To read arrays only on first
+    access, use :class:`LazyOMFReader` instead.
+    """
+    project = omf.OMFReader(fname).get_project()
+    return [element_from_omf(element) for element in project.elements]
+
+
+class LazyOMFReader(object):
+    """Reads an OMF file into spatial elements without reading arrays
+
+    On initialization, only the OMF header and JSON project metadata
+    are read. The element and data resource graph is built immediately
+    and is available as :code:`elements`; however, every geometry and
+    data array is a :class:`lfview.resources.spatial.arrays.LazyArray`
+    that is only read from the file when accessed. This allows
+    inspecting and filtering very large projects with minimal startup
+    cost.
+
+    OMF arrays are stored zlib-compressed so they cannot be
+    memory-mapped; instead, each array is read and decompressed
+    independently on first access. Float arrays are read-only views of
+    the decompressed bytes. Small legend arrays and texture images are
+    read immediately.
+
+    Lazily-built resources are not validated on construction, since
+    that would require reading the arrays; call :code:`validate()` to
+    read and validate them. The file remains open until
+    :code:`close()` is called or the reader, used as a context
+    manager, exits:
+
+    .. code::
+
+      with LazyOMFReader('project.omf') as reader:
+          names = [element.name for element in reader.elements]
+    """
+
+    def __init__(self, fopen):
+        opened = isinstance(fopen, string_types)
+        if opened:
+            fopen = open(fopen, 'rb')
+        self._fopen = fopen
+        self._lock = threading.Lock()
+        try:
+            self._json_start = self._read_header()
+            self._fopen.seek(self._json_start, 0)
+            self._json = jsonio.loads(self._fopen.read())
+        except Exception:
+            if opened:
+                fopen.close()
+            raise
+        project = self._json[self.uid]
+        self.name = project.get('name', '')
+        self.description = project.get('description', '')
+        self.elements = [
+            self._element(uid) for uid in project.get('elements', [])
+        ]
+
+    def close(self):
+        """Close the underlying file; unread arrays can no longer load"""
+        self._fopen.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read_header(self):
+        """Check magic number and version; return json start location"""
+        self._fopen.seek(0, 0)
+        if self._fopen.read(4) != b'\x84\x83\x82\x81':
+            raise ValueError('Invalid OMF file')
+        version = struct.unpack('<32s', self._fopen.read(32))[0]
+        version = version[0:len(COMPATIBILITY_VERSION)]
+        if version != COMPATIBILITY_VERSION:
+            raise ValueError(
+                'Version mismatch: file version {}, reader version {}'.format(
+                    version, COMPATIBILITY_VERSION
+                )
+            )
+        uid_bytes = struct.unpack('<16s', self._fopen.read(16))[0]
+        self.uid = str(uuid.UUID(bytes=uid_bytes))
+        return struct.unpack('<Q', self._fopen.read(8))[0]
+
+    def _read_bytes(self, index):
+        """Read and decompress a binary blob from the file"""
+        with self._lock:
+            self._fopen.seek(index['start'], 0)
+            return zlib.decompress(self._fopen.read(index['length']))
+
+    def _read_array(self, index, shape, offset=None):
+        """Read an array from the file, optionally adding offset"""
+        if index['dtype'] not in ('<i8', '<f8'):
+            raise ValueError('Invalid array dtype: {}'.format(index['dtype']))
+        array = np.frombuffer(self._read_bytes(index), index['dtype'])
+        array = array.reshape(shape)
+        if offset is not None and np.any(offset):
+            array = array + offset
+        return array
+
+    def _lazy_array(self, uid, offset=None):
+        """Create a LazyArray for the array with the given uid"""
+        entry = self._json[uid]
+        index = entry['array']
+        kwargs = {}
+        if index['dtype'] == '<f8':
+            kwargs['dtype'] = 'Float64Array'
+        loader = partial(
+            self._read_array,
+            index,
+            ARRAY_SHAPES[entry['__class__']],
+            offset,
+        )
+        return LazyArray(loader, **kwargs)
+
+    def _legend(self, uid):
+        """Create a MappingCategory from an OMF legend"""
+        entry = self._json[uid]
+        values_entry = self._json[entry['values']]
+        values = values_entry['array']
+        if isinstance(values, dict):
+            values = self._read_array(values, (-1, )).tolist()
+        return MappingCategory(
+            name=entry.get('name', ''),
+            description=entry.get('description', ''),
+            values=values,
+            indices=list(range(len(values))),
+            visibility=[True] * len(values),
+        )
+
+    def _data(self, uid):
+        """Create DataBasic or DataCategory, or None if unsupported
+
+        As in :func:`lfview.resources.spatial.data.data_from_omf`,
+        MappedData with no legends becomes DataBasic.
+        """
+        entry = self._json[uid]
+        kwargs = {
+            'name': entry.get('name', ''),
+            'description': entry.get('description', ''),
+            'location': OMF_LOCATIONS[entry['location']],
+        }
+        if (entry['__class__'] == 'ScalarData'
+                or entry['__class__'] == 'MappedData'
+                and not entry.get('legends')):
+            data = DataBasic(**kwargs)
+        elif entry['__class__'] == 'MappedData':
+            legends = [self._legend(legend) for legend in entry['legends']]
+            data = DataCategory(
+                categories=legends[0], mappings=legends[1:], **kwargs
+            )
+        else:
+            return None
+        _set_unvalidated(data, 'array', self._lazy_array(entry['array']))
+        return data
+
+    def _texture(self, uid):
+        """Create a TextureProjection, reading its image immediately"""
+        entry = self._json[uid]
+        return TextureProjection(
+            name=entry.get('name', ''),
+            description=entry.get('description', ''),
+            origin=entry['origin'],
+            axis_u=entry['axis_u'],
+            axis_v=entry['axis_v'],
+            image=Image(png_deserializer(entry['image'], self._fopen)),
+        )
+
+    def _element(self, uid):
+        """Create a spatial element backed by lazy arrays"""
+        entry = self._json[uid]
+        geometry = self._json[entry['geometry']]
+        geometry_class = geometry['__class__']
+        if geometry_class not in GEOMETRY_ARRAYS:
+            raise ValueError(
+                'Unsupported OMF geometry: {}'.format(geometry_class)
+            )
+        element_class, array_props = GEOMETRY_ARRAYS[geometry_class]
+        kwargs = {
+            prop: geometry[prop]
+            for prop in GEOMETRY_PROPS.get(geometry_class, [])
+        }
+        data = [self._data(data_uid) for data_uid in entry.get('data', [])]
+        data = [item for item in data if item is not None]
+        data += [self._texture(tex) for tex in entry.get('textures', [])]
+        element = element_class(
+            name=entry.get('name', ''),
+            description=entry.get('description', ''),
+            data=data,
+            **kwargs
+        )
+        for prop in array_props:
+            if not geometry.get(prop):
+                continue
+            offset = geometry.get('origin') if prop == 'vertices' else None
+            _set_unvalidated(
+                element, prop, self._lazy_array(geometry[prop], offset)
+            )
+        if 'color' in entry:
+            element.defaults.color.value = entry['color']
+        return element
@@ -0,0 +1,200 @@
+"""Resolve Pointer uids in spatial resource graphs from a local store"""
+import io
+import os
+
+import properties
+from six import string_types
+
+from . import jsonio
+from .batch import (
+    POINTER_PROPS,
+    _deserialize,
+    resolve_pointers,
+    resource_class,
+)
+from .cache import LRUCache
+from .context import ExportContext
+
+RESOLVER_CACHE_SIZE = 4096
+
+
+class DictStore(object):
+    """In-memory store of serialized resource dictionaries keyed by uid"""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def __contains__(self, uid):
+        return uid in self.values
+
+    def get(self, uid):
+        """Return the serialized dictionary for uid
+
+        Raises a KeyError if uid is not in the store.
+        """
+        return self.values[uid]
+
+    def put(self, value):
+        """Save a serialized dictionary under its uid"""
+        self.values[value['uid']] = value
+
+
+class DirectoryStore(object):
+    """Store of serialized resources saved as JSON files in a directory
+
+    Each resource is saved as
+    :code:`<directory>/<BASE_TYPE>/<SUB_TYPE>/<id>.json`, where the
+    types and id are parsed from the uid.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, uid):
+        """Return the file path for a spatial resource uid"""
+        resource_class({'uid': uid}).validate_uid(uid)
+        return os.path.join(self.directory, *uid.split('/')[-3:]) + '.json'
+
+    def __contains__(self, uid):
+        try:
+            return os.path.isfile(self.path(uid))
+        except (ValueError, properties.ValidationError):
+            return False
+
+    def get(self, uid):
+        """Return the serialized dictionary for uid
+
+        Raises a KeyError if uid is not in the store.
+        """
+        if uid not in self:
+            raise KeyError(uid)
+        with io.open(self.path(uid), 'rb') as fid:
+            return jsonio.loads(fid.read())
+
+    def put(self, value):
+        """Save a serialized dictionary under its uid"""
+        fname = self.path(value['uid'])
+        if not os.path.isdir(os.path.dirname(fname)):
+            os.makedirs(os.path.dirname(fname))
+        with io.open(fname, 'wb') as fid:
+            fid.write(jsonio.dumps(value).encode('utf-8'))
+
+
+def _is_spatial_uid(value):
+    try:
+        resource_class({'uid': value})
+    except ValueError:
+        return False
+    return True
+
+
+def pointer_uids(instance):
+    """Return spatial resource uids that instance points to
+
+    Pointers within Lists, Unions, and nested instances, such as
+    default options or inline resources, are included. Pointers to
+    other resources, for example, files, are not.
+    """
+    output = []
+
+    def collect(value):
+        if isinstance(value, string_types):
+            if _is_spatial_uid(value):
+                output.append(value)
+        elif isinstance(value, list):
+            for val in value:
+                collect(val)
+        elif isinstance(value, properties.HasProperties):
+            backend = value._backend  #pylint: disable=protected-access
+            for name, val in backend.items():
+                prop = value._props[name]  #pylint: disable=protected-access
+                if isinstance(prop, POINTER_PROPS):
+                    collect(val)
+
+    collect(instance)
+    return output
+
+
+class PointerResolver(object):
+    """Load spatial resources and the resources they point to by uid
+
+    Serialized resources are read from store, which may be a
+    :class:`DictStore`, a :class:`DirectoryStore`, or any object with
+    :code:`get(uid)` and :code:`__contains__`. Resolving a uid walks
+    the resource graph; each uid is read and deserialized only once,
+    and every Pointer to it is replaced by the same resource instance.
+    Pointers to uids that are not in the store are left as uids.
+
+    .. code::
+
+      resolver = PointerResolver(DirectoryStore('cache'))
+      element = resolver.resolve(uid)
+
+    Resolved resources are kept in a least-recently-used cache of
+    max_entries resources, so later calls reuse the same instances
+    rather than rebuilding them. Cached resources are returned
+    directly, so modifying one modifies it everywhere it is used;
+    call :code:`clear` after the store changes.
+    """
+
+    def __init__(self, store, max_entries=RESOLVER_CACHE_SIZE):
+        self.store = store
+        self.max_entries = max_entries
+        self._cache = LRUCache(max_entries)
+
+    @property
+    def hits(self):
+        """Number of resources served from the cache"""
+        return self._cache.hits
+
+    @property
+    def misses(self):
+        """Number of uids that were not in the cache"""
+        return self._cache.misses
+
+    def resolve(self, uid, **kwargs):
+        """Return the resource for uid with all Pointers resolved"""
+        return self.resolve_all([uid], **kwargs)[0]
+
+    def resolve_all(self, uids, validate=True, **kwargs):
+        """Return a list of resources for uids with Pointers resolved
+
+        If validate is True (the default), newly loaded resources are
+        validated in a single pass. Keyword arguments are passed to
+        the property deserializers. Raises a KeyError if any of uids
+        are not in the store.
+        """
+        uids = list(uids)
+        resolved = {}
+        loaded = []
+        pending = list(reversed(uids))
+        while pending:
+            uid = pending.pop()
+            if uid in resolved:
+                continue
+            resource = self._cache.get(uid)
+            if resource is None:
+                if uid not in uids and uid not in self.store:
+                    continue
+                value = self.store.get(uid)
+                resource = _deserialize(resource_class(value), value, **kwargs)
+                resource.uid = uid
+                loaded.append(resource)
+                pending.extend(reversed(pointer_uids(resource)))
+            resolved[uid] = resource
+        for resource in loaded:
+            resolve_pointers(resource, resolved)
+        if validate:
+            with ExportContext():
+                for resource in loaded:
+                    resource.validate()
+        for resource in loaded:
+            self._cache.put(resource.uid, resource)
+        return [resolved[uid] for uid in uids]
+
+    def clear(self):
+        """Remove all cached resources"""
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
@@ -1,11 +1,14 @@
 """Texture data objects that place images on elements"""
 from lfview.resources.files import Image
-import omf
 import properties
 from properties.extras import Pointer
 
+from .base import LazyModule
+from .cache import with_export_context
 from .data import _BaseData
 
+omf = LazyModule('omf')  #pylint: disable=invalid-name
+
 
 class _BaseTexture(_BaseData):
     """Base class for texture data"""
@@ -38,6 +41,7 @@ class TextureProjection(_BaseTexture):
         Image,
     )
 
+    @with_export_context
     def to_omf(self):
         self.validate()
         omf_texture = omf.ImageTexture(
@@ -49,3 +53,15 @@ class TextureProjection(_BaseTexture):
             image=self.image.image,
         )
         return omf_texture
+
+    @classmethod
+    def from_omf(cls, omf_texture):
+        """Create projection texture from an omf.ImageTexture"""
+        return cls(
+            name=omf_texture.name,
+            description=omf_texture.description,
+            origin=omf_texture.origin,
+            axis_u=omf_texture.axis_u,
+            axis_v=omf_texture.axis_v,
+            image=Image(omf_texture.image),
+        )
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+import pytest
+
+from lfview.resources import spatial
+
+URL = 'https://example.com/api/{}/{}/{}'
+
+
+@pytest.fixture(autouse=True)
+def seed_random():
+    # Default colors are random; seed them so runs are reproducible
+    random.seed(0)
+
+
+@pytest.fixture
+def make_resources():
+    """Factory for a mapping, data, and surface that point to each other
+
+    The factory returns [mapping, data, surface], all with uids. Data
+    uses mapping, and surface uses data both in its data list and as
+    its default color. Arrays are file uids, or small numpy arrays if
+    arrays is True.
+    """
+
+    def make(arrays=False):
+        if arrays:
+            array = np.arange(3.)
+            vertices = np.random.RandomState(0).rand(3, 3)
+            triangles = [[0, 1, 2]]
+        else:
+            array = URL.format('files', 'array', 'def456')
+            vertices = URL.format('files', 'array', 'jkl012')
+            triangles = URL.format('files', 'array', 'mno345')
+        mapping = spatial.MappingContinuous(
+            uid=URL.format('mappings', 'continuous', 'abc123'),
+            gradient=URL.format('files', 'array', 'abc123'),
+            data_controls=[0., 1, 2, 3],
+        )
+        data = spatial.DataBasic(
+            uid=URL.format('data', 'basic', 'abc123'),
+            array=array,
+            location='nodes',
+            mappings=[mapping],
+        )
+        surface = spatial.ElementSurface(
+            uid=URL.format('elements', 'surface', 'abc123'),
+            name='surface',
+            vertices=vertices,
+            triangles=triangles,
+            data=[data],
+        )
+        surface.defaults.color.data = data
+        surface.defaults.color.mapping = mapping
+        return [mapping, data, surface]
+
+    return make
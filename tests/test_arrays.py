@@ -0,0 +1,234 @@
+import gc
+
+import numpy as np
+import pytest
+
+import omf
+import properties
+from lfview.resources import spatial
+
+
+def test_fingerprint():
+    arr = np.arange(10000)
+    fp = spatial.arrays.fingerprint(arr)
+    assert fp == spatial.arrays.fingerprint(arr)
+    arr[0] = -1
+    assert fp != spatial.arrays.fingerprint(arr)
+    arr[0] = 0
+    assert fp == spatial.arrays.fingerprint(arr)
+    arr[-1] = -1
+    assert fp != spatial.arrays.fingerprint(arr)
+    assert fp != spatial.arrays.fingerprint(arr.astype('int32'))
+
+
+@pytest.mark.parametrize(
+    'arr', [
+        np.array(5),
+        np.arange(100),
+        np.random.RandomState(0).randint(-1000, 1000, size=(1000, 3)),
+        np.random.RandomState(1).rand(50, 4)[:, ::2],
+        np.random.RandomState(2).rand(10, 3).T,
+    ]
+)
+@pytest.mark.parametrize('chunk_size', [1, 7, 2**16])
+def test_minmax(arr, chunk_size):
+    low, high = spatial.arrays.minmax(arr, chunk_size=chunk_size)
+    assert low == np.min(arr)
+    assert high == np.max(arr)
+
+
+def test_minmax_empty():
+    with pytest.raises(ValueError):
+        spatial.arrays.minmax(np.array([]))
+
+
+def test_in_bounds():
+    arr = np.array([[0, 1], [2, 3]])
+    assert spatial.arrays.in_bounds(arr)
+    assert spatial.arrays.in_bounds(arr, low=0, high=4)
+    assert not spatial.arrays.in_bounds(arr, low=1)
+    assert not spatial.arrays.in_bounds(arr, high=3)
+
+
+def test_stats_cache():
+    cache = spatial.arrays.ArrayStatsCache()
+    arr = np.array([[3, 1, 2], [5, 4, 0]])
+    stats = cache.get(arr)
+    assert stats['min'] == 0
+    assert stats['max'] == 5
+    assert stats['shape'] == (2, 3)
+    assert stats['dtype'] == arr.dtype.str
+    assert cache.get(arr) is stats
+    assert cache.hits == 1
+    assert cache.misses == 1
+    arr[0, 0] = 10
+    assert cache.get(arr)['max'] == 10
+    assert cache.misses == 2
+    assert len(cache) == 1
+    del arr
+    gc.collect()
+    assert len(cache) == 0
+
+
+def test_stats_cache_validation():
+    elem = spatial.ElementSurface(
+        vertices=np.random.rand(4, 3),
+        triangles=[[0, 1, 2], [1, 2, 3]],
+    )
+    assert elem.validate()
+    hits = spatial.arrays.STATS_CACHE.hits
+    assert elem.validate()
+    assert spatial.arrays.STATS_CACHE.hits > hits
+    elem.triangles = [[0, 1, 2], [1, 2, 4]]
+    with pytest.raises(properties.ValidationError):
+        elem.validate()
+
+
+def test_wrap_array():
+    arr = np.random.rand(5, 3)
+    wrapped = spatial.arrays.wrap_array(arr)
+    assert wrapped.array is arr
+    assert wrapped.dtype == 'Float64Array'
+    assert wrapped.shape == [5, 3]
+    assert wrapped.content_length == arr.nbytes
+    assert wrapped.validate()
+    ints = np.arange(6, dtype='int64').reshape(3, 2)
+    wrapped = spatial.arrays.wrap_array(ints)
+    assert wrapped.dtype == 'Int32Array'
+    assert np.array_equal(wrapped.array, ints)
+    wrapped = spatial.arrays.wrap_array(arr[:, ::2])
+    assert np.array_equal(wrapped.array, arr[:, ::2])
+    with pytest.raises(ValueError):
+        spatial.arrays.wrap_array(np.array([2**40]))
+
+
+def test_lazy_array():
+    calls = []
+
+    def loader():
+        calls.append(None)
+        return np.arange(10, dtype='int64')
+
+    lazy = spatial.arrays.LazyArray(loader)
+    assert not lazy.loaded
+    assert not calls
+    assert lazy.shape == [10]
+    assert lazy.loaded
+    assert lazy.dtype == 'Int32Array'
+    assert lazy.array.dtype == np.dtype('int32')
+    assert len(calls) == 1
+    assert lazy.validate()
+
+    lazy = spatial.arrays.LazyArray(loader, dtype='Float64Array')
+    assert lazy.dtype == 'Float64Array'
+    assert not lazy.loaded
+    lazy.array = [1., 2.]
+    assert lazy.loaded
+    assert lazy.shape == [2]
+    assert len(calls) == 1
+
+
+def test_omf_array():
+    vertices = np.random.rand(10, 3)
+    with spatial.arrays.CopyTracker() as tracker:
+        omf_vertices = spatial.arrays.omf_array(omf.Vector3Array, vertices)
+        assert np.shares_memory(omf_vertices.array, vertices)
+        assert omf_vertices.validate()
+        triangles = np.zeros((4, 3), dtype='<i4')
+        omf_triangles = spatial.arrays.omf_array(omf.Int3Array, triangles)
+        assert np.shares_memory(omf_triangles.array, triangles)
+        assert tracker.bytes_copied == 0
+        omf_vertices = spatial.arrays.omf_array(
+            omf.Vector3Array, vertices.astype('<f4')
+        )
+        assert omf_vertices.array.dtype == np.dtype('<f8')
+        assert np.allclose(omf_vertices.array, vertices)
+        omf_scalars = spatial.arrays.omf_array(omf.ScalarArray, vertices[:, 0])
+        assert np.array_equal(omf_scalars.array, vertices[:, 0])
+        omf_scalars = spatial.arrays.omf_array(omf.ScalarArray, [1, 2])
+        assert list(omf_scalars.array) == [1, 2]
+    assert tracker.copies == [
+        ('Vector3Array', vertices.nbytes),
+        ('ScalarArray', 80),
+        ('ScalarArray', 16),
+    ]
+    assert tracker.bytes_copied == vertices.nbytes + 96
+    assert spatial.arrays.CopyTracker.active() is None
+    with pytest.raises(ValueError):
+        spatial.arrays.omf_array(omf.Int3Array, vertices)
+    with pytest.raises(ValueError):
+        spatial.arrays.omf_array(omf.Vector3Array, vertices[:, :2])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 2**16])
+def test_compute_bounds(chunk_size):
+    arr = np.random.RandomState(0).randint(-1000, 1000, size=(1000, 3))
+    bounds = spatial.arrays.compute_bounds(arr, chunk_size=chunk_size)
+    assert np.array_equal(bounds, [arr.min(axis=0), arr.max(axis=0)])
+    with pytest.raises(ValueError):
+        spatial.arrays.compute_bounds(np.zeros((0, 3)))
+    with pytest.raises(ValueError):
+        spatial.arrays.compute_bounds(np.zeros(3))
+
+
+def test_content_hash():
+    arr = np.random.RandomState(0).rand(1000, 3)
+    assert len(spatial.arrays.content_hash(arr)) == 64
+    assert spatial.arrays.content_hash(arr) == (
+        spatial.arrays.content_hash(arr.copy())
+    )
+    contiguous = np.ascontiguousarray(arr[:, :2])
+    strided_hash = spatial.arrays.content_hash(arr[:, :2], chunk_size=7)
+    assert strided_hash == spatial.arrays.content_hash(contiguous)
+    assert spatial.arrays.content_hash(arr) != (
+        spatial.arrays.content_hash(arr.reshape(3000))
+    )
+    assert spatial.arrays.content_hash(arr) != (
+        spatial.arrays.content_hash(arr.astype('<f4'))
+    )
+    new_arr = arr.copy()
+    new_arr[500, 1] = -1.
+    assert spatial.arrays.content_hash(arr) != (
+        spatial.arrays.content_hash(new_arr)
+    )
+    assert spatial.arrays.content_hash(np.array(5))
+
+
+def test_dedupe_arrays():
+    vertices = np.random.RandomState(0).rand(10, 3)
+    values = np.arange(10.)
+    surfaces = [
+        spatial.ElementSurface(
+            vertices=vertices.copy(),
+            triangles=[[0, 1, 2]],
+            data=[
+                spatial.DataBasic(array=values.copy(), location='nodes'),
+                spatial.DataBasic(array=values.copy(), location='nodes'),
+            ],
+        ) for _ in range(3)
+    ]
+    surfaces[1].vertices.uid = 'https://example.com/api/files/array/abc123'
+    surfaces[2].data[1].array = np.arange(10.) + 1
+    points = spatial.ElementPointSet(vertices=surfaces[0].vertices)
+    result = spatial.arrays.dedupe_arrays(surfaces + [points])
+    assert result == {
+        'arrays': 12,
+        'unique': 4,
+        'bytes_saved': 2 * vertices.nbytes + 2 * 3 * 4 + 4 * values.nbytes,
+    }
+    for element in surfaces + [points]:
+        assert element.vertices is surfaces[1].vertices
+        assert element.validate()
+    assert surfaces[2].triangles is surfaces[0].triangles
+    data = [datum for surface in surfaces for datum in surface.data]
+    assert all(datum.array is data[0].array for datum in data[:5])
+    assert data[5].array is not data[0].array
+    assert spatial.arrays.dedupe_arrays(surfaces) == {
+        'arrays': 4,
+        'unique': 4,
+        'bytes_saved': 0,
+    }
+
+
+if __name__ == '__main__':
+    pytest.main()
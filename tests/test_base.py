@@ -1,16 +1,17 @@
-import json
-
+import numpy as np
 import pytest
 from six import string_types
 
 import properties
 from lfview.resources import spatial
 
+from .conftest import URL
+
 
 @pytest.mark.parametrize(
     ('rgb_val', 'hex_val'), [
         ((0, 0, 0), '#000000'), ((66, 134, 244), '#4286F4'),
-        ((255, 255, 255), '#FFFFFF')
+        ((255, 255, 255), '#FFFFFF'), ((14, 7, 0), '#0E0700')
     ]
 )
 def test_hex(rgb_val, hex_val):
@@ -24,6 +25,36 @@ def test_hex_errors(hex_val):
         spatial.base.from_hex(hex_val)
 
 
+def test_hex_arrays():
+    colors = np.random.RandomState(0).randint(0, 256, size=(1000, 3))
+    hex_values = spatial.base.colors_to_hex(colors)
+    assert hex_values == [spatial.base.to_hex(color) for color in colors]
+    assert spatial.base.colors_to_hex(colors.astype('uint8')) == hex_values
+    from_hex = spatial.base.colors_from_hex(hex_values)
+    assert from_hex.dtype == np.uint8
+    assert np.array_equal(from_hex, colors)
+    assert spatial.base.colors_from_hex(['ff00aa', '#0a0B0c']).tolist() == [
+        [255, 0, 170], [10, 11, 12]
+    ]
+    assert spatial.base.colors_to_hex([]) == []
+    assert spatial.base.colors_from_hex([]).shape == (0, 3)
+
+
+@pytest.mark.parametrize(
+    'hex_values',
+    [['ABC'], ['#ABCDEF', 'ABCDEF1'], ['ABCDEZ'], [5], [u'\xc4BCDEF']]
+)
+def test_colors_from_hex_errors(hex_values):
+    with pytest.raises(ValueError):
+        spatial.base.colors_from_hex(hex_values)
+
+
+@pytest.mark.parametrize('colors', [[[0, 0, 256]], [[-1, 0, 0]], [[0, 0]]])
+def test_colors_to_hex_errors(colors):
+    with pytest.raises(ValueError):
+        spatial.base.colors_to_hex(colors)
+
+
 class Something(properties.HasProperties):
 
     my_string = properties.String('')
@@ -98,5 +129,55 @@ def test_props():
     assert base._props['description'].max_length == 5000
 
 
+def test_deferred_validation():
+    mapping = spatial.MappingDiscrete(
+        values=['red', 'blue'],
+        end_points=[1.],
+        end_inclusive=[True],
+        visibility=[True, True],
+    )
+    surf = spatial.ElementSurface(
+        name='surface',
+        vertices=URL.format('files', 'array', 'abc123'),
+        triangles=URL.format('files', 'array', 'def456'),
+        data=[
+            spatial.DataBasic(
+                array=URL.format('files', 'array', 'ghi789'),
+                location='nodes',
+                mappings=[mapping],
+            ),
+        ],
+    )
+    serialized = surf.serialize()
+    new_surf = spatial.ElementSurface.deserialize(
+        serialized, defer_validation=True
+    )
+    assert new_surf._unvalidated
+    assert new_surf.data[0]._unvalidated
+    assert new_surf.data[0].mappings[0]._unvalidated
+    assert new_surf.vertices == surf.vertices
+    assert new_surf.validate()
+    assert not new_surf._unvalidated
+    assert not new_surf.data[0].mappings[0]._unvalidated
+    assert properties.equal(new_surf, surf)
+
+    serialized['name'] = 5
+    serialized['data'][0]['mappings'][0]['visibility'] = [True]
+    new_surf = spatial.ElementSurface.deserialize(
+        serialized, defer_validation=True
+    )
+    assert new_surf.name == 5
+    with pytest.raises(properties.ValidationError):
+        new_surf.validate()
+    assert new_surf._unvalidated
+    new_surf.name = 'surface'
+    with pytest.raises(properties.ValidationError):
+        new_surf.to_omf()
+    new_surf.data[0].mappings[0].visibility = [True, True]
+    assert new_surf.validate()
+    with pytest.raises(properties.ValidationError):
+        spatial.ElementSurface.deserialize(serialized)
+
+
 if __name__ == '__main__':
     pytest.main()
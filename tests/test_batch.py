@@ -0,0 +1,93 @@
+import pytest
+
+import properties
+from lfview.resources import spatial
+from lfview.resources.spatial import batch
+
+from .conftest import URL
+
+
+def _resources(make_resources):
+    mapping, data, surface = make_resources()
+    inline_data = spatial.DataBasic(
+        array=URL.format('files', 'array', 'ghi789'),
+        location='nodes',
+        mappings=[mapping],
+    )
+    surface.data = [data, inline_data]
+    return [mapping, data, surface]
+
+
+def test_dispatch_table():
+    table = batch.DISPATCH_TABLE
+    assert table[('elements', 'surface')] is spatial.ElementSurface
+    assert table[('mappings', 'category')] is spatial.MappingCategory
+    assert len(table) == 11
+    data_class = batch.resource_class({'__class__': 'DataBasic'})
+    assert data_class is spatial.DataBasic
+    assert batch.resource_class(
+        {'uid': URL.format('textures', 'projection', 'abc123')}
+    ) is spatial.TextureProjection
+    for value in [
+        {'__class__': '_BaseData'},
+        {'__class__': 'Unknown'},
+        {'uid': URL.format('files', 'array', 'abc123')},
+        {},
+    ]:
+        with pytest.raises(ValueError):
+            batch.resource_class(value)
+
+
+def test_serialize_resources(make_resources):
+    mapping, data, surface = _resources(make_resources)
+    serialized = spatial.serialize_resources([mapping, data, surface])
+    assert serialized[0] == mapping.serialize()
+    assert serialized[1]['mappings'] == [mapping.uid]
+    assert serialized[2]['data'][0] == data.uid
+    assert serialized[2]['data'][1]['mappings'] == [mapping.uid]
+    assert serialized[2]['defaults']['color']['data'] == data.uid
+    assert serialized[2]['defaults']['color']['mapping'] == mapping.uid
+    assert surface.serialize()['data'][0]['mappings'][0]['data_controls'] == [
+        0., 1, 2, 3
+    ]
+    serialized = spatial.serialize_resources([data], snapshot=True)
+    assert serialized[0]['mappings'][0]['uid'] == mapping.uid
+
+
+def test_deserialize_resources(make_resources):
+    resources = _resources(make_resources)
+    serialized = spatial.serialize_resources(resources)
+    mapping, data, surface = spatial.deserialize_resources(serialized)
+    for old, new in zip(resources, [mapping, data, surface]):
+        assert properties.equal(old, new)
+    assert data.mappings[0] is mapping
+    assert surface.data[0] is data
+    assert surface.data[1].mappings[0] is mapping
+    assert surface.defaults.color.data is data
+    assert surface.defaults.color.mapping is mapping
+    assert surface.defaults.color.value == resources[2].defaults.color.value
+    surface.defaults.color.value = 'red'
+    assert surface.defaults.color.value == (255, 0, 0)
+
+    for value in serialized:
+        value.pop('__class__')
+    new_resources = spatial.deserialize_resources(serialized)
+    assert isinstance(new_resources[2], spatial.ElementSurface)
+    assert new_resources[2].data[0] is new_resources[1]
+
+
+def test_deserialize_resources_validation(make_resources):
+    serialized = spatial.serialize_resources(make_resources())
+    serialized[0]['data_controls'] = [3., 2, 1, 0]
+    mapping = spatial.deserialize_resources(serialized, validate=False)[0]
+    with pytest.raises(properties.ValidationError):
+        mapping.validate()
+    with pytest.raises(properties.ValidationError):
+        spatial.deserialize_resources(serialized)
+    serialized[2]['name'] = 5
+    with pytest.raises(properties.ValidationError):
+        spatial.deserialize_resources(serialized, validate=False)
+
+
+if __name__ == '__main__':
+    pytest.main()
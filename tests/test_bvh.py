@@ -0,0 +1,166 @@
+import pytest
+
+import numpy as np
+from lfview.resources import spatial
+from lfview.resources.spatial.bvh import (
+    closest_on_triangle,
+    morton_codes,
+    ray_triangle,
+)
+
+
+def random_mesh(seed, num_vertices=200, num_triangles=300):
+    rng = np.random.RandomState(seed)
+    vertices = rng.rand(num_vertices, 3)
+    triangles = rng.randint(0, num_vertices, (num_triangles, 3))
+    return vertices, triangles
+
+
+def test_morton_codes():
+    points = np.array([[0., 0, 0], [1., 0, 0], [0., 1, 0], [0., 0, 1]])
+    codes = morton_codes(points)
+    assert list(codes[1:]) == [
+        0x9249249 << 2 & 0x3fffffff,
+        0x9249249 << 1 & 0x3fffffff,
+        0x9249249 & 0x3fffffff,
+    ]
+    assert codes[0] == 0
+    assert np.array_equal(morton_codes(np.ones((3, 3))), [0, 0, 0])
+
+
+def test_closest_on_triangle():
+    rng = np.random.RandomState(0)
+    vert_a, vert_b, vert_c = rng.rand(3, 100, 3)
+    points = rng.rand(100, 3) * 3 - 1
+    bary = closest_on_triangle(points, vert_a, vert_b, vert_c)
+    assert np.allclose(bary.sum(axis=1), 1.)
+    assert np.all(bary >= 0)
+    corners = np.stack([vert_a, vert_b, vert_c], axis=1)
+    closest = (bary[:, :, None] * corners).sum(axis=1)
+    dist = np.linalg.norm(closest - points, axis=1)
+    coords = np.linspace(0, 1, 50)
+    coord_u, coord_v = [grid.ravel() for grid in np.meshgrid(coords, coords)]
+    inside = coord_u + coord_v <= 1
+    weights = np.c_[1 - coord_u - coord_v, coord_u, coord_v][inside]
+    for i in range(100):
+        samples = weights.dot(corners[i])
+        assert dist[i] <= np.linalg.norm(samples - points[i], axis=1).min()
+    bary = closest_on_triangle(np.ones((1, 3)), *np.zeros((3, 1, 3)))
+    assert np.array_equal(bary, [[1., 0., 0.]])
+
+
+def test_ray_triangle():
+    vert_a, vert_b, vert_c = np.array([[0., 0, 0], [1., 0, 0], [0., 1, 0]])
+    dist, bary = ray_triangle(
+        np.array([[0.25, 0.25, 2.], [0.25, 0.25, -1.], [2., 2., 1.]]),
+        np.array([[0., 0, -1], [0., 0, 0.5], [0., 0, -1]]),
+        vert_a,
+        vert_b,
+        vert_c,
+    )
+    assert np.allclose(dist[:2], [2., 2.])
+    assert dist[2] == np.inf
+    assert np.allclose(bary[:2], [[0.5, 0.25, 0.25]] * 2)
+    dist, _ = ray_triangle(
+        np.array([[0.25, 0.25, 1.]]),
+        np.array([[0., 0, 1]]),
+        vert_a,
+        vert_b,
+        vert_c,
+    )
+    assert dist[0] == np.inf
+
+
+@pytest.mark.parametrize('leaf_size', [1, 3, 16])
+def test_closest_point(leaf_size):
+    vertices, triangles = random_mesh(leaf_size)
+    bvh = spatial.TriangleBVH(vertices, triangles, leaf_size=leaf_size)
+    points = np.random.RandomState(1).rand(100, 3) * 1.5 - 0.25
+    dist, indices, bary = bvh.closest_point(points)
+    all_bary = closest_on_triangle(
+        points[:, None], *np.transpose(vertices[triangles], (1, 0, 2))
+    )
+    all_closest = (all_bary[..., None] * vertices[triangles]).sum(axis=2)
+    all_dist = np.linalg.norm(all_closest - points[:, None], axis=2)
+    assert np.allclose(dist, all_dist.min(axis=1))
+    closest = (bary[:, :, None] * vertices[triangles[indices]]).sum(axis=1)
+    assert np.allclose(np.linalg.norm(closest - points, axis=1), dist)
+
+
+@pytest.mark.parametrize('leaf_size', [1, 3, 16])
+def test_intersect(leaf_size):
+    vertices, triangles = random_mesh(leaf_size + 10)
+    bvh = spatial.TriangleBVH(vertices, triangles, leaf_size=leaf_size)
+    rng = np.random.RandomState(2)
+    origins = rng.rand(200, 3) - [0., 0., 1.]
+    directions = rng.rand(200, 3) - [0.5, 0.5, -0.5]
+    dist, indices, bary = bvh.intersect(origins, directions)
+    all_dist, _ = ray_triangle(
+        origins[:, None], directions[:, None],
+        *np.transpose(vertices[triangles], (1, 0, 2))
+    )
+    assert np.allclose(dist, all_dist.min(axis=1))
+    hit = indices >= 0
+    assert hit.any() and not hit.all()
+    assert np.all(np.isinf(dist[~hit]))
+    assert np.all(np.isnan(bary[~hit]))
+    points = origins[hit] + dist[hit, None] * directions[hit]
+    assert np.allclose(
+        points,
+        (bary[hit, :, None] * vertices[triangles[indices[hit]]]).sum(axis=1),
+    )
+
+
+def test_chunks(monkeypatch):
+    vertices, triangles = random_mesh(3)
+    bvh = spatial.TriangleBVH(vertices, triangles, leaf_size=4)
+    points = np.random.RandomState(4).rand(50, 3)
+    directions = np.tile([0., 0., 1.], (50, 1))
+    expected = bvh.closest_point(points) + bvh.intersect(points, directions)
+    monkeypatch.setattr(spatial.bvh, 'QUERY_CHUNK_SIZE', 7)
+    output = bvh.closest_point(points) + bvh.intersect(points, directions)
+    for exp, out in zip(expected, output):
+        np.testing.assert_array_equal(exp, out)
+
+
+def test_sample():
+    vertices = np.array([[0., 0, 0], [1., 0, 0], [0., 1, 0], [1., 1, 0]])
+    triangles = np.array([[0, 1, 2], [1, 3, 2]])
+    bvh = spatial.TriangleBVH(vertices, triangles)
+    dist, indices, bary = bvh.intersect(
+        [[0.25, 0.25, 1.], [0.75, 0.75, 1.], [2., 2., 1.]],
+        [[0., 0., -1.]] * 3,
+    )
+    assert np.array_equal(indices, [0, 1, -1])
+    values = bvh.sample([0., 1., 2., 3.], indices, bary, 'nodes')
+    assert np.allclose(values[:2], [0.75, 2.25])
+    assert np.isnan(values[2])
+    values = bvh.sample([[5., 6.], [7., 8.]], indices, bary, 'cells')
+    assert np.array_equal(values[:2], [[5., 6.], [7., 8.]])
+    assert np.all(np.isnan(values[2]))
+    _, indices, bary = bvh.closest_point([[0.75, 0.75, 1.]])
+    assert np.allclose(bvh.sample(vertices, indices, bary), [[0.75, 0.75, 0]])
+    with pytest.raises(ValueError):
+        bvh.sample([0., 1.], indices, bary, 'nodes')
+    with pytest.raises(ValueError):
+        bvh.sample([0., 1.], indices, bary, 'edges')
+
+
+def test_errors():
+    vertices, triangles = random_mesh(0)
+    with pytest.raises(ValueError):
+        spatial.TriangleBVH(vertices[:, :2], triangles)
+    with pytest.raises(ValueError):
+        spatial.TriangleBVH(vertices, triangles[:, :2])
+    with pytest.raises(ValueError):
+        spatial.TriangleBVH(vertices, np.zeros((0, 3), dtype=int))
+    with pytest.raises(ValueError):
+        spatial.TriangleBVH(vertices, triangles + 1)
+    bvh = spatial.TriangleBVH(vertices, triangles)
+    with pytest.raises(ValueError):
+        bvh.intersect(np.zeros((2, 3)), np.ones((3, 3)))
+    with pytest.raises(ValueError):
+        bvh.closest_point(np.zeros((2, 2)))
+    dist, indices, bary = bvh.closest_point(np.zeros((0, 3)))
+    assert dist.shape == indices.shape == (0, )
+    assert bary.shape == (0, 3)
@@ -0,0 +1,154 @@
+import json
+
+import numpy as np
+import pytest
+
+import properties
+from lfview.resources import spatial
+
+
+def test_lru_cache():
+    cache = spatial.cache.LRUCache(max_size=4, sizeof=len)
+    cache.put('a', 'xx')
+    cache.put('b', 'x')
+    assert cache.get('a') == 'xx'
+    assert cache.get('c') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.put('c', 'xx')
+    assert cache.get('b') is None
+    assert cache.size == 4
+    cache.put('d', 'xxxxx')
+    assert cache.get('d') is None
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def _surface():
+    return spatial.ElementSurface(
+        name='surface',
+        vertices=np.random.rand(10000, 3),
+        triangles=[[0, 1, 2]],
+        data=[
+            spatial.DataBasic(
+                name='data',
+                array=np.random.rand(10000),
+                location='nodes',
+            ),
+        ],
+    )
+
+
+def test_content_key():
+    surf = _surface()
+    key = spatial.cache.content_key(surf)
+    assert hash(key) == hash(spatial.cache.content_key(surf))
+    surf.name = 'new name'
+    assert spatial.cache.content_key(surf) != key
+    key = spatial.cache.content_key(surf)
+    surf.data[0].array.array[0] = 10.
+    assert spatial.cache.content_key(surf) != key
+    key = spatial.cache.content_key(surf)
+    surf.vertices = np.random.rand(10000, 3)
+    assert spatial.cache.content_key(surf) != key
+
+
+def test_omf_cache():
+    surf = _surface()
+    cache = spatial.cache.OMFCache()
+    with cache:
+        omf_surf = surf.to_omf()
+    assert cache.hits == 0
+    assert len(cache) == 2
+    assert cache.nbytes > surf.data[0].array.array.nbytes
+    assert spatial.cache.OMFCache.active() is None
+    with cache:
+        assert surf.to_omf() is omf_surf
+    assert cache.hits == 1
+    surf.name = 'new name'
+    with cache:
+        new_omf_surf = surf.to_omf()
+    assert new_omf_surf is not omf_surf
+    assert new_omf_surf.name == 'new name'
+    assert new_omf_surf.data[0] is omf_surf.data[0]
+    assert cache.hits == 2
+    assert surf.to_omf() is not new_omf_surf
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_omf_cache_max_bytes():
+    surf = _surface()
+    cache = spatial.cache.OMFCache(
+        max_bytes=surf.data[0].array.array.nbytes + 100
+    )
+    with cache:
+        surf.to_omf()
+    assert len(cache) == 1
+    surf.data[0].array = np.random.rand(10000)
+    with cache:
+        surf.data[0].to_omf(cell_location='faces')
+        surf.data[0].to_omf(cell_location='cells')
+    assert len(cache) == 1
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.misses == 4
+
+
+def test_snapshot_cache():
+    cache = spatial.cache.SnapshotCache(max_entries=2)
+    options = spatial.OptionsSurface()
+    output = cache.serialize(options, snapshot=True)
+    assert json.loads(output) == options.serialize(snapshot=True)
+    assert cache.serialize(properties.copy(options), snapshot=True) is output
+    assert cache.hits == 1
+    options.opacity.value = 0.5
+    new_output = cache.serialize(options, snapshot=True)
+    assert new_output != output
+    assert json.loads(new_output)['opacity']['value'] == 0.5
+
+    first = cache.deserialize(spatial.OptionsSurface, new_output)
+    second = cache.deserialize(spatial.OptionsSurface, new_output)
+    assert cache.hits == 2
+    assert first is not second
+    assert first.opacity is not second.opacity
+    assert properties.equal(first, options)
+    assert properties.equal(second, options)
+    first.opacity.value = 0.25
+    assert second.opacity.value == 0.5
+    with pytest.raises(properties.ValidationError):
+        first.opacity.value = 2.
+    with pytest.raises(properties.ValidationError):
+        cache.deserialize(spatial.OptionsSurface, '{"opacity": {"value": 2}}')
+
+    assert len(cache) == 3
+    cache.serialize(spatial.OptionsPoints(), snapshot=True)
+    assert len(cache) == 3
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_snapshot_cache_elements():
+    spatial.cache.SNAPSHOT_CACHE.clear()
+    elements = [
+        spatial.ElementPointSet(vertices=np.random.rand(3, 3))
+        for _ in range(3)
+    ]
+    for elem in elements[:2]:
+        elem.defaults.color.value = 'blue'
+    elements[-1].defaults.color.value = 'red'
+    serialized = [elem.serialize(snapshot=True) for elem in elements]
+    assert serialized[0]['defaults'] is serialized[1]['defaults']
+    assert serialized[0]['defaults'] != serialized[2]['defaults']
+    new_elements = [
+        spatial.ElementPointSet.deserialize(val) for val in serialized
+    ]
+    assert new_elements[0].defaults is not new_elements[1].defaults
+    assert new_elements[2].defaults.color.value == (255, 0, 0)
+    new_elements[0].defaults.color.value = 'green'
+    assert new_elements[1].defaults.color.value == (0, 0, 255)
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import properties
+from lfview.resources import spatial
+
+
+def test_export_context():
+    mapping = spatial.MappingCategory(
+        values=['a', 'b'],
+        indices=[0, 1],
+        visibility=[True, True],
+    )
+    data = [
+        spatial.DataCategory(
+            array=[0, 1, 1],
+            location='nodes',
+            categories=mapping,
+            mappings=[mapping],
+        ) for _ in range(5)
+    ]
+    elem = spatial.ElementPointSet(
+        vertices=[[0., 0, 0], [1, 1, 1], [2, 2, 2]],
+        data=data,
+    )
+    assert spatial.context.ExportContext.active() is None
+    with spatial.context.ExportContext() as context:
+        assert spatial.context.ExportContext.active() is context
+        elem.to_omf()
+        assert context.validated == 7
+        assert context.skipped > 0
+        skipped = context.skipped
+        assert mapping.validate()
+        assert context.skipped == skipped + 1
+    assert spatial.context.ExportContext.active() is None
+
+
+def test_export_context_release():
+    mapping = spatial.MappingCategory(
+        values=['a', 'b'],
+        indices=[0, 1],
+        visibility=[True],
+    )
+    with spatial.context.ExportContext() as context:
+        for _ in range(2):
+            with pytest.raises(properties.ValidationError):
+                mapping.validate()
+        assert context.validated == 0
+        assert context.skipped == 0
+
+
+def test_export_context_threads():
+    mapping = spatial.MappingCategory(
+        values=['a', 'b'],
+        indices=[0, 1],
+        visibility=[True, True],
+    )
+    context = spatial.context.ExportContext()
+    results = []
+
+    def claim():
+        results.append(context.claim(mapping))
+
+    assert context.claim(mapping)
+    assert not context.claim(mapping)
+    waiting = threading.Thread(target=claim)
+    waiting.start()
+    waiting.join(0.1)
+    assert waiting.is_alive()
+    context.release(mapping)
+    waiting.join(5)
+    assert results == [True]
+    waiting = threading.Thread(target=claim)
+    waiting.start()
+    waiting.join(0.1)
+    assert waiting.is_alive()
+    context.finish(mapping)
+    waiting.join(5)
+    assert results == [True, False]
+    assert context.validated == 1
+    assert context.skipped == 2
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -1,5 +1,9 @@
+from collections import OrderedDict
+
+import numpy as np
 import pytest
 
+import omf
 import properties
 from lfview.resources import files, spatial
 
@@ -151,5 +155,119 @@ def test_bad_datacategory(prop, bad_val):
         data.validate()
 
 
+def _reference_remap(array, indices):
+    index_map = OrderedDict()
+    for i, array_index in enumerate(sorted(set(array))):
+        index_map[array_index] = i if array_index in indices else -1
+    return np.array([index_map[val] for val in array]), index_map
+
+
+@pytest.mark.parametrize(
+    'array', [
+        np.array([0, 2, 2, 7, 5, 0]),
+        np.array([-3, 100, 5, -3, 100], dtype='int8'),
+        np.array([0, 4000000000, 7, 7, 4000000000], dtype='uint32'),
+        np.random.RandomState(0).randint(-50, 50, size=1000),
+        np.random.RandomState(1).randint(0, 2**30, size=100),
+    ]
+)
+@pytest.mark.parametrize('chunk_size', [1, 7, 2**20])
+def test_remap_categories(array, chunk_size):
+    indices = set(array.tolist()[::3])
+    expected_array, expected_map = _reference_remap(array, indices)
+    output_array, index_map = spatial.data.remap_categories(
+        array, indices, chunk_size=chunk_size
+    )
+    assert output_array.dtype == expected_array.dtype
+    assert np.array_equal(output_array, expected_array)
+    assert list(index_map.items()) == list(expected_map.items())
+
+
+def test_remap_categories_empty():
+    output_array, index_map = spatial.data.remap_categories(
+        np.array([], dtype='int32'), [0, 1]
+    )
+    assert output_array.size == 0
+    assert not index_map
+
+
+def test_datacategory_to_omf():
+    categories = spatial.MappingCategory(
+        values=['a', 'b', 'c'],
+        indices=[0, 2, 5],
+        visibility=[True, True, True],
+    )
+    colors = spatial.MappingCategory(
+        values=[(255, 0, 0)],
+        indices=[7],
+        visibility=[True],
+    )
+    data = spatial.DataCategory(
+        array=[0, 2, 2, 7, 5, 0, 9],
+        location='N',
+        categories=categories,
+        mappings=[colors],
+    )
+    omf_data = data.to_omf(cell_location='faces')
+    assert omf_data.location == 'vertices'
+    assert np.array_equal(omf_data.array.array, [0, 1, 1, 3, 2, 0, -1])
+    assert list(omf_data.legends[0].values) == ['a', 'b', 'c', '', '']
+    assert len(omf_data.legends[1].values) == 5
+
+
+def test_data_from_omf():
+    omf_data = omf.ScalarData(
+        name='scalar',
+        location='faces',
+        array=np.array([1., 2., np.nan]),
+    )
+    data = spatial.data.data_from_omf(omf_data)
+    assert isinstance(data, spatial.DataBasic)
+    assert data.validate()
+    assert data.location == 'cells'
+    assert data.array.array is omf_data.array.array
+    assert data.array.dtype == 'Float64Array'
+
+    omf_data = omf.MappedData(
+        name='mapped',
+        location='vertices',
+        array=np.array([0, 1, -1, 1]),
+        legends=[
+            omf.Legend(name='names', values=['a', 'b']),
+            omf.Legend(name='colors', values=[(0, 0, 0), (255, 0, 0)]),
+        ],
+    )
+    data = spatial.data.data_from_omf(omf_data)
+    assert isinstance(data, spatial.DataCategory)
+    assert data.validate()
+    assert data.location == 'nodes'
+    assert data.array.dtype == 'Int32Array'
+    assert data.categories.values == ['a', 'b']
+    assert len(data.mappings) == 1
+    assert data.mappings[0].name == 'colors'
+    round_trip = data.to_omf(cell_location='faces')
+    assert np.array_equal(round_trip.array.array, [1, 2, -1, 2])
+    assert list(round_trip.legends[0].values) == ['', 'a', 'b']
+
+    omf_data = omf.StringData(location='vertices', array=['a', 'b'])
+    assert spatial.data.data_from_omf(omf_data) is None
+
+
+def test_data_from_omf_no_legends():
+    omf_data = omf.MappedData(
+        name='mapped',
+        location='faces',
+        array=np.array([0, 1, -1, 1]),
+    )
+    with pytest.raises(ValueError):
+        spatial.DataCategory.from_omf(omf_data)
+    data = spatial.data.data_from_omf(omf_data)
+    assert isinstance(data, spatial.DataBasic)
+    assert not isinstance(data, spatial.DataCategory)
+    assert data.validate()
+    assert data.location == 'cells'
+    assert np.array_equal(data.array.array, [0, 1, -1, 1])
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+import properties
+from lfview.resources import spatial
+
+from .conftest import URL
+
+
+def _copy(resources):
+    serialized = spatial.serialize_resources(resources)
+    new_resources = spatial.deserialize_resources(serialized)
+    for old, new in zip(resources, new_resources):
+        for name in ('array', 'vertices', 'triangles'):
+            if name in old._backend:
+                new._backend[name] = old._backend[name]
+    return new_resources
+
+
+def test_diff_unchanged(make_resources):
+    old = make_resources(arrays=True)
+    assert spatial.diff_resources(old, old) == {
+        'added': [],
+        'removed': [],
+        'changed': {},
+        'arrays': {},
+    }
+    assert spatial.diff_resources(old, _copy(old)) == {
+        'added': [],
+        'removed': [],
+        'changed': {},
+        'arrays': {},
+    }
+
+
+def test_diff_and_apply(make_resources):
+    old = make_resources(arrays=True)
+    new = _copy(old)
+    mapping, data, surface = new
+    data.name = 'new name'
+    surface.defaults.color.value = 'red'
+    surface.vertices = old[2].vertices.array.copy()
+    new_data = spatial.DataBasic(
+        uid=URL.format('data', 'basic', 'def456'),
+        array=URL.format('files', 'array', 'def456'),
+        location='cells',
+        mappings=[mapping],
+    )
+    surface.data = [new_data]
+    surface.defaults.color.data = new_data
+    new.remove(data)
+    new.append(new_data)
+    patch = spatial.diff_resources(old, new)
+    assert patch['removed'] == [data.uid]
+    assert len(patch['added']) == 1
+    assert patch['added'][0]['mappings'] == [mapping.uid]
+    assert list(patch['changed']) == [surface.uid]
+    assert sorted(patch['changed'][surface.uid]) == ['data', 'defaults']
+    assert patch['changed'][surface.uid]['data'] == [new_data.uid]
+
+    surface.vertices.array[0, 0] = -1.
+    patch = spatial.diff_resources(old, new)
+    assert sorted(patch['changed'][surface.uid]) == [
+        'data', 'defaults', 'vertices'
+    ]
+    assert list(patch['arrays']) == [surface.uid]
+    surface_arrays = patch['arrays'][surface.uid]
+    assert surface_arrays['vertices'][0] is surface.vertices.array
+    vertices = surface.vertices.array.copy()
+
+    patched = spatial.apply_patch(old, patch)
+    assert [resource.uid for resource in patched] == [
+        mapping.uid, surface.uid, new_data.uid
+    ]
+    assert patched[1] is old[2]
+    assert patched[1].data[0] is patched[2]
+    assert patched[1].defaults.color.data is patched[2]
+    assert patched[1].defaults.color.mapping is old[0]
+    assert patched[1].defaults.color.value == (255, 0, 0)
+    assert patched[2].mappings[0] is old[0]
+    assert properties.equal(patched[2], new_data)
+    assert np.array_equal(patched[1].vertices.array, vertices)
+    assert patched[1].vertices.array[0, 0] == -1.
+
+
+def test_patch_arrays(make_resources):
+    old = make_resources(arrays=True)
+    new = _copy(old)
+    new[1].array = [5., 6, 7]
+    added = spatial.DataBasic(
+        uid=URL.format('data', 'basic', 'def456'),
+        array=[1., 2, 3],
+        location='nodes',
+    )
+    new.append(added)
+    patch = spatial.diff_resources(old, new)
+    assert sorted(patch['arrays']) == sorted([new[1].uid, added.uid])
+    patched = spatial.apply_patch(make_resources(arrays=True), patch)
+    assert np.array_equal(patched[1].array.array, [5., 6, 7])
+    assert np.array_equal(patched[3].array.array, [1., 2, 3])
+    assert patched[3].array.array is not added.array.array
+
+    del patch['arrays'][new[1].uid]
+    with pytest.raises(ValueError):
+        spatial.apply_patch(make_resources(arrays=True), patch)
+    patch['arrays'] = {}
+    del patch['changed'][new[1].uid]
+    with pytest.raises(ValueError):
+        spatial.apply_patch(make_resources(arrays=True), patch)
+
+
+def test_diff_errors(make_resources):
+    old = make_resources(arrays=True)
+    new = _copy(old)
+    new[0].data_controls = [0., 1, 2, 4]
+    patch = spatial.diff_resources(old, new)
+    assert patch['changed'] == {new[0].uid: {'data_controls': [0., 1, 2, 4]}}
+    patch['changed'][new[0].uid]['data_controls'] = [3., 2, 1, 0]
+    with pytest.raises(properties.ValidationError):
+        spatial.apply_patch(make_resources(arrays=True), patch)
+    new.append(spatial.DataBasic())
+    with pytest.raises(ValueError):
+        spatial.diff_resources(old, new)
+    with pytest.raises(ValueError):
+        spatial.apply_patch(old[:2], {'changed': {old[2].uid: {}}})
+
+
+if __name__ == '__main__':
+    pytest.main()
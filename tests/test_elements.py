@@ -1,6 +1,7 @@
 import pytest
 
 import numpy as np
+import omf
 import properties
 from lfview.resources import spatial
 
@@ -293,5 +294,243 @@ def test_bad_elementvolumegrid(prop, bad_val):
         elem.validate()
 
 
+@pytest.mark.parametrize(
+    'element_class',
+    [spatial.ElementPointSet, spatial.ElementLineSet, spatial.ElementSurface],
+)
+def test_vertex_bounds(element_class):
+    vertices = np.random.RandomState(0).rand(1000, 3)
+    element = element_class(vertices=vertices)
+    assert np.array_equal(
+        element.bounds,
+        [vertices.min(axis=0), vertices.max(axis=0)]
+    )
+    hits = spatial.arrays.BOUNDS_CACHE.hits
+    bounds = element.bounds
+    assert spatial.arrays.BOUNDS_CACHE.hits == hits + 1
+    bounds[0, 0] = -100.
+    assert element.bounds[0, 0] > -100.
+    element.vertices.array[0] = [-1., 5., 0.5]
+    assert np.array_equal(element.bounds[:, 0], [-1., vertices[:, 0].max()])
+    element.vertices = vertices * 2
+    assert np.array_equal(
+        element.bounds, [2 * vertices.min(axis=0), 2 * vertices.max(axis=0)]
+    )
+    element.vertices = 'https://example.com/api/files/array/abc123'
+    assert element.bounds is None
+    assert element_class().bounds is None
+
+
+def test_pointset_kdtree():
+    vertices = np.random.RandomState(0).rand(500, 3)
+    element = spatial.ElementPointSet(vertices=vertices)
+    tree = element.kdtree
+    assert isinstance(tree, spatial.KDTree)
+    assert element.kdtree is tree
+    _, indices = tree.query(vertices[:10])
+    assert np.array_equal(indices[:, 0], np.arange(10))
+    element.vertices.array[0] = [5., 5., 5.]
+    assert element.kdtree is not tree
+    assert element.kdtree.query([5., 5., 5.])[1][0, 0] == 0
+    tree = element.kdtree
+    element.vertices = vertices * 2
+    assert element.kdtree is not tree
+    assert element.kdtree.points is element.vertices.array
+    element.vertices = 'https://example.com/api/files/array/abc123'
+    assert element.kdtree is None
+    assert spatial.ElementPointSet().kdtree is None
+
+
+def test_surface_bvh():
+    vertices = np.array([[0., 0, 0], [1., 0, 0], [0., 1, 0], [1., 1, 0]])
+    element = spatial.ElementSurface(
+        vertices=vertices,
+        triangles=[[0, 1, 2], [1, 3, 2]],
+    )
+    bvh = element.bvh
+    assert isinstance(bvh, spatial.TriangleBVH)
+    assert element.bvh is bvh
+    assert bvh.intersect([0.75, 0.75, 1.], [0., 0, -1])[1][0] == 1
+    element.triangles.array[1] = [1, 2, 3]
+    assert element.bvh is not bvh
+    bvh = element.bvh
+    element.vertices = vertices + [0., 0, 1]
+    assert element.bvh is not bvh
+    assert element.bvh.intersect([0.75, 0.75, 2.], [0., 0, -1])[0][0] == 1.
+    element.triangles = 'https://example.com/api/files/array/abc123'
+    assert element.bvh is None
+    assert spatial.ElementSurface().bvh is None
+
+
+def test_grid_locator():
+    grid = spatial.ElementVolumeGrid(
+        origin=[1., 2, 3],
+        tensor_u=[1., 1],
+        tensor_v=[2.],
+        tensor_w=[3., 3],
+        axis_u=[0., 1, 0],
+        axis_v=[-1., 0, 0],
+        axis_w=[0., 0, 1],
+    )
+    assert grid.locator.shape == (2, 1, 2)
+    assert np.array_equal(
+        grid.locator.cell_indices([[0.5, 3.5, 7.], [0.5, 3.5, 2.]]), [3, -1]
+    )
+    surface = spatial.ElementSurfaceGrid(
+        origin=[1., 2, 3],
+        tensor_u=[1., 1],
+        tensor_v=[2.],
+        axis_u=[0., 1, 0],
+        axis_v=[-1., 0, 0],
+        offset_w=[0.] * 6,
+    )
+    assert np.array_equal(
+        surface.locator.cell_indices([[0.5, 3.5, 10.], [0.5, 4.5, 3.]]),
+        [1, -1],
+    )
+    assert spatial.ElementVolumeGrid().locator is None
+    assert spatial.ElementSurfaceGrid().locator is None
+
+
+def test_volume_sample():
+    grid = spatial.ElementVolumeGrid(
+        origin=[0., 0, 0],
+        tensor_u=[1., 1],
+        tensor_v=[1.],
+        tensor_w=[2.],
+        axis_u=[1., 0, 0],
+        axis_v=[0., 1, 0],
+        axis_w=[0., 0, 1],
+    )
+    nodes = spatial.DataBasic(location='nodes', array=np.arange(12.))
+    cells = spatial.DataBasic(location='cells', array=[0., 2.])
+    points = [[0.5, 0.5, 1.], [1., 0.5, 1.], [3., 0., 0.]]
+    assert np.allclose(grid.sample(nodes, points)[:2], [5., 5.5])
+    assert np.allclose(grid.sample(cells, points)[:2], [0., 1.])
+    assert np.allclose(grid.sample(cells, points, 'nearest')[:2], [0., 2.])
+    assert np.isnan(grid.sample(nodes, points, 'nearest')[2])
+    with pytest.raises(ValueError):
+        grid.sample(spatial.DataCategory(location='cells'), points)
+    with pytest.raises(ValueError):
+        grid.sample(
+            spatial.DataBasic(
+                location='cells',
+                array='https://example.com/api/files/array/abc123',
+            ),
+            points,
+        )
+    with pytest.raises(ValueError):
+        spatial.ElementVolumeGrid().sample(cells, points)
+
+
+def test_grid_bounds():
+    grid = spatial.ElementVolumeGrid(
+        origin=[1., 2, 3],
+        tensor_u=[1., 1],
+        tensor_v=[2.],
+        tensor_w=[3., 3],
+        axis_u=[0., 1, 0],
+        axis_v=[-1., 0, 0],
+        axis_w=[0., 0, 1],
+    )
+    assert np.array_equal(grid.bounds, [[-1., 2, 3], [1., 4, 9]])
+    grid.axis_u = [np.sqrt(0.5), np.sqrt(0.5), 0]
+    grid.axis_v = [-np.sqrt(0.5), np.sqrt(0.5), 0]
+    assert np.allclose(
+        grid.bounds,
+        [[1 - np.sqrt(2), 2, 3], [1 + np.sqrt(2), 2 + np.sqrt(8), 9]],
+    )
+    assert spatial.ElementVolumeGrid().bounds is None
+
+    surface = spatial.ElementSurfaceGrid(
+        origin=[1., 2, 3],
+        tensor_u=[1., 1],
+        tensor_v=[2.],
+        axis_u=[1., 0, 0],
+        axis_v=[0., 0, 1],
+    )
+    assert np.array_equal(surface.bounds, [[1., 2, 3], [3., 2, 5]])
+    surface.offset_w = np.array([0., 1, 2, 3, 4, -5])
+    assert np.array_equal(surface.bounds, [[1., -2, 3], [3., 7, 5]])
+    assert spatial.ElementSurfaceGrid().bounds is None
+
+
+def test_elements_from_omf():
+    data = spatial.DataBasic(location='nodes', array=np.array([1., 2, 3]))
+    elements = [
+        spatial.ElementPointSet(
+            name='points',
+            vertices=np.random.rand(3, 3),
+            data=[data],
+        ),
+        spatial.ElementLineSet(
+            vertices=np.random.rand(3, 3),
+            segments=[[0, 1], [1, 2]],
+            data=[data],
+        ),
+        spatial.ElementSurface(
+            vertices=np.random.rand(3, 3),
+            triangles=[[0, 1, 2]],
+            data=[data],
+        ),
+        spatial.ElementSurfaceGrid(
+            origin=[1., 2, 3],
+            tensor_u=[1., 2],
+            tensor_v=[1.],
+            axis_u='east',
+            axis_v='north',
+            offset_w=np.arange(6.),
+        ),
+        spatial.ElementVolumeGrid(
+            origin=[1., 2, 3],
+            tensor_u=[1.],
+            tensor_v=[1.],
+            tensor_w=[2.],
+            axis_u='east',
+            axis_v='north',
+            axis_w='up',
+        ),
+    ]
+    for elem in elements:
+        elem.defaults.color.value = (10, 20, 30)
+        omf_element = elem.to_omf()
+        new_elem = elem.__class__.from_omf(omf_element)
+        assert new_elem.validate()
+        assert new_elem.name == (elem.name or '')
+        assert new_elem.defaults.color.value == (10, 20, 30)
+        assert len(new_elem.data) == len(elem.data)
+        for prop in ('vertices', 'segments', 'triangles', 'offset_w'):
+            if prop not in elem._props:
+                continue
+            assert np.array_equal(
+                getattr(new_elem, prop).array,
+                getattr(elem, prop).array,
+            )
+        for prop in ('origin', 'tensor_u', 'tensor_v', 'tensor_w'):
+            if prop not in elem._props:
+                continue
+            assert np.array_equal(getattr(new_elem, prop), getattr(elem, prop))
+    omf_points = elements[0].to_omf()
+    new_points = spatial.ElementPointSet.from_omf(omf_points)
+    assert np.shares_memory(
+        new_points.vertices.array, omf_points.geometry.vertices.array
+    )
+    with pytest.raises(ValueError):
+        spatial.ElementSurface.from_omf(elements[3].to_omf())
+    with pytest.raises(ValueError):
+        spatial.ElementSurfaceGrid.from_omf(elements[2].to_omf())
+
+
+def test_vertices_from_omf_origin():
+    omf_points = omf.PointSetElement(
+        geometry=omf.PointSetGeometry(
+            origin=[10., 0, 0],
+            vertices=np.array([[0., 0, 0], [1, 1, 1]]),
+        ),
+    )
+    points = spatial.ElementPointSet.from_omf(omf_points)
+    assert np.array_equal(points.vertices.array, [[10., 0, 0], [11, 1, 1]])
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+import pytest
+
+import omf
+from lfview.resources import spatial
+
+
+def _elements():
+    mapping = spatial.MappingCategory(
+        values=['a', 'b'],
+        indices=[0, 1],
+        visibility=[True, True],
+    )
+    elements = []
+    for i in range(4):
+        elements.append(
+            spatial.ElementSurface(
+                name='surface {}'.format(i),
+                vertices=np.random.rand(3, 3),
+                triangles=[[0, 1, 2]],
+                data=[
+                    spatial.DataCategory(
+                        array=[0, 1, 1],
+                        location='nodes',
+                        categories=mapping,
+                    )
+                ],
+            )
+        )
+    elements.append(
+        spatial.ElementPointSet(
+            name='points',
+            vertices=np.random.rand(5, 3),
+        )
+    )
+    return elements
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread', 'process'])
+def test_project_exporter(executor):
+    elements = _elements()
+    exporter = spatial.ProjectExporter(executor=executor, workers=2)
+    project = exporter.export(elements, name='project')
+    assert isinstance(project, omf.Project)
+    assert project.name == 'project'
+    names = [elem.name for elem in elements]
+    assert [elem.name for elem in project.elements] == names
+    assert isinstance(project.elements[-1], omf.PointSetElement)
+    assert project.validate()
+    assert [timing['name'] for timing in exporter.timings] == [
+        elem.name for elem in elements
+    ]
+    assert all(timing['seconds'] >= 0 for timing in exporter.timings)
+    if executor == 'process':
+        assert exporter.context is None
+    else:
+        assert exporter.context.skipped > 0
+
+
+def test_to_omf_project():
+    elements = _elements()
+    project = spatial.to_omf_project(elements, description='desc')
+    assert project.description == 'desc'
+    assert len(project.elements) == len(elements)
+
+
+@pytest.mark.parametrize('executor', ['serial', 'process'])
+def test_track_copies(executor):
+    elements = _elements()
+    exporter = spatial.ProjectExporter(executor=executor, track_copies=True)
+    project = exporter.export(elements)
+    assert project.validate()
+    nbytes = elements[0].data[0].array.array.size * np.dtype(int).itemsize
+    copied = [timing['bytes_copied'] for timing in exporter.timings]
+    assert copied == [nbytes] * 4 + [0]
+    if executor == 'serial':
+        assert np.shares_memory(
+            project.elements[-1].geometry.vertices.array,
+            elements[-1].vertices.array,
+        )
+    exporter = spatial.ProjectExporter(executor=executor)
+    exporter.export(elements)
+    assert 'bytes_copied' not in exporter.timings[0]
+
+
+def test_exporter_cache():
+    elements = _elements()
+    cache = spatial.cache.OMFCache()
+    exporter = spatial.ProjectExporter(cache=cache)
+    project = exporter.export(elements)
+    elements[-1].name = 'new points'
+    new_project = exporter.export(elements)
+    assert new_project.elements[0] is project.elements[0]
+    assert new_project.elements[-1] is not project.elements[-1]
+    assert new_project.elements[-1].name == 'new points'
+    assert new_project.validate()
+
+
+def test_write_omf(tmpdir):
+    elements = _elements()
+    elements[0].data[0].categories.values = [1., 2.]
+    fname = str(tmpdir.join('stream'))
+    fname = spatial.write_omf(
+        (elem for elem in elements),
+        fname,
+        name='project',
+    )
+    assert fname.endswith('stream.omf')
+    project = omf.OMFReader(fname).get_project()
+    assert project.validate()
+    assert project.name == 'project'
+    names = [elem.name for elem in elements]
+    assert [elem.name for elem in project.elements] == names
+    for elem, omf_elem in zip(elements, project.elements):
+        assert np.array_equal(
+            omf_elem.geometry.vertices.array, elem.vertices.array
+        )
+    assert np.array_equal(
+        project.elements[0].geometry.triangles.array, [[0, 1, 2]]
+    )
+    assert list(project.elements[0].data[0].legends[0].values) == [1., 2.]
+    with spatial.LazyOMFReader(fname) as reader:
+        assert [elem.name for elem in reader.elements] == [
+            elem.name for elem in elements
+        ]
+
+
+def test_streaming_omf_writer(tmpdir):
+    fname = str(tmpdir.join('stream.omf'))
+    elements = _elements()
+    with spatial.StreamingOMFWriter(fname) as writer:
+        uid = writer.write(elements[-1])
+        assert not writer.closed
+    assert writer.closed
+    with pytest.raises(ValueError):
+        writer.write(elements[0])
+    writer.close()
+    project = omf.OMFReader(fname).get_project()
+    assert [str(elem.uid) for elem in project.elements] == [uid]
+
+
+def test_streaming_omf_writer_abort(tmpdir):
+    fname = str(tmpdir.join('abort.omf'))
+    element = spatial.ElementPointSet(vertices=[[0., 0, 0]])
+    with pytest.raises(RuntimeError):
+        with spatial.StreamingOMFWriter(fname) as writer:
+            writer.write(element)
+            raise RuntimeError('Interrupted')
+    assert writer.closed
+    assert not os.path.exists(fname)
+    writer.close()
+
+
+@pytest.mark.parametrize('dtype', ['<f4', '<f8', '<i4', '<u2'])
+def test_write_array(tmpdir, dtype):
+    array = (np.random.rand(1000, 3) * 100).astype(dtype)
+    fname = str(tmpdir.join('array'))
+    with open(fname, 'wb') as fopen:
+        index = spatial.export._write_array(fopen, array, chunk_size=99)
+    with open(fname, 'rb') as fopen:
+        new_array = omf.serializers.array_deserializer(('*', 3))(index, fopen)
+    assert new_array.dtype == index['dtype']
+    assert np.array_equal(new_array, array)
+
+
+def test_bad_executor():
+    with pytest.raises(ValueError):
+        spatial.ProjectExporter(executor='gpu')
+    with pytest.raises(ValueError):
+        spatial.ProjectExporter(
+            executor='process', cache=spatial.cache.OMFCache()
+        )
+
+
+if __name__ == '__main__':
+    pytest.main()
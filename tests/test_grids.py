@@ -0,0 +1,201 @@
+import pytest
+
+import numpy as np
+from lfview.resources import spatial
+
+
+def test_volume_cells():
+    locator = spatial.GridLocator(
+        [1., 2., 3.],
+        [[1., 0, 0], [0., 1, 0], [0., 0, 1]],
+        [[1., 2.], [1.], [1., 1., 1.]],
+    )
+    assert locator.shape == (2, 1, 3)
+    assert locator.num_cells == 6
+    points = np.array(
+        [
+            [1.5, 2.5, 3.5],
+            [2., 2.5, 3.5],
+            [2.5, 2.5, 5.5],
+            [4., 3., 6.],
+            [0.99, 2.5, 3.5],
+            [1.5, 3.01, 3.5],
+            [np.nan, 2.5, 3.5],
+        ]
+    )
+    ijk = locator.cell_ijk(points)
+    assert np.array_equal(
+        ijk,
+        [[0, 0, 0], [1, 0, 0], [1, 0, 2], [1, 0, 2]] + [[-1, -1, -1]] * 3,
+    )
+    assert np.array_equal(
+        locator.cell_indices(points), [0, 1, 5, 5, -1, -1, -1]
+    )
+    flat = locator.flat_indices([[1, 0, 1], [0, -1, 0]])
+    assert np.array_equal(flat, [3, -1])
+
+
+def test_rotated_cells():
+    rng = np.random.RandomState(0)
+    axes, _ = np.linalg.qr(rng.rand(3, 3))
+    tensors = [rng.rand(5) + 0.1, rng.rand(4) + 0.1, rng.rand(3) + 0.1]
+    origin = rng.rand(3)
+    locator = spatial.GridLocator(origin, axes, tensors)
+    ijk = np.stack(
+        [rng.randint(0, len(tensor), 1000) for tensor in tensors], axis=1
+    )
+    fractions = rng.rand(1000, 3) * 0.98 + 0.01
+    edges = [np.r_[0., np.cumsum(tensor)] for tensor in tensors]
+    coords = np.stack(
+        [
+            edge[ijk[:, i]] + fractions[:, i] * tensor[ijk[:, i]]
+            for i, (edge, tensor) in enumerate(zip(edges, tensors))
+        ],
+        axis=1,
+    )
+    points = origin + coords.dot(axes)
+    assert np.allclose(locator.transform(points), coords)
+    assert np.array_equal(locator.cell_ijk(points), ijk)
+    assert np.array_equal(
+        locator.cell_indices(points),
+        np.ravel_multi_index(ijk.T, (5, 4, 3), order='F'),
+    )
+
+
+def test_surface_cells():
+    locator = spatial.GridLocator(
+        [0., 0., 0.],
+        [[0., 1, 0], [0., 0, 1]],
+        [[1., 1.], [2., 2., 2.]],
+    )
+    points = [[5., 0.5, 0.5], [-5., 1.5, 5.], [0., 2.5, 0.]]
+    assert np.array_equal(locator.cell_ijk(points), [[0, 0], [1, 2], [-1, -1]])
+    assert np.array_equal(locator.cell_indices(points), [0, 5, -1])
+
+
+def test_chunks(monkeypatch):
+    locator = spatial.GridLocator(
+        [0., 0., 0.],
+        [[1., 0, 0], [0., 1, 0], [0., 0, 1]],
+        [[1.] * 10] * 3,
+    )
+    points = np.random.RandomState(1).rand(100, 3) * 12 - 1
+    expected = locator.cell_indices(points)
+    monkeypatch.setattr(spatial.grids, 'LOCATE_CHUNK_SIZE', 7)
+    assert np.array_equal(locator.cell_indices(points), expected)
+
+
+def rotated_grid(seed):
+    rng = np.random.RandomState(seed)
+    axes, _ = np.linalg.qr(rng.rand(3, 3))
+    tensors = [rng.rand(5) + 0.1, rng.rand(4) + 0.1, rng.rand(3) + 0.1]
+    return spatial.GridLocator(rng.rand(3), axes, tensors)
+
+
+def grid_points(locator, coords):
+    return locator.origin + np.asarray(coords).dot(locator.axes)
+
+
+@pytest.mark.parametrize('location', ['nodes', 'cells'])
+def test_sample_linear(location):
+    locator = rotated_grid(2)
+    positions = [
+        locator._positions(axis, location)  #pylint: disable=protected-access
+        for axis in range(3)
+    ]
+    grid = np.meshgrid(*positions, indexing='ij')
+    coefs = [2., -1., 0.5]
+    values = sum(
+        coef * coords.ravel(order='F') for coef, coords in zip(coefs, grid)
+    )
+    rng = np.random.RandomState(3)
+    coords = np.stack(
+        [pos[0] + rng.rand(500) * (pos[-1] - pos[0]) for pos in positions],
+        axis=1,
+    )
+    output = locator.sample(values, grid_points(locator, coords), location)
+    assert np.allclose(output, coords.dot(coefs))
+    nodes = np.stack([coords.ravel(order='F') for coords in grid], axis=1)
+    output = locator.sample(
+        values, grid_points(locator, nodes), location, 'nearest'
+    )
+    assert np.allclose(output, values)
+
+
+def test_sample_nearest():
+    locator = rotated_grid(4)
+    offsets = np.random.RandomState(5).rand(500, 3) * 3 - 0.5
+    points = grid_points(locator, offsets)
+    values = np.random.RandomState(6).rand(locator.num_cells)
+    output = locator.sample(values, points, 'cells', 'nearest')
+    cells = locator.cell_indices(points)
+    assert np.array_equal(output[cells >= 0], values[cells[cells >= 0]])
+    assert np.all(np.isnan(output[cells < 0]))
+    assert np.all(np.isnan(locator.sample(values, points[cells < 0])))
+
+
+def test_sample_edges():
+    locator = spatial.GridLocator(
+        [0., 0, 0],
+        [[1., 0, 0], [0., 1, 0], [0., 0, 1]],
+        [[1., 1.], [1.], [2.]],
+    )
+    values = np.array([0., 2.])
+    output = locator.sample(
+        values, [[0.2, 0.5, 1.], [1., 0.5, 1.], [1.5, 0., 0.], [2., 1., 2.]]
+    )
+    assert np.allclose(output, [0., 1., 2., 2.])
+    nodes = np.arange(12.)
+    output = locator.sample(nodes, [[0.5, 0.5, 1.], [2., 1., 2.]], 'nodes')
+    assert np.allclose(output, [5., 11.])
+    nodes[1] = np.nan
+    output = locator.sample(
+        nodes, [[0., 0., 0.], [0.5, 0., 0.], [0., 0., 0.2]], 'nodes'
+    )
+    assert np.isnan(output[1])
+    assert np.allclose(output[[0, 2]], [0., 0.6])
+
+
+def test_sample_surface():
+    locator = spatial.GridLocator(
+        [0., 0., 0.],
+        [[1., 0, 0], [0., 1, 0]],
+        [[1., 1.], [1.]],
+    )
+    output = locator.sample(
+        np.arange(6.), [[0.5, 0.5, 3.], [1.5, 1., -1.]], 'nodes'
+    )
+    assert np.allclose(output, [2., 4.5])
+
+
+def test_sample_chunks(monkeypatch):
+    locator = rotated_grid(7)
+    offsets = np.random.RandomState(8).rand(100, 3) * 3 - 0.5
+    points = grid_points(locator, offsets)
+    values = np.random.RandomState(9).rand(locator.num_cells)
+    expected = locator.sample(values, points)
+    monkeypatch.setattr(spatial.grids, 'LOCATE_CHUNK_SIZE', 7)
+    output = locator.sample(values, points)
+    np.testing.assert_array_equal(output, expected)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        spatial.GridLocator([0., 0, 0], [[1., 0, 0]], [[1.]])
+    with pytest.raises(ValueError):
+        spatial.GridLocator(
+            [0., 0, 0], [[1., 0, 0], [0., 1, 0]], [[1.], [1.], [1.]]
+        )
+    locator = spatial.GridLocator(
+        [0., 0, 0], [[1., 0, 0], [0., 1, 0]], [[1.], [1.]]
+    )
+    with pytest.raises(ValueError):
+        locator.cell_indices([[0., 0.]])
+    with pytest.raises(ValueError):
+        locator.sample([0., 1.], [[0., 0., 0.]])
+    with pytest.raises(ValueError):
+        locator.sample([0.], [[0., 0., 0.]], location='edges')
+    with pytest.raises(ValueError):
+        locator.sample([0.], [[0., 0., 0.]], method='cubic')
+    with pytest.raises(ValueError):
+        locator.sample([[0.]], [[0., 0., 0.]], location='cells')
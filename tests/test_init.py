@@ -0,0 +1,73 @@
+import subprocess
+import sys
+
+import pytest
+
+from lfview.resources import spatial
+
+
+def _modules_after(statement):
+    script = (
+        '{}\nimport sys\n'
+        'print(",".join(sorted(sys.modules)))'.format(statement)
+    )
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return output.decode('utf-8').strip().split(',')
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='imports are eager')
+def test_lazy_import():
+    modules = _modules_after('import lfview.resources.spatial')
+    assert 'lfview.resources.spatial.elements' in modules
+    assert 'lfview.resources.spatial.export' not in modules
+    assert 'lfview.resources.spatial.reader' not in modules
+    assert 'omf' not in modules
+    modules = _modules_after(
+        'from lfview.resources import spatial\n'
+        'spatial.MappingCategory(\n'
+        '    values=[1.], indices=[0], visibility=[True]\n'
+        ').to_omf([0])'
+    )
+    assert 'omf' in modules
+
+
+def test_registered_on_import():
+    modules = _modules_after(
+        'from lfview.resources import spatial\n'
+        'points = spatial.base._BaseResource.deserialize(\n'
+        '    {"__class__": "ElementPointSet", "name": "points"},\n'
+        '    trusted=True,\n'
+        ')\n'
+        'assert points.__class__.__name__ == "ElementPointSet"\n'
+        'from lfview.resources.spatial import *\n'
+        'assert ElementSurface and serialize_resources and SPATIAL_REGISTRY'
+    )
+    assert 'lfview.resources.spatial.batch' in modules
+
+
+def test_exports():
+    for name in spatial.EXPORTS:
+        assert getattr(spatial, name).__module__ == (
+            'lfview.resources.spatial.{}'.format(spatial.EXPORTS[name])
+        )
+        assert name in dir(spatial)
+    for name in spatial.SUBMODULES:
+        module = getattr(spatial, name)
+        assert module.__name__ == 'lfview.resources.spatial.{}'.format(name)
+    assert spatial.SPATIAL_REGISTRY['ElementSurface'] is spatial.ElementSurface
+    with pytest.raises(AttributeError):
+        spatial.Unknown
+
+
+def test_lazy_module():
+    module = spatial.base.LazyModule('json')
+    assert repr(module) == '<LazyModule: json>'
+    assert module.loads('[1]') == [1]
+    with pytest.raises(AttributeError):
+        module.unknown
+    with pytest.raises(ImportError):
+        spatial.base.LazyModule('not_a_module').attr
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+
+from lfview.resources import spatial
+from lfview.resources.spatial import jsonio
+
+
+@pytest.fixture
+def restore_backend():
+    backend = jsonio.get_json_backend()
+    yield
+    jsonio.set_json_backend(backend.name)
+    spatial.cache.SNAPSHOT_CACHE.clear()
+
+
+def test_default_backend():
+    assert jsonio.get_json_backend().name == 'json'
+    assert 'json' in jsonio.available_json_backends()
+    assert jsonio.dumps({'a': [1, 2.5]}) == json.dumps({'a': [1, 2.5]})
+    assert jsonio.loads('{"a": [1, 2.5]}') == {'a': [1, 2.5]}
+    assert jsonio.loads(b'{"a": "b"}') == {'a': 'b'}
+
+
+@pytest.mark.parametrize('name', jsonio.available_json_backends())
+def test_backends(name, restore_backend):
+    backend = jsonio.set_json_backend(name)
+    assert jsonio.get_json_backend() is backend
+    value = {'a': [1, 2.5, 'c', None, True], 'b': {'c': -1}}
+    assert jsonio.loads(jsonio.dumps(value)) == value
+    assert jsonio.loads(jsonio.dumps(value).encode('utf-8')) == value
+    element = spatial.ElementPointSet(vertices=np.random.rand(3, 3))
+    element.defaults.color.value = 'red'
+    serialized = element.serialize(snapshot=True)
+    assert json.loads(serialized['defaults']) == element.defaults.serialize()
+    new_element = spatial.ElementPointSet.deserialize(serialized)
+    assert new_element.defaults.color.value == (255, 0, 0)
+
+
+def test_auto_backend(restore_backend):
+    backend = jsonio.set_json_backend('auto')
+    assert backend.name == [
+        name for name in jsonio.PREFERRED_BACKENDS
+        if name in jsonio.available_json_backends()
+    ][0]
+
+
+def test_custom_backend(restore_backend):
+    calls = []
+
+    def dumps(value):
+        calls.append(value)
+        return json.dumps(value)
+
+    jsonio.register_json_backend('custom', dumps, json.loads)
+    assert 'custom' in jsonio.available_json_backends()
+    jsonio.set_json_backend('custom')
+    assert jsonio.dumps([1]) == '[1]'
+    assert calls == [[1]]
+    del jsonio.BACKEND_FACTORIES['custom']
+
+
+def test_bad_backend():
+    with pytest.raises(ValueError):
+        jsonio.set_json_backend('bson')
+
+
+if __name__ == '__main__':
+    pytest.main()
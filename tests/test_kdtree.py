@@ -0,0 +1,122 @@
+import pytest
+
+import numpy as np
+from lfview.resources import spatial
+
+
+def brute_distances(points, queries):
+    return np.sqrt(((queries[:, None, :] - points)**2).sum(axis=2))
+
+
+@pytest.mark.parametrize('leaf_size', [1, 8, 64])
+@pytest.mark.parametrize('k', [1, 5])
+def test_query(leaf_size, k):
+    rng = np.random.RandomState(0)
+    points = rng.rand(1000, 3)
+    queries = rng.rand(200, 3) * 1.2 - 0.1
+    tree = spatial.KDTree(points, leaf_size=leaf_size)
+    distances, indices = tree.query(queries, k=k)
+    assert distances.shape == indices.shape == (200, k)
+    expected = np.sort(brute_distances(points, queries), axis=1)[:, :k]
+    assert np.allclose(distances, expected)
+    assert np.allclose(
+        np.linalg.norm(points[indices] - queries[:, None, :], axis=2),
+        distances,
+    )
+    assert np.all(np.diff(distances, axis=1) >= 0)
+
+
+def test_query_chunks(monkeypatch):
+    rng = np.random.RandomState(1)
+    points = rng.rand(300, 2)
+    queries = rng.rand(50, 2)
+    tree = spatial.KDTree(points, leaf_size=4)
+    distances, indices = tree.query(queries, k=3)
+    monkeypatch.setattr(spatial.kdtree, 'QUERY_CHUNK_SIZE', 7)
+    chunk_distances, chunk_indices = tree.query(queries, k=3)
+    assert np.array_equal(distances, chunk_distances)
+    assert np.array_equal(indices, chunk_indices)
+    radius = tree.query_radius(queries, 0.1)
+    monkeypatch.setattr(spatial.kdtree, 'QUERY_CHUNK_SIZE', 2**18)
+    for inds, chunk_inds in zip(tree.query_radius(queries, 0.1), radius):
+        assert np.array_equal(inds, chunk_inds)
+    monkeypatch.setattr(spatial.kdtree, 'DISTANCE_CHUNK_SIZE', 5)
+    chunk_distances, chunk_indices = tree.query(queries, k=3)
+    assert np.array_equal(distances, chunk_distances)
+    assert np.array_equal(indices, chunk_indices)
+
+
+def test_tree_structure():
+    rng = np.random.RandomState(5)
+    points = rng.rand(1000, 3).astype(np.float32)
+    tree = spatial.KDTree(points, leaf_size=10)
+    assert tree.points is points
+    assert np.array_equal(np.sort(tree.order), np.arange(1000))
+    inner = np.nonzero(tree.left >= 0)[0]
+    leaves = np.nonzero(tree.left < 0)[0]
+    assert np.all(tree.end[leaves] - tree.start[leaves] <= 10)
+    assert np.array_equal(tree.start[tree.left[inner]], tree.start[inner])
+    assert np.array_equal(tree.end[tree.left[inner] + 1], tree.end[inner])
+    for node in range(tree.num_nodes):
+        node_points = points[tree.order[tree.start[node]:tree.end[node]]]
+        assert np.array_equal(tree.low[node], node_points.min(axis=0))
+        assert np.array_equal(tree.high[node], node_points.max(axis=0))
+    for node in inner:
+        dim = tree.split_dim[node]
+        left, right = tree.left[node], tree.left[node] + 1
+        assert tree.high[left, dim] <= tree.split_val[node]
+        assert tree.low[right, dim] >= tree.split_val[node]
+
+
+def test_duplicate_points():
+    points = np.vstack([np.zeros((100, 3)), np.ones((100, 3))])
+    tree = spatial.KDTree(points, leaf_size=8)
+    distances, indices = tree.query([[0.1, 0., 0.]], k=100)
+    assert np.allclose(distances, 0.1)
+    assert np.array_equal(np.sort(indices[0]), np.arange(100))
+    inds = tree.query_radius([[1., 1., 1.]], 0.)[0]
+    assert np.array_equal(inds, np.arange(100, 200))
+
+
+def test_query_radius():
+    rng = np.random.RandomState(2)
+    points = rng.rand(1000, 3)
+    queries = rng.rand(100, 3)
+    radius = rng.rand(100) * 0.2
+    tree = spatial.KDTree(points, leaf_size=16)
+    output = tree.query_radius(queries, radius)
+    assert len(output) == 100
+    distances = brute_distances(points, queries)
+    for inds, dist, rad in zip(output, distances, radius):
+        assert np.array_equal(inds, np.nonzero(dist <= rad)[0])
+    assert all(not inds.size for inds in tree.query_radius(queries, -1.))
+
+
+def test_query_box():
+    rng = np.random.RandomState(3)
+    points = rng.rand(1000, 3)
+    lows = rng.rand(50, 3) * 0.8
+    highs = lows + rng.rand(50, 3) * 0.3
+    tree = spatial.KDTree(points, leaf_size=16)
+    output = tree.query_box(lows, highs)
+    for inds, low, high in zip(output, lows, highs):
+        inside = np.all((points >= low) & (points <= high), axis=1)
+        assert np.array_equal(inds, np.nonzero(inside)[0])
+    inds = tree.query_box(points[5], points[5])[0]
+    assert np.array_equal(inds, [5])
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        spatial.KDTree(np.zeros((0, 3)))
+    with pytest.raises(ValueError):
+        spatial.KDTree(np.zeros(3))
+    tree = spatial.KDTree(np.random.rand(10, 3))
+    with pytest.raises(ValueError):
+        tree.query(np.zeros((5, 2)))
+    with pytest.raises(ValueError):
+        tree.query(np.zeros((5, 3)), k=11)
+    with pytest.raises(ValueError):
+        tree.query(np.zeros((5, 3)), k=0)
+    with pytest.raises(ValueError):
+        tree.query_box(np.zeros((2, 3)), np.ones((3, 3)))
@@ -1,5 +1,10 @@
+from collections import OrderedDict
+
+import numpy as np
 import pytest
+from six import string_types
 
+import omf
 import properties
 from lfview.resources import files, spatial
 
@@ -162,5 +167,71 @@ def test_hex(instance):
     assert instance.serialize()['values'] == ['#FFFFFF', '#000000']
 
 
+def test_serialize_values():
+    colors = np.random.RandomState(0).randint(0, 256, size=(256, 3))
+    mapping = spatial.MappingCategory(
+        values=colors.tolist(),
+        indices=list(range(256)),
+        visibility=[True] * 256,
+    )
+    serialized = mapping.serialize()
+    assert serialized['values'] == spatial.base.colors_to_hex(colors)
+    new_mapping = spatial.MappingCategory.deserialize(serialized)
+    assert new_mapping.values == [tuple(color) for color in colors.tolist()]
+    for values in [['a', '#FFFFFF'], [1., 2.], []]:
+        mapping = spatial.MappingCategory(
+            values=values,
+            indices=list(range(len(values))),
+            visibility=[True] * len(values),
+        )
+        serialized = mapping.serialize()
+        assert serialized['values'] == values
+        assert serialized['values'] is not mapping.values
+        new_mapping = spatial.MappingCategory.deserialize(serialized)
+        assert new_mapping.values == values
+
+
+@pytest.mark.parametrize(
+    ('values', 'nan_value'), [
+        (['a', 'b', 'c'], ''),
+        ([1., 2., 3.], None),
+        (['red', 'green', 'blue'], [255, 255, 255]),
+    ]
+)
+def test_category_to_omf(values, nan_value):
+    mc = spatial.MappingCategory(
+        values=values,
+        indices=[5, 0, 2],
+        visibility=[True, True, True],
+    )
+    lookup = mc.value_lookup()
+    assert lookup == dict(zip([5, 0, 2], mc.values))
+    index_map = OrderedDict([(0, 0), (1, -1), (2, 1), (5, 2)])
+    expected = [mc.values[1], nan_value, mc.values[2], mc.values[0]]
+    for legend in [mc.to_omf(index_map), mc.to_omf(index_map, lookup)]:
+        legend_values = list(legend.values)
+        assert len(legend_values) == 4
+        for value, expected_value in zip(legend_values, expected):
+            if expected_value is None:
+                assert np.isnan(value)
+            elif isinstance(expected_value, (float, string_types)):
+                assert value == expected_value
+            else:
+                assert list(value) == list(expected_value)
+
+
+@pytest.mark.parametrize(
+    'values', [['a', 'b', 'c'], [1., 2., 3.], [(255, 0, 0)] * 3]
+)
+def test_category_from_omf(values):
+    legend = omf.Legend(name='legend', values=values)
+    mc = spatial.MappingCategory.from_omf(legend)
+    assert mc.validate()
+    assert mc.name == 'legend'
+    assert mc.indices == [0, 1, 2]
+    assert mc.visibility == [True, True, True]
+    assert mc.values == values
+
+
 if __name__ == '__main__':
     pytest.main()
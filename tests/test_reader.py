@@ -0,0 +1,191 @@
+import io
+
+import numpy as np
+import png
+import pytest
+
+import omf
+from lfview.resources import spatial
+
+
+@pytest.fixture
+def omf_file(tmpdir):
+    img = io.BytesIO()
+    png.Writer(2, 1, greyscale=False).write(img, [[0, 0, 0, 255, 255, 255]])
+    img.seek(0)
+    names = spatial.MappingCategory(
+        values=['a', 'b'],
+        indices=[0, 3],
+        visibility=[True, True],
+    )
+    numbers = spatial.MappingCategory(
+        values=[1., 2.],
+        indices=[0, 3],
+        visibility=[True, True],
+    )
+    elements = [
+        spatial.ElementPointSet(
+            name='points',
+            vertices=np.random.rand(3, 3),
+            data=[
+                spatial.TextureProjection(
+                    origin=[0., 0, 0],
+                    axis_u=[1., 0, 0],
+                    axis_v=[0., 1, 0],
+                    image=spatial.base.files.Image(img),
+                )
+            ],
+        ),
+        spatial.ElementLineSet(
+            name='lines',
+            vertices=np.random.rand(3, 3),
+            segments=[[0, 1], [1, 2]],
+        ),
+        spatial.ElementSurface(
+            name='surface',
+            vertices=np.random.rand(3, 3),
+            triangles=[[0, 1, 2]],
+            data=[
+                spatial.DataCategory(
+                    name='categories',
+                    array=[0, 3, 3],
+                    location='nodes',
+                    categories=names,
+                    mappings=[numbers],
+                ),
+                spatial.DataBasic(
+                    name='scalars',
+                    array=[1., 2., 3.],
+                    location='nodes',
+                ),
+            ],
+        ),
+        spatial.ElementSurfaceGrid(
+            name='grid',
+            origin=[1., 2, 3],
+            tensor_u=[1., 2],
+            tensor_v=[1.],
+            axis_u='east',
+            axis_v='north',
+            offset_w=np.arange(6.),
+        ),
+        spatial.ElementVolumeGrid(
+            name='volume',
+            origin=[1., 2, 3],
+            tensor_u=[1.],
+            tensor_v=[1.],
+            tensor_w=[2., 2.],
+            axis_u='east',
+            axis_v='north',
+            axis_w='up',
+            data=[
+                spatial.DataBasic(array=[5., 6.], location='cells'),
+            ],
+        ),
+    ]
+    project = spatial.to_omf_project(elements, name='project')
+    project.elements[0].geometry.origin = [10., 0, 0]
+    fname = str(tmpdir.join('test.omf'))
+    omf.OMFWriter(project, fname)
+    return fname, elements
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_read_omf(omf_file, lazy):
+    fname, elements = omf_file
+    if lazy:
+        reader = spatial.LazyOMFReader(fname)
+        new_elements = reader.elements
+    else:
+        new_elements = spatial.read_omf(fname)
+    names = [elem.name for elem in elements]
+    classes = [elem.__class__ for elem in elements]
+    assert [elem.name for elem in new_elements] == names
+    assert [elem.__class__ for elem in new_elements] == classes
+    if lazy:
+        assert not new_elements[2].vertices.loaded
+        assert not new_elements[2].data[0].array.loaded
+    for elem in new_elements:
+        assert elem.validate()
+    assert np.allclose(
+        new_elements[0].vertices.array,
+        elements[0].vertices.array + [10., 0, 0],
+    )
+    assert isinstance(new_elements[0].data[0], spatial.TextureProjection)
+    assert np.array_equal(
+        new_elements[1].segments.array, elements[1].segments.array
+    )
+    assert new_elements[1].segments.dtype == 'Int32Array'
+    category = new_elements[2].data[0]
+    assert category.name == 'categories'
+    assert category.categories.values == ['a', 'b']
+    assert category.mappings[0].values == [1., 2.]
+    assert np.array_equal(category.array.array, [0, 1, 1])
+    assert np.array_equal(
+        new_elements[3].offset_w.array, elements[3].offset_w.array
+    )
+    assert list(new_elements[4].tensor_w) == [2., 2.]
+    assert np.array_equal(new_elements[4].data[0].array.array, [5., 6.])
+    if lazy:
+        reader.close()
+
+
+def test_lazy_omf_reader(omf_file):
+    fname, _ = omf_file
+    reader = spatial.LazyOMFReader(fname)
+    assert reader.name == 'project'
+    vertices = reader.elements[2].vertices
+    assert not vertices.loaded
+    assert vertices.dtype == 'Float64Array'
+    assert not vertices.loaded
+    assert vertices.shape == [3, 3]
+    assert vertices.loaded
+    reader.close()
+    with pytest.raises(ValueError):
+        reader.elements[2].triangles.array
+
+
+def test_lazy_omf_reader_context(omf_file):
+    fname, _ = omf_file
+    with spatial.LazyOMFReader(fname) as reader:
+        vertices = reader.elements[2].vertices
+    with pytest.raises(ValueError):
+        vertices.array
+
+
+def test_lazy_omf_reader_no_legends(tmpdir):
+    project = omf.Project(
+        elements=[
+            omf.PointSetElement(
+                name='points',
+                geometry=omf.PointSetGeometry(vertices=np.random.rand(4, 3)),
+                data=[
+                    omf.MappedData(
+                        name='mapped',
+                        location='vertices',
+                        array=np.array([0, 1, -1, 1]),
+                    )
+                ],
+            )
+        ],
+    )
+    fname = str(tmpdir.join('no_legends.omf'))
+    omf.OMFWriter(project, fname)
+    with spatial.LazyOMFReader(fname) as reader:
+        data = reader.elements[0].data[0]
+        assert isinstance(data, spatial.DataBasic)
+        assert not isinstance(data, spatial.DataCategory)
+        assert data.name == 'mapped'
+        assert np.array_equal(data.array.array, [0, 1, -1, 1])
+
+
+def test_bad_omf_file(tmpdir):
+    fname = str(tmpdir.join('bad.omf'))
+    with open(fname, 'wb') as fopen:
+        fopen.write(b'\x00' * 100)
+    with pytest.raises(ValueError):
+        spatial.LazyOMFReader(fname)
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,102 @@
+import pytest
+
+import properties
+from lfview.resources import spatial
+from lfview.resources.spatial import resolver
+
+from .conftest import URL
+
+
+def _serialized(make_resources):
+    mapping, data, surface = make_resources()
+    shared_data = spatial.DataBasic(
+        uid=URL.format('data', 'basic', 'def456'),
+        array=URL.format('files', 'array', 'def456'),
+        location='nodes',
+        mappings=[mapping],
+    )
+    other_surface = spatial.ElementSurface(
+        uid=URL.format('elements', 'surface', 'def456'),
+        vertices=URL.format('files', 'array', 'jkl012'),
+        triangles=URL.format('files', 'array', 'mno345'),
+        data=[shared_data],
+    )
+    surface.data = [data, shared_data]
+    return spatial.serialize_resources(
+        [mapping, data, shared_data, surface, other_surface]
+    )
+
+
+def test_pointer_uids(make_resources):
+    values = _serialized(make_resources)
+    surface = spatial.ElementSurface.deserialize(values[-2])
+    assert sorted(resolver.pointer_uids(surface)) == sorted(
+        [
+            values[1]['uid'],
+            values[2]['uid'],
+            values[1]['uid'],
+            values[0]['uid'],
+        ]
+    )
+
+
+def test_resolver(make_resources):
+    values = _serialized(make_resources)
+    store = spatial.DictStore()
+    for value in values:
+        store.put(value)
+    res = spatial.PointerResolver(store)
+    surfaces = res.resolve_all([values[-2]['uid'], values[-1]['uid']])
+    assert res.misses == 5
+    assert len(res) == 5
+    mapping = surfaces[0].data[0].mappings[0]
+    assert isinstance(mapping, spatial.MappingContinuous)
+    assert surfaces[0].data[1] is surfaces[1].data[0]
+    assert surfaces[1].data[0].mappings[0] is mapping
+    assert surfaces[0].defaults.color.data is surfaces[0].data[0]
+    assert surfaces[0].defaults.color.mapping is mapping
+    assert res.resolve(values[-1]['uid']) is surfaces[1]
+    assert res.resolve(values[0]['uid']) is mapping
+    assert res.hits == 2
+    assert res.misses == 5
+    res.clear()
+    assert res.resolve(values[0]['uid']) is not mapping
+    with pytest.raises(KeyError):
+        res.resolve(URL.format('elements', 'surface', 'xyz123'))
+
+
+def test_resolver_missing_and_invalid(make_resources):
+    values = _serialized(make_resources)
+    store = spatial.DictStore({value['uid']: value for value in values[1:]})
+    res = spatial.PointerResolver(store, max_entries=2)
+    data = res.resolve(values[1]['uid'])
+    assert data.mappings[0] == values[0]['uid']
+    assert len(res) == 1
+    surface = res.resolve(values[-2]['uid'])
+    assert surface.data[0] is data
+    assert len(res) == 2
+    assert res.resolve(values[1]['uid']) is not data
+    store.values[values[-1]['uid']]['data'] = [5]
+    with pytest.raises(properties.ValidationError):
+        res.resolve(values[-1]['uid'])
+
+
+def test_directory_store(make_resources, tmpdir):
+    values = _serialized(make_resources)
+    store = spatial.DirectoryStore(str(tmpdir))
+    for value in values:
+        store.put(value)
+    assert tmpdir.join('mappings', 'continuous', 'abc123.json').check()
+    assert values[0]['uid'] in store
+    assert URL.format('mappings', 'continuous', 'xyz123') not in store
+    assert URL.format('files', 'array', 'abc123') not in store
+    assert 'elements/surface/../../abc' not in store
+    assert store.get(values[0]['uid']) == values[0]
+    with pytest.raises(KeyError):
+        store.get(URL.format('mappings', 'continuous', 'xyz123'))
+    surface = spatial.PointerResolver(store).resolve(values[-2]['uid'])
+    assert surface.data[0].mappings[0] is surface.data[1].mappings[0]
+
+
+if __name__ == '__main__':
+    pytest.main()
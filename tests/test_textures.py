@@ -1,5 +1,9 @@
+import io
+
+import png
 import pytest
 
+import omf
 import properties
 from lfview.resources import files, spatial
 
@@ -44,5 +48,26 @@ def test_bad_textureprojection(prop, bad_val):
         tex.validate()
 
 
+def test_texture_from_omf():
+    img = io.BytesIO()
+    png.Writer(2, 1, greyscale=False).write(img, [[0, 0, 0, 255, 255, 255]])
+    img.seek(0)
+    omf_texture = omf.ImageTexture(
+        name='tex',
+        origin=[1., 2, 3],
+        axis_u=[1., 0, 0],
+        axis_v=[0., 0, 1],
+        image=img,
+    )
+    tex = spatial.TextureProjection.from_omf(omf_texture)
+    assert tex.validate()
+    assert tex.name == 'tex'
+    assert list(tex.origin) == [1., 2, 3]
+    assert list(tex.axis_v) == [0., 0, 1]
+    assert tex.image.content_length > 0
+    assert tex.image.image is omf_texture.image
+    assert tex.to_omf().validate()
+
+
 if __name__ == '__main__':
     pytest.main()